@@ -0,0 +1,80 @@
+# benchmarks/bench_audit_cache.py
+"""
+Mide la memoria de la caché de mensajes del registro de auditoría (utils/message_cache.py).
+
+Llena una MessageCache con mensajes sintéticos de distinta longitud repartidos entre varios
+canales y reporta, por cada 100k mensajes guardados: memoria real (tracemalloc), memoria
+estimada por la caché (la que se compara con el techo configurado) y coste por operación.
+Con --max-mb se comprueba además que el techo se respeta al seguir insertando.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_audit_cache [--messages 100000] [--channels 50] [--max-mb 16]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from utils.message_cache import MessageCache
+
+WORDS = "hola docker contenedor app homedock error puerto volumen red gracias ayuda linux windows 🚀".split()
+
+
+def _generate_messages(count, channels, seed=42):
+    """Synthetic messages, created lazily so the cache is what keeps their strings alive (as with the gateway's)."""
+    rng = random.Random(seed)
+    for i in range(count):
+        content = " ".join(rng.choice(WORDS) for _ in range(rng.choice((3, 8, 15, 40))))
+        attachments = ("captura.png",) if i % 20 == 0 else ()
+        yield (1390000000000 + i % channels, 1400000000000000000 + i, 1000 + i % 3000, f"user{i % 3000}", 1750000000.0 + i, content, attachments)
+
+
+def measure_memory(count, channels, max_bytes, per_channel):
+    """Fills a cache and returns it with the memory it holds according to tracemalloc."""
+    tracemalloc.start()
+    cache = MessageCache(max_bytes=max_bytes, per_channel=per_channel)
+    for message in _generate_messages(count, channels):
+        cache.add(*message)
+    used = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return cache, used
+
+
+def measure_speed(count, channels, max_bytes, per_channel):
+    messages = list(_generate_messages(count, channels))
+    cache = MessageCache(max_bytes=max_bytes, per_channel=per_channel)
+    start = time.perf_counter()
+    for message in messages:
+        cache.add(*message)
+    return (time.perf_counter() - start) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--messages', type=int, default=100000)
+    parser.add_argument('--channels', type=int, default=50)
+    parser.add_argument('--max-mb', type=float, default=16)
+    args = parser.parse_args()
+
+    text_bytes = sum(len(m[5].encode('utf-8')) for m in _generate_messages(args.messages, args.channels))
+
+    # Sin límites: memoria por 100k mensajes
+    cache, used = measure_memory(args.messages, args.channels, max_bytes=float('inf'), per_channel=args.messages)
+    per_100k = 100000 / cache.count
+    print(f"{cache.count} mensajes en {args.channels} canales, texto medio {text_bytes / args.messages:.0f} bytes\n")
+    print(f"memoria real por 100k mensajes:     {used * per_100k / 1024 / 1024:8.1f} MiB")
+    print(f"memoria estimada por 100k mensajes: {cache.bytes * per_100k / 1024 / 1024:8.1f} MiB (real/estimada {used / cache.bytes:.2f})")
+    print(f"solo el texto por 100k mensajes:    {text_bytes * per_100k / 1024 / 1024:8.1f} MiB")
+    print(f"inserción: {measure_speed(args.messages, args.channels, float('inf'), args.messages) * 1e6:.2f} µs/mensaje\n")
+
+    # Con techo: la caché se mantiene por debajo al seguir insertando
+    max_bytes = int(args.max_mb * 1024 * 1024)
+    inserts = args.messages * 2
+    cache, used = measure_memory(inserts, args.channels, max_bytes=max_bytes, per_channel=500)
+    print(f"techo {args.max_mb:.0f} MiB, 500 por canal, {inserts} inserciones:")
+    print(f"  guardados {cache.count}, expulsados {cache.evicted}, estimado {cache.bytes / 1024 / 1024:.1f} MiB, real {used / 1024 / 1024:.1f} MiB")
+    print(f"  inserción: {measure_speed(inserts, args.channels, max_bytes, 500) * 1e6:.2f} µs/mensaje")
+
+
+if __name__ == '__main__':
+    main()
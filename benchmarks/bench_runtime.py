@@ -0,0 +1,136 @@
+# benchmarks/bench_runtime.py
+"""
+Compara el modo de runtime por defecto (asyncio + json) con el modo rápido (uvloop + orjson).
+
+Mide:
+  - Throughput de despacho de eventos tipo gateway: decodificar el payload JSON y lanzar
+    una tarea por listener, igual que hace discord.py en `Client.dispatch`.
+  - Throughput de config/hash: guardar/cargar un config como el de los cogs y calcular el
+    hash de contenido de un embed de panel.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_runtime [--events 50000] [--iterations 5000]
+"""
+import argparse
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+
+from utils import runtime
+
+LISTENERS_PER_EVENT = 3 # on_message en LoggingCog, TicketsCog, etc.
+
+
+def _make_gateway_payloads(count, codec):
+    payloads = []
+    for i in range(count):
+        event = {
+            "op": 0,
+            "s": i,
+            "t": "MESSAGE_CREATE",
+            "d": {
+                "id": str(1382000000000000000 + i),
+                "channel_id": "1382444394312896633",
+                "guild_id": "1381296490923954226",
+                "author": {"id": str(1000 + i % 500), "username": f"user{i % 500}", "bot": False},
+                "content": f"Mensaje de prueba número {i} con algo de texto para el benchmark 🚀",
+                "mentions": [],
+                "attachments": [],
+                "embeds": [],
+                "timestamp": "2025-06-15T12:00:00.000000+00:00",
+            },
+        }
+        payloads.append(codec.canonical_bytes(event))
+    return payloads
+
+
+def _make_panel_embed(i):
+    return {
+        "title": f"🎫 Homedocks | Support {i} Ticket System 🎫",
+        "description": "Welcome to the **Homedocks Support System**!\n" * 8,
+        "color": 0xF1C40F,
+        "fields": [{"name": f"Campo {n}", "value": "texto " * 20, "inline": False} for n in range(10)],
+    }
+
+
+def bench_dispatch(fast, events):
+    codec = runtime.select_codec(fast)
+    payloads = _make_gateway_payloads(events, codec)
+    handled = 0
+
+    async def listener(data):
+        nonlocal handled
+        handled += 1
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        tasks = []
+        for raw in payloads:
+            data = codec.loads(raw)["d"]
+            for _ in range(LISTENERS_PER_EVENT):
+                tasks.append(loop.create_task(listener(data)))
+            if len(tasks) >= 1000:
+                await asyncio.gather(*tasks)
+                tasks.clear()
+        await asyncio.gather(*tasks)
+        return time.perf_counter() - start
+
+    loop_factory = runtime.get_loop_factory(fast)
+    if loop_factory is None:
+        elapsed = asyncio.run(run())
+    else:
+        with asyncio.Runner(loop_factory=loop_factory) as runner:
+            elapsed = runner.run(run())
+    assert handled == events * LISTENERS_PER_EVENT
+    return events / elapsed
+
+
+def bench_config_and_hash(fast, iterations):
+    codec = runtime.select_codec(fast)
+    config = {str(1382000000000000000 + i): {"message_id": 1383000000000000000 + i, "last_content_hash": "f" * 64} for i in range(10)}
+    embeds = [_make_panel_embed(i) for i in range(10)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "tickets_config.json")
+        start = time.perf_counter()
+        for i in range(iterations):
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(codec.dumps_pretty(config))
+            with open(path, 'rb') as f:
+                codec.loads(f.read())
+            hashlib.sha256(codec.canonical_bytes(embeds[i % len(embeds)])).hexdigest()
+        elapsed = time.perf_counter() - start
+    return iterations / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--events', type=int, default=50000)
+    parser.add_argument('--iterations', type=int, default=5000)
+    args = parser.parse_args()
+
+    # Los hashes deben ser idénticos entre codecs para no republicar paneles al cambiar de modo.
+    sample = _make_panel_embed(0)
+    same_hash = runtime.StdlibCodec().canonical_bytes(sample) == runtime.select_codec(True).canonical_bytes(sample)
+
+    print(f"default: {runtime.describe(False)}")
+    print(f"fast:    {runtime.describe(True)}")
+    print(f"hash de contenido idéntico entre codecs: {same_hash}\n")
+
+    results = {}
+    for name, fast in (("default", False), ("fast", True)):
+        results[name] = (bench_dispatch(fast, args.events), bench_config_and_hash(fast, args.iterations))
+
+    print(f"{'modo':<10}{'eventos/s':>15}{'config+hash/s':>18}")
+    for name, (dispatch_rate, config_rate) in results.items():
+        print(f"{name:<10}{dispatch_rate:>15,.0f}{config_rate:>18,.0f}")
+    base_dispatch, base_config = results["default"]
+    fast_dispatch, fast_config = results["fast"]
+    print(f"\nmejora: dispatch x{fast_dispatch / base_dispatch:.2f}, config+hash x{fast_config / base_config:.2f}")
+
+
+if __name__ == '__main__':
+    main()
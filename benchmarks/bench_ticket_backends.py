@@ -0,0 +1,273 @@
+# benchmarks/bench_ticket_backends.py
+"""
+Compara los backends de tickets de TicketsCog: canal de texto privado vs hilo privado.
+
+Ejecuta el código real de `create_ticket_channel` y `finalize_ticket_closure` contra objetos
+falsos de Discord que cuentan cada llamada a la API y simulan su latencia (RTT fijo), y
+reporta por ticket: llamadas a la API al abrir/cerrar y latencia de apertura/cierre.
+
+Uso (desde la raíz del repo):
+    python -m benchmarks.bench_ticket_backends [--tickets 20] [--rtt 0.08]
+"""
+import argparse
+import asyncio
+import collections
+import itertools
+import os
+import tempfile
+import time
+
+import discord
+
+from cogs import tickets_cog
+from utils import outbox
+
+_ids = itertools.count(1390000000000000000)
+
+
+class ApiRecorder:
+    """Counts simulated REST calls per route and sleeps a fixed round-trip time for each."""
+
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.calls = collections.Counter()
+        self.last_created = None # Last ticket channel/thread created, so the benchmark can close it
+
+    async def call(self, route):
+        self.calls[route] += 1
+        await asyncio.sleep(self.rtt)
+
+    def total(self):
+        return sum(self.calls.values())
+
+
+class FakeUser:
+    def __init__(self, api, name, bot=False):
+        self.api = api
+        self.id = next(_ids)
+        self.name = name
+        self.global_name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.bot = bot
+        self.roles = []
+
+    async def send(self, *args, **kwargs):
+        await self.api.call("POST /users/@me/channels + POST /channels/{dm}/messages")
+
+
+class FakeRole:
+    def __init__(self, role_id):
+        self.id = role_id
+        self.name = f"role-{role_id}"
+        self.mention = f"<@&{role_id}>"
+
+
+class FakeMessage:
+    def __init__(self, channel, author, content="", embeds=None):
+        self.id = next(_ids)
+        self.channel = channel
+        self.author = author
+        self.content = content or ""
+        self.embeds = embeds or []
+        self.components = []
+        self.attachments = []
+        self.created_at = discord.utils.utcnow()
+
+
+class FakeChannelMixin:
+    """Send/history behaviour shared by the fake text channel and the fake thread."""
+
+    def _setup(self, api, bot_user, name, guild):
+        self.api = api
+        self.bot_user = bot_user
+        self.messages = []
+        self.name = name
+        self.id = next(_ids)
+        self.guild = guild
+
+    async def send(self, content=None, *, embed=None, view=None, file=None, delete_after=None):
+        await self.api.call("POST /channels/{id}/messages")
+        message = FakeMessage(self, self.bot_user, content, [embed] if embed else None)
+        self.messages.append(message)
+        return message
+
+    async def history(self, limit=None, oldest_first=False):
+        # One GET per 100 messages, like discord.py's paginated history
+        for start in range(0, len(self.messages), 100):
+            await self.api.call("GET /channels/{id}/messages")
+            for message in self.messages[start:start + 100]:
+                yield message
+
+
+class FakeTextChannel(FakeChannelMixin):
+    def __init__(self, api, bot_user, guild, name, topic=None):
+        self._setup(api, bot_user, name, guild)
+        self.topic = topic
+        self.created_at = discord.utils.utcnow()
+        self.mention = f"<#{self.id}>"
+
+    async def create_thread(self, *, name, type=None, invitable=True, auto_archive_duration=None, reason=None):
+        await self.api.call("POST /channels/{id}/threads")
+        self.api.last_created = FakeThread(self.api, self.bot_user, self.guild, name)
+        return self.api.last_created
+
+    async def delete(self, reason=None):
+        await self.api.call("DELETE /channels/{id}")
+
+
+class FakeThread(FakeChannelMixin, discord.Thread):
+    def __init__(self, api, bot_user, guild, name):
+        self._setup(api, bot_user, name, guild)
+        self._created_at = discord.utils.utcnow()
+        self.last_message_id = None
+        self.archived = False
+        self.locked = False
+
+    async def add_user(self, user):
+        await self.api.call("PUT /channels/{id}/thread-members/{user}")
+
+    async def edit(self, *, archived=None, locked=None, reason=None):
+        await self.api.call("PATCH /channels/{id}")
+        self.archived, self.locked = archived, locked
+
+
+class FakeGuild:
+    def __init__(self, api, bot_user):
+        self.api = api
+        self.id = tickets_cog.PRIMARY_GUILD_ID # Uses the module constants (the primary server's settings)
+        self.default_role = FakeRole(self.id)
+        self.me = bot_user
+        self.bot_user = bot_user
+        self.roles = {role_id: FakeRole(role_id) for role_id in tickets_cog.ADMIN_OR_MOD_ROLE_IDS}
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    async def create_text_channel(self, name, *, overwrites=None, category=None, topic=None, reason=None):
+        await self.api.call("POST /guilds/{id}/channels")
+        self.api.last_created = FakeTextChannel(self.api, self.bot_user, self, name, topic)
+        return self.api.last_created
+
+
+class FakeFollowup:
+    def __init__(self, api):
+        self.api = api
+        self.sent_at = None
+
+    async def send(self, *args, **kwargs):
+        await self.api.call("POST /webhooks/{app}/{token}")
+        self.sent_at = time.perf_counter()
+
+
+class FakeInteraction:
+    def __init__(self, api, guild, user, support_channel):
+        self.guild = guild
+        self.user = user
+        self.channel = support_channel
+        self.channel_id = support_channel.id
+        self.followup = FakeFollowup(api)
+        self.created_at = discord.utils.utcnow()
+
+
+class FakeBot:
+    def __init__(self, api, bot_user, channels):
+        self.api = api
+        self.user = bot_user
+        self._channels = channels
+
+    def add_view(self, view):
+        pass
+
+    def add_dynamic_items(self, *items):
+        pass
+
+    def get_channel(self, channel_id):
+        return self._channels.get(channel_id)
+
+    def get_cog(self, name):
+        return None
+
+    async def fetch_user(self, user_id):
+        await self.api.call("GET /users/{id}")
+        return FakeUser(self.api, "creator")
+
+
+async def run_backend(backend, tickets, rtt):
+    tickets_cog.TICKET_BACKEND = backend
+    api = ApiRecorder(rtt)
+    bot_user = FakeUser(api, "HomedockBot", bot=True)
+    guild = FakeGuild(api, bot_user)
+    support_channel = FakeTextChannel(api, bot_user, guild, "support")
+    support_channel.id = next(iter(tickets_cog.SUPPORT_CHANNELS))
+    channels = {
+        support_channel.id: support_channel,
+        tickets_cog.ARCHIVE_CHANNEL_ID: FakeTextChannel(api, bot_user, guild, "archive"),
+        tickets_cog.LOG_CHANNEL_ID: FakeTextChannel(api, bot_user, guild, "logs"),
+    }
+    cog = tickets_cog.TicketsCog(FakeBot(api, bot_user, channels))
+    cog.closure_pool.start()
+    staff = FakeUser(api, "staff")
+
+    open_calls, close_calls, open_latency, close_latency = [], [], [], []
+    for i in range(tickets):
+        user = FakeUser(api, f"user{i}")
+        interaction = FakeInteraction(api, guild, user, support_channel)
+
+        before = api.total()
+        start = time.perf_counter()
+        await cog.create_ticket_channel(interaction, "App Problem")
+        open_latency.append((interaction.followup.sent_at or time.perf_counter()) - start)
+        await cog.wait_ticket_openings() # Welcome message and log entry, posted after the link
+        open_calls.append(api.total() - before)
+
+        ticket_channel = api.last_created
+        for n in range(20): # A short conversation
+            ticket_channel.messages.append(FakeMessage(ticket_channel, user if n % 2 else staff, f"message {n}"))
+
+        before = api.total()
+        start = time.perf_counter()
+        await cog.finalize_ticket_closure(ticket_channel, staff, "solved", user.id, closer_is_admin=True, wait=True)
+        close_latency.append(time.perf_counter() - start)
+        close_calls.append(api.total() - before)
+
+    cog.closure_pool.stop()
+    cog.closure_journal.close()
+    cog.transcript_store.close()
+    return {
+        'open_calls': sum(open_calls) / tickets,
+        'close_calls': sum(close_calls) / tickets,
+        'open_ms': sum(open_latency) / tickets * 1000,
+        'close_ms': sum(close_latency) / tickets * 1000,
+        'routes': api.calls,
+    }
+
+
+async def main_async(args):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the benchmark away from the real config/ and data/ files
+        tickets_cog.STATS_FILE = os.path.join(tmp, 'ticket_stats.json')
+        tickets_cog.TRANSCRIPT_DB_FILE = os.path.join(tmp, 'transcripts.db')
+        tickets_cog.CLOSURE_JOURNAL_FILE = os.path.join(tmp, 'closure_jobs.db')
+        outbox.OUTBOX_DB_FILE = os.path.join(tmp, 'outbox.db')
+        results = {backend: await run_backend(backend, args.tickets, args.rtt) for backend in ("channel", "thread")}
+
+    print(f"{args.tickets} tickets por backend, RTT simulado {args.rtt * 1000:.0f} ms\n")
+    print(f"{'backend':<10}{'API abrir':>11}{'API cerrar':>12}{'ms abrir':>11}{'ms cerrar':>12}")
+    for backend, r in results.items():
+        print(f"{backend:<10}{r['open_calls']:>11.1f}{r['close_calls']:>12.1f}{r['open_ms']:>11.0f}{r['close_ms']:>12.0f}")
+    for backend, r in results.items():
+        print(f"\nLlamadas por ruta ({backend}, total):")
+        for route, count in r['routes'].most_common():
+            print(f"  {count:>5}  {route}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--tickets', type=int, default=20)
+    parser.add_argument('--rtt', type=float, default=0.08, help="Simulated API round-trip time in seconds")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
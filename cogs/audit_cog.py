@@ -0,0 +1,187 @@
+# cogs/audit_cog.py
+import discord
+from discord.ext import commands, tasks
+import asyncio
+import collections
+import datetime
+import logging
+from utils import sharding
+from utils.message_cache import MessageCache
+from utils.guild_config import guild_config
+
+log = logging.getLogger(__name__)
+
+# --- REGISTRO DE EDICIONES Y BORRADOS ---
+# Guarda el texto de los mensajes recientes (ver utils/message_cache.py) y, cuando alguien edita o
+# borra uno, lo anota en el canal de logs. Los avisos se agrupan: como mucho uno cada AUDIT_FLUSH_INTERVAL
+# segundos por servidor, con hasta AUDIT_BATCH_SIZE entradas en un mismo embed.
+AUDIT_FLUSH_INTERVAL = 10
+AUDIT_BATCH_SIZE = 15
+AUDIT_EXCERPT_CHARS = 300 # Texto máximo de cada mensaje en el log
+AUDIT_MAX_PENDING = 500 # Entradas pendientes por servidor; por encima se cuentan pero no se detallan
+EMBED_DESCRIPTION_LIMIT = 4096
+
+# Servidor principal activado por defecto; otros servidores añaden una sección "audit" en
+# config/guilds_config.json (con "ignored_channel_ids" opcional).
+guild_config.register_defaults('audit', {'enabled': True, 'ignored_channel_ids': []})
+
+
+def _excerpt(text):
+    text = text or "*(sin texto)*"
+    return text if len(text) <= AUDIT_EXCERPT_CHARS else text[:AUDIT_EXCERPT_CHARS - 1] + "…"
+
+
+class AuditCog(commands.Cog):
+    def __init__(self, bot):
+        self.bot = bot
+        self.cache = MessageCache()
+        self.pending = collections.defaultdict(list) # guild_id -> líneas de auditoría sin enviar
+        self.overflow = collections.Counter() # guild_id -> entradas descartadas por AUDIT_MAX_PENDING
+        self._guild_settings = {} # guild_id -> ajustes de auditoría (None = desactivada); guilds_config.json se lee al arrancar
+
+    async def cog_load(self):
+        self.flush_audit_log.start()
+
+    async def cog_unload(self):
+        self.flush_audit_log.cancel()
+
+    def _settings(self, guild_id):
+        """Audit settings of a server (None if disabled), with the ignored channels as a set for the per-event check."""
+        if guild_id not in self._guild_settings:
+            settings = guild_config.section(guild_id, 'audit')
+            if settings and settings.get('enabled', True):
+                settings = {**settings, 'ignored_channel_ids': set(settings.get('ignored_channel_ids', ()))}
+            else:
+                settings = None
+            self._guild_settings[guild_id] = settings
+        return self._guild_settings[guild_id]
+
+    def _audited(self, guild_id, channel_id):
+        if guild_id is None or not sharding.owns_guild(guild_id):
+            return False
+        settings = self._settings(guild_id)
+        if not settings or channel_id in settings['ignored_channel_ids']:
+            return False
+        logging_cog = self.bot.get_cog("LoggingCog")
+        log_channel = logging_cog.log_channels.get(guild_id) if logging_cog else None
+        return not (log_channel and log_channel.id == channel_id) # El canal de logs no se audita a sí mismo
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        if message.author.bot or not message.guild or not self._audited(message.guild.id, message.channel.id):
+            return
+        self.cache.add(
+            message.channel.id, message.id, message.author.id, message.author.display_name,
+            message.created_at.timestamp(), message.content, [attachment.filename for attachment in message.attachments]
+        )
+
+    @commands.Cog.listener()
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        if 'content' not in payload.data or not self._audited(payload.guild_id, payload.channel_id):
+            return # Ediciones sin texto nuevo (embeds de enlaces, fijados...)
+        record = self.cache.update(payload.channel_id, payload.message_id, payload.data['content'])
+        if record is None or record[3] == payload.data['content']:
+            return
+        author_id, author_name, _, before, _ = record
+        self._queue(payload.guild_id, (
+            f"✏️ **{author_name}** (<@{author_id}>) editó un [mensaje](https://discord.com/channels/{payload.guild_id}/{payload.channel_id}/{payload.message_id}) "
+            f"en <#{payload.channel_id}>\n**Antes:** {_excerpt(before)}\n**Después:** {_excerpt(payload.data['content'])}"
+        ))
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if not self._audited(payload.guild_id, payload.channel_id):
+            return
+        record = self.cache.pop(payload.channel_id, payload.message_id)
+        if record is not None:
+            self._queue(payload.guild_id, self._format_deleted(payload.channel_id, record))
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload: discord.RawBulkMessageDeleteEvent):
+        if not self._audited(payload.guild_id, payload.channel_id):
+            return
+        records = [record for message_id in sorted(payload.message_ids) if (record := self.cache.pop(payload.channel_id, message_id))]
+        self._queue(payload.guild_id, f"🧹 Borrado masivo de **{len(payload.message_ids)}** mensajes en <#{payload.channel_id}> ({len(records)} con texto guardado):")
+        for record in records:
+            self._queue(payload.guild_id, self._format_deleted(payload.channel_id, record))
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        self.cache.forget_channel(channel.id)
+
+    def _format_deleted(self, channel_id, record):
+        author_id, author_name, created_at, content, attachment_names = record
+        attachments = f"\n**Adjuntos:** {', '.join(attachment_names)}" if attachment_names else ""
+        return (
+            f"🗑️ Mensaje de **{author_name}** (<@{author_id}>) borrado en <#{channel_id}> "
+            f"(enviado <t:{int(created_at)}:R>)\n{_excerpt(content)}{attachments}"
+        )
+
+    def _queue(self, guild_id, line):
+        if len(self.pending[guild_id]) >= AUDIT_MAX_PENDING:
+            self.overflow[guild_id] += 1
+            return
+        self.pending[guild_id].append(line)
+
+    @tasks.loop(seconds=AUDIT_FLUSH_INTERVAL)
+    async def flush_audit_log(self):
+        """Sends the queued edit/delete entries to each server's log channel, several per message."""
+        logging_cog = self.bot.get_cog("LoggingCog")
+        for guild_id in list(self.pending):
+            lines = self.pending.pop(guild_id)
+            dropped = self.overflow.pop(guild_id, 0)
+            log_channel = logging_cog.get_log_channel(guild_id) if logging_cog else None
+            if not log_channel:
+                continue
+            if dropped:
+                lines.append(f"… y {dropped} entradas más no detalladas (demasiada actividad).")
+            for description in self._pack(lines):
+                embed = discord.Embed(title="📝 Registro de mensajes", description=description, color=discord.Color.dark_grey())
+                embed.set_footer(text=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S'))
+                try:
+                    await log_channel.send(embed=embed)
+                except discord.HTTPException as e:
+                    log.error(f"Error enviando el registro de mensajes al canal de logs: {e}", extra={'guild_id': guild_id})
+
+    @flush_audit_log.before_loop
+    async def before_flush_audit_log(self):
+        await self.bot.wait_until_ready()
+
+    async def drain(self, timeout):
+        """Shutdown step: sends what is still queued within `timeout` seconds (it goes to the outbox if Discord fails)."""
+        self.flush_audit_log.cancel()
+        try:
+            await asyncio.wait_for(self.flush_audit_log(), timeout)
+        except asyncio.TimeoutError:
+            log.warning("Shutdown deadline reached while sending the message log. Unsent entries are lost.",
+                        extra={'guilds': len(self.pending)})
+        return {'audit_entries_left': sum(len(lines) for lines in self.pending.values())}
+
+    @staticmethod
+    def _pack(lines):
+        """Groups lines into embed descriptions of at most AUDIT_BATCH_SIZE entries and the description limit."""
+        batch, size = [], 0
+        for line in lines:
+            if batch and (len(batch) >= AUDIT_BATCH_SIZE or size + len(line) + 2 > EMBED_DESCRIPTION_LIMIT):
+                yield "\n\n".join(batch)
+                batch, size = [], 0
+            batch.append(line)
+            size += len(line) + 2
+        if batch:
+            yield "\n\n".join(batch)
+
+    @commands.hybrid_command(name='auditcache')
+    @commands.has_permissions(manage_guild=True)
+    async def audit_cache_status(self, ctx):
+        """Muestra el uso de memoria de la caché de mensajes del registro de auditoría."""
+        stats = self.cache.stats()
+        await ctx.send(
+            f"Audit cache: **{stats['messages']}** messages in {stats['channels']} channels "
+            f"(~{stats['bytes'] / 1024 / 1024:.1f} of {self.cache.max_bytes / 1024 / 1024:.0f} MiB, {self.cache.per_channel} per channel). "
+            f"Evicted: {stats['evicted']}.",
+            ephemeral=True
+        )
+
+
+async def setup(bot):
+    await bot.add_cog(AuditCog(bot))
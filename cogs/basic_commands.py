@@ -2,6 +2,9 @@
 import discord
 from discord.ext import commands
 import datetime
+import logging
+
+log = logging.getLogger(__name__)
 
 class BasicCommands(commands.Cog):
     def __init__(self, bot):
@@ -10,15 +13,15 @@ class BasicCommands(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
-        print(f'Cog "{self.qualified_name}" de Comandos Básicos cargado y listo.')
+        log.info(f'Cog "{self.qualified_name}" de Comandos Básicos cargado y listo.')
         # Una vez que el bot está listo y todos los cogs cargados, obtenemos el logging_cog
         # Usamos self.bot.loop.create_task para no bloquear on_ready si LoggingCog tarda en inicializarse completamente.
         # aunque get_cog es sincrónico y rápido.
         self.logging_cog = self.bot.get_cog("LoggingCog")
         if self.logging_cog:
-            print("Log: BasicCommands tiene acceso a LoggingCog.")
+            log.info("BasicCommands tiene acceso a LoggingCog.")
         else:
-            print("Log: ADVERTENCIA: BasicCommands NO pudo obtener LoggingCog.")
+            log.warning("BasicCommands NO pudo obtener LoggingCog.")
 
     @commands.Cog.listener()
     async def on_command(self, ctx):
@@ -26,27 +29,28 @@ class BasicCommands(commands.Cog):
         Este listener se dispara cada vez que un comando es invocado con éxito.
         Loguea la ejecución de cualquier comando en el canal de logs.
         """
-        if self.logging_cog and self.logging_cog.log_channel:
+        log_channel = self.logging_cog.get_log_channel(ctx.guild.id) if self.logging_cog and ctx.guild else None
+        if log_channel:
             try:
                 log_message = (
                     f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
-                    f"Comando `!{ctx.command.name}` ejecutado por **{ctx.author.display_name}** (ID: {ctx.author.id}) "
+                    f"Comando `{ctx.prefix}{ctx.command.name}` ejecutado por **{ctx.author.display_name}** (ID: {ctx.author.id}) "
                     f"en `#{ctx.channel.name}` (ID: {ctx.channel.id})."
                 )
-                await self.logging_cog.log_channel.send(log_message)
+                await log_channel.send(log_message)
             except discord.Forbidden:
-                print(f"Log: ERROR: No tengo permisos para ESCRIBIR en el canal de logs ({self.logging_cog.log_channel.id}) desde on_command.")
+                log.error(f"No tengo permisos para ESCRIBIR en el canal de logs ({log_channel.id}) desde on_command.")
             except Exception as e:
-                print(f"Log: ERROR desconocido al loguear comando `!{ctx.command.name}` desde on_command: {e}")
+                log.error(f"Error desconocido al loguear comando `{ctx.prefix}{ctx.command.name}` desde on_command: {e}")
         else:
-            print(f"Log: No se pudo registrar el comando `!{ctx.command.name}`: Canal de logs no disponible o LoggingCog no accesible.")
+            log.info(f"No se pudo registrar el comando `{ctx.prefix}{ctx.command.name}`: Canal de logs no disponible o LoggingCog no accesible.")
 
-    @commands.command(name='ping')
+    @commands.hybrid_command(name='ping')
     async def ping(self, ctx):
         """Responde con Pong!"""
         await ctx.send('Pong!')
 
-    @commands.command(name='saludar')
+    @commands.hybrid_command(name='saludar')
     async def greet(self, ctx):
         """Saluda al usuario."""
         await ctx.send(f'¡Hola, {ctx.author.display_name}!')
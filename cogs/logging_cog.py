@@ -1,18 +1,133 @@
 # cogs/logging_cog.py
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import datetime
+import asyncio
+import time
+import logging
+from utils import sharding
+from utils.state_store import get_store
+from utils.log_relay import LogRelayChannel, deliver_relayed_logs
+from utils.outbox import get_outbox, replay_outbox, DurableChannel
+from utils.antispam import SpamGuard, ANTISPAM_DEFAULTS
+from utils.guild_config import guild_config, PRIMARY_GUILD_ID
+
+log = logging.getLogger(__name__)
 
 # --- CONFIGURACIÓN DE IDS ---
 # ID del canal donde quieres que se envíen los logs del bot
 LOG_CHANNEL_ID = 1382493194016522353 # <-- ¡PEGAR LA ID DEL CANAL DE LOGS AQUÍ!
 # ID de TU SERVIDOR (Guild ID). Necesario para verificar que el bot está en el servidor correcto.
-YOUR_SERVER_ID_HERE = 1381296490923954226 # <-- ¡PEGAR LA ID DE TU SERVIDOR AQUÍ!
+# Se configura con HOMEDOCK_PRIMARY_GUILD_ID; otros servidores y sus canales de logs van en config/guilds_config.json.
+YOUR_SERVER_ID_HERE = PRIMARY_GUILD_ID
+# Con varios procesos worker, solo el que tiene el shard de un servidor escribe en su canal de logs;
+# los demás encolan sus mensajes en el estado compartido y ese proceso los envía cada pocos segundos.
+LOG_RELAY_INTERVAL = 2
+# Segundos entre pasadas del outbox (mensajes de log, archivos de tickets y DMs pendientes de reintento)
+OUTBOX_REPLAY_INTERVAL = 5
+
+# Mensajes de alerta del anti-spam, por tipo de infracción
+ANTISPAM_REASONS = {
+    'flood': "demasiados mensajes seguidos",
+    'duplicate': "el mismo mensaje repetido",
+    'mentions': "demasiadas menciones",
+    'raid': "posible raid: avalancha de mensajes de muchos usuarios"
+}
+
+guild_config.register_defaults('logging', {'log_channel_id': LOG_CHANNEL_ID})
+guild_config.register_defaults('antispam', ANTISPAM_DEFAULTS)
+
 
 class LoggingCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.log_channel = None # Se inicializará con el objeto del canal de logs
+        self.log_channels = {} # guild_id -> canal de logs (o LogRelayChannel), se inicializa en on_ready
+        self.outbox = get_outbox()
+        self.spam_guard = SpamGuard()
+        self._antispam_settings = {} # guild_id -> ajustes del anti-spam con los valores por defecto aplicados (None = desactivado)
+
+    @property
+    def log_channel(self):
+        """Log channel of the primary server."""
+        return self.get_log_channel(YOUR_SERVER_ID_HERE)
+
+    def get_log_channel(self, guild_id):
+        """
+        Log channel of a server, or None if it has none (or it is not reachable). Messages that
+        Discord rejects transiently are journaled in the outbox and delivered later.
+        """
+        channel = self.log_channels.get(guild_id)
+        if channel is None or isinstance(channel, LogRelayChannel):
+            return channel # The relay queue is already durable
+        return DurableChannel(channel, self.outbox)
+
+    async def cog_load(self):
+        if sharding.is_worker():
+            self.relay_logs.start()
+        self.replay_outbox.start()
+
+    async def cog_unload(self):
+        self.relay_logs.cancel()
+        self.replay_outbox.cancel()
+
+    @tasks.loop(seconds=LOG_RELAY_INTERVAL)
+    async def relay_logs(self):
+        """Delivers the log messages queued by the other worker processes for the servers this one owns."""
+        owned = {channel.id: channel for channel in self.log_channels.values() if not isinstance(channel, LogRelayChannel)}
+        if owned:
+            await deliver_relayed_logs(get_store(), owned)
+
+    async def drain(self, timeout):
+        """
+        Shutdown step: delivers what is still queued (outbox and, in workers, the relayed logs) until
+        it is empty, Discord keeps failing, or `timeout` runs out. Whatever is left stays on disk.
+        """
+        deadline = time.monotonic() + timeout
+        self.replay_outbox.cancel()
+        sent = 0
+        while self.outbox.entries and time.monotonic() < deadline:
+            try:
+                batch = await asyncio.wait_for(
+                    replay_outbox(self.outbox, self._resolve_destination, ignore_backoff=True), deadline - time.monotonic()
+                )
+            except asyncio.TimeoutError:
+                break
+            sent += batch
+            if not batch:
+                break # Every pending destination failed this round; the next start retries them
+        if sharding.is_worker() and time.monotonic() < deadline:
+            await self.relay_logs()
+        return {'outbox_sent': sent, 'outbox_left': self.outbox.entries}
+
+    @tasks.loop(seconds=OUTBOX_REPLAY_INTERVAL)
+    async def replay_outbox(self):
+        """Retries the deliveries waiting in the outbox whose backoff has expired."""
+        if not self.outbox.entries:
+            return
+        sent = await replay_outbox(self.outbox, self._resolve_destination)
+        if sent:
+            log.info(f"Outbox: {sent} pending deliveries sent.", extra={'outbox_entries': self.outbox.entries, 'outbox_bytes': self.outbox.bytes})
+
+    @replay_outbox.before_loop
+    async def before_replay_outbox(self):
+        await self.bot.wait_until_ready()
+
+    async def _resolve_destination(self, kind, target_id):
+        if kind == 'user':
+            return self.bot.get_user(target_id) or await self.bot.fetch_user(target_id)
+        return self.bot.get_channel(target_id) or await self.bot.fetch_channel(target_id)
+
+    @commands.hybrid_command(name='outbox')
+    @commands.has_permissions(manage_guild=True)
+    async def outbox_status(self, ctx):
+        """Muestra los envíos pendientes de reintento (logs, archivos de tickets, DMs)."""
+        depth = await asyncio.to_thread(self.outbox.depth)
+        await ctx.send(
+            f"Outbox: **{depth['entries']}** pending deliveries to {depth['destinations']} destinations "
+            f"({depth['bytes'] / 1024:.0f} KiB, oldest {depth['oldest_age'] / 60:.0f} min). "
+            f"Evicted: {depth['evicted']}, dropped after errors: {depth['failed']}.",
+            ephemeral=True
+        )
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -20,82 +135,148 @@ class LoggingCog(commands.Cog):
         Este listener se ejecuta cuando el bot está completamente conectado a Discord.
         Es el punto central para la inicialización y verificación de logs.
         """
-        print(f'Log: Cog "{self.qualified_name}" de Logging cargado y listo.')
-        
-        # Impresiones generales de inicio del bot en la consola
-        print(f'¡Bot conectado como {self.bot.user}!')
-        print(f'ID del bot: {self.bot.user.id}')
+        # Un solo registro de inicio, con los datos del bot como campos
+        log.info(f'Cog "{self.qualified_name}" de Logging cargado y listo. Bot conectado como {self.bot.user}.',
+                 extra={'bot_id': self.bot.user.id})
         await self.bot.change_presence(activity=discord.Game(name="con los comandos de Homedock"))
-        print("Cogs cargados y bot listo para operar.")
 
+        for guild_id in guild_config.guild_ids('logging'):
+            log_channel_id = guild_config.section(guild_id, 'logging').get('log_channel_id')
+            if not log_channel_id:
+                continue
+            if not sharding.owns_guild(guild_id):
+                # El servidor está en un shard de otro proceso: los logs se le reenvían
+                self.log_channels[guild_id] = LogRelayChannel(get_store(), log_channel_id)
+                log.info("Servidor en otro worker. Logs reenviados a través del estado compartido.",
+                         extra={'guild_id': guild_id, 'worker': sharding.describe()})
+                continue
+            self.log_channels[guild_id] = await self._setup_log_channel(guild_id, log_channel_id)
 
-        print("\n--- INICIO DE VERIFICACIÓN DE SERVIDOR Y CANAL DE LOGS ---")
-        target_guild = self.bot.get_guild(YOUR_SERVER_ID_HERE)
+    async def _setup_log_channel(self, guild_id, log_channel_id):
+        """Verifica el servidor y su canal de logs y envía el mensaje de inicio. Devuelve el canal o None."""
+        # Un registro por resultado (con el servidor y el canal como campos) en lugar del bloque de líneas
+        fields = {'guild_id': guild_id, 'log_channel_id': log_channel_id}
+        target_guild = self.bot.get_guild(guild_id)
 
         if not target_guild:
-            print(f"Log: ERROR CRÍTICO: El bot NO está conectado al servidor con ID {YOUR_SERVER_ID_HERE}.")
-            print("Log: Por favor, verifica la ID del servidor y que el bot esté invitado a él.")
-            print("--- FIN DE VERIFICACIÓN ---")
-            return # No podemos continuar sin el servidor
-
-        print(f"Log: Bot conectado al servidor objetivo: '{target_guild.name}' (ID: {target_guild.id})")
-        print(f"Log: Intentando obtener el canal de logs con ID: {LOG_CHANNEL_ID}")
+            log.error("El bot NO está conectado al servidor. Verifica la ID del servidor y que el bot esté invitado a él.", extra=fields)
+            return None # No podemos continuar sin el servidor
 
+        log_channel = None
         # Intentar obtener el canal de logs
         try:
             # Primero intentar desde la caché (más rápido)
-            channel_from_cache = self.bot.get_channel(LOG_CHANNEL_ID)
-            if channel_from_cache:
-                self.log_channel = channel_from_cache
-                print(f"Log: Canal de logs encontrado en caché: #{self.log_channel.name} (ID: {LOG_CHANNEL_ID})")
-            else:
+            log_channel = self.bot.get_channel(log_channel_id)
+            fields['source'] = 'cache'
+            if not log_channel:
                 # Si no está en caché, intentar con fetch_channel (pide a la API de Discord)
-                print(f"Log: Canal NO encontrado en caché. Intentando con fetch_channel...")
-                self.log_channel = await self.bot.fetch_channel(LOG_CHANNEL_ID)
-                print(f"Log: Canal de logs obtenido con fetch_channel: #{self.log_channel.name} (ID: {LOG_CHANNEL_ID})")
+                log_channel = await self.bot.fetch_channel(log_channel_id)
+                fields['source'] = 'fetch_channel'
 
             # Una vez que tenemos el objeto del canal, intentamos enviar un mensaje de prueba
-            if self.log_channel:
+            if log_channel:
                 try:
-                    await self.log_channel.send(f"Bot **{self.bot.user.display_name}** iniciado y sistema de logs activado. ({datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
-                    print(f"Log: Mensaje de inicio enviado al canal de logs exitosamente.")
+                    await log_channel.send(f"Bot **{self.bot.user.display_name}** iniciado y sistema de logs activado. ({datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')})")
+                    log.info(f"Canal de logs #{log_channel.name} verificado en '{target_guild.name}'. Mensaje de inicio enviado.", extra=fields)
                 except discord.Forbidden:
-                    print(f"Log: ERROR CRÍTICO: No tengo permisos para ESCRIBIR en el canal de logs ({LOG_CHANNEL_ID}) aunque lo encontré.")
-                    print("Log: Asegúrate de que el bot tenga el permiso 'Enviar Mensajes' (Send Messages) en el canal de logs.")
-                    self.log_channel = None # Marca como no disponible si no puede escribir
+                    log.error("No tengo permisos para ESCRIBIR en el canal de logs aunque lo encontré. "
+                              "Asegúrate de que el bot tenga el permiso 'Enviar Mensajes' (Send Messages).", extra=fields)
+                    log_channel = None # Marca como no disponible si no puede escribir
                 except Exception as e:
-                    print(f"Log: ERROR desconocido al enviar mensaje de inicio al log: {e}")
-                    self.log_channel = None
+                    log.error(f"Error desconocido al enviar mensaje de inicio al log: {e}", extra=fields)
+                    log_channel = None
 
             else: # Esto ocurrirá si fetch_channel también falla (ej. canal no existe, ID incorrecta)
-                print(f"Log: ADVERTENCIA CRÍTICA: El canal con ID {LOG_CHANNEL_ID} NO PUDO SER ENCONTRADO O ACCEDIDO.")
-                print("Log: Posibles causas: ID incorrecta, canal eliminado, o permisos de 'Ver Canal' faltantes para el bot.")
-                self.log_channel = None
+                log.warning("El canal de logs NO PUDO SER ENCONTRADO O ACCEDIDO. Posibles causas: ID incorrecta, "
+                            "canal eliminado, o permisos de 'Ver Canal' faltantes para el bot.", extra=fields)
+                log_channel = None
 
         except discord.Forbidden:
-            print(f"Log: ERROR CRÍTICO: El bot NO tiene permisos de 'Ver Canal' para el canal de logs ({LOG_CHANNEL_ID}).")
-            print("Log: Asegúrate de que el bot tenga el permiso 'Ver Canal' en Discord para este canal específico.")
-            self.log_channel = None
+            log.error("El bot NO tiene permisos de 'Ver Canal' para el canal de logs. "
+                      "Asegúrate de que el bot tenga ese permiso en Discord para este canal específico.", extra=fields)
+            log_channel = None
         except discord.NotFound:
-            print(f"Log: ERROR CRÍTICO: El canal de logs con ID {LOG_CHANNEL_ID} NO FUE ENCONTRADO en Discord. La ID podría ser incorrecta o el canal fue eliminado.")
-            self.log_channel = None
+            log.error("El canal de logs NO FUE ENCONTRADO en Discord. La ID podría ser incorrecta o el canal fue eliminado.", extra=fields)
+            log_channel = None
         except Exception as e:
-            print(f"Log: ERROR CRÍTICO DESCONOCIDO al intentar obtener el canal de logs: {e}")
-            self.log_channel = None
-        
-        print("--- FIN DE VERIFICACIÓN DE SERVIDOR Y CANAL DE LOGS ---\n")
+            log.error(f"Error desconocido al intentar obtener el canal de logs: {e}", extra=fields)
+            log_channel = None
+
+        return log_channel
 
     @commands.Cog.listener()
     async def on_message(self, message):
         # Ignorar mensajes del propio bot
         if message.author == self.bot.user:
             return
-        # Ignorar mensajes en el propio canal de logs (para evitar bucles de logs)
-        if message.channel.id == LOG_CHANNEL_ID:
+        # Ignorar mensajes en los canales de logs (para evitar bucles de logs)
+        if message.guild and (log_channel := self.log_channels.get(message.guild.id)) and message.channel.id == log_channel.id:
+            return
+
+        # No logueamos todos los mensajes; solo pasan por el anti-spam
+        if not message.guild or message.author.bot or not sharding.owns_guild(message.guild.id):
+            return
+        settings = self._get_antispam_settings(message.guild.id)
+        if not settings:
+            return
+        violations = self.spam_guard.observe(
+            message.guild.id, message.channel.id, message.author.id, message.content,
+            len(message.raw_mentions) + len(message.raw_role_mentions), settings
+        )
+        if violations:
+            await self._enforce_antispam(message, violations, settings)
+
+    def _get_antispam_settings(self, guild_id):
+        if guild_id not in self._antispam_settings:
+            settings = guild_config.section(guild_id, 'antispam')
+            settings = {**ANTISPAM_DEFAULTS, **settings} if settings is not None else None
+            self._antispam_settings[guild_id] = settings if settings and settings.get('enabled') else None
+        return self._antispam_settings[guild_id]
+
+    async def _enforce_antispam(self, message, violations, settings):
+        """Applies the configured actions of each violation (staff are only reported, never punished)."""
+        member = message.author
+        actions = set()
+        for kind in violations:
+            actions.update(settings['actions'].get(kind, ()))
+        is_staff = isinstance(member, discord.Member) and member.guild_permissions.manage_messages
+        user_violations = [kind for kind in violations if kind != 'raid']
+        applied = []
+        if user_violations and not is_staff:
+            if 'delete' in actions:
+                try:
+                    await message.delete()
+                    applied.append("mensaje borrado")
+                except discord.NotFound:
+                    pass
+                except discord.HTTPException as e:
+                    log.warning(f"Anti-spam: no se pudo borrar el mensaje {message.id}: {e}", extra={'guild_id': message.guild.id})
+            if 'timeout' in actions and isinstance(member, discord.Member):
+                try:
+                    await member.timeout(datetime.timedelta(seconds=settings['timeout_seconds']), reason=f"Anti-spam: {', '.join(user_violations)}")
+                    applied.append(f"aislado {settings['timeout_seconds']} s")
+                    self.spam_guard.forget_user(message.guild.id, member.id)
+                except discord.HTTPException as e:
+                    log.warning(f"Anti-spam: no se pudo aislar a {member}: {e}", extra={'guild_id': message.guild.id, 'user_id': member.id})
+
+        # Delete/timeout act on every spam message; only the alert (and its log record) is rate-limited
+        alerted = [
+            kind for kind in violations
+            if self.spam_guard.should_alert(kind, message.channel.id if kind == 'raid' else (message.guild.id, member.id), settings['alert_cooldown'])
+        ]
+        if not alerted:
             return
-        
-        # En esta versión, no logueamos todos los mensajes, solo los comandos y los eventos de reacción.
-        pass
+        log.warning(f"Anti-spam: {', '.join(alerted)} de {member} en #{message.channel}.", extra={
+            'guild_id': message.guild.id, 'channel_id': message.channel.id, 'user_id': member.id,
+            'violations': violations, 'actions': applied
+        })
+        if 'alert' in actions and (log_channel := self.get_log_channel(message.guild.id)):
+            reasons = "; ".join(ANTISPAM_REASONS[kind] for kind in alerted)
+            await log_channel.send(
+                f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] 🚨 **Anti-spam** en {message.channel.mention}: "
+                f"{reasons}. Último autor: **{member.display_name}** (ID: {member.id})."
+                + (f" Acciones: {', '.join(applied)}." if applied else "")
+            )
 
 async def setup(bot):
-    await bot.add_cog(LoggingCog(bot))
\ No newline at end of file
+    await bot.add_cog(LoggingCog(bot))
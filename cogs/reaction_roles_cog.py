@@ -2,7 +2,15 @@
 import discord
 from discord.ext import commands
 import datetime
+import logging
 import asyncio
+import json
+from utils.state_store import load_document, save_document, state_lock
+from utils import sharding
+from utils.panel_healing import PanelHealer
+from utils.guild_config import guild_config, PRIMARY_GUILD_ID
+
+log = logging.getLogger(__name__)
 
 # --- CONFIGURACIÓN DE IDS ---
 REACTION_CHANNEL_ID = 1382490687391400057
@@ -10,6 +18,9 @@ REACTION_CHANNEL_ID = 1382490687391400057
 REACTION_MESSAGE_ID = 1382654357127954453 
 # Si el bot ya ha generado un mensaje y tienes su ID, actualízala aquí para que el bot lo use.
 # Por ejemplo: REACTION_MESSAGE_ID = 1382528541052112899
+# El bot guarda la ID del mensaje que crea en CONFIG_FILE (compartido entre procesos worker),
+# y esa ID tiene prioridad sobre la constante.
+CONFIG_FILE = 'config/reaction_roles_config.json'
 
 EMOJI_ROLE_MAP = {
     "🪟": 1382519354629029928,  # ID del rol de Windows
@@ -18,10 +29,192 @@ EMOJI_ROLE_MAP = {
     "🍓": 1382519599861338212   # ID del rol de Raspberry Pi
 }
 
+# Cómo se elige el rol de SO: 'reactions' (emojis en el mensaje), 'select' (menú desplegable) o 'buttons'.
+# Con 'select'/'buttons' cada elección es una sola respuesta a la interacción y una sola edición de roles
+# del miembro. Al cambiar de 'reactions', el mensaje existente (REACTION_MESSAGE_ID) se edita en su sitio
+# si lo envió el bot; si no, se publica uno nuevo y su ID se guarda en CONFIG_FILE.
+ROLE_PICKER_STYLE = 'reactions'
+ROLE_PICKER_STYLES = ('reactions', 'select', 'buttons')
+BUTTON_LABEL_LIMIT = 80 # Discord rechaza botones con etiquetas más largas (los nombres de rol llegan a 100)
+
+# Valores del servidor principal; otros servidores definen channel_id, message_id y emoji_roles
+# en config/guilds_config.json (sección "reaction_roles").
+guild_config.register_defaults('reaction_roles', {
+    'channel_id': REACTION_CHANNEL_ID,
+    'message_id': REACTION_MESSAGE_ID,
+    'emoji_roles': EMOJI_ROLE_MAP,
+    'picker': ROLE_PICKER_STYLE
+})
+
+
+def emoji_roles_for(guild_id):
+    """{emoji: role_id} of a guild (empty if it has no reaction roles)."""
+    settings = guild_config.section(guild_id, 'reaction_roles')
+    return settings.get('emoji_roles', {}) if settings else {}
+
+
+def picker_style_for(settings):
+    style = settings.get('picker', ROLE_PICKER_STYLE)
+    if style not in ROLE_PICKER_STYLES:
+        log.warning(f"Modo de selección de roles '{style}' desconocido. Se usan reacciones.")
+        return 'reactions'
+    return style
+
+
+def _truncate(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + "…"
+
+
+# --- Componentes del selector de SO ---
+# Persistentes y sin estado: el custom_id lleva el rol ("os_role:<role_id>") o es el del menú, y el rol
+# se valida contra emoji_roles del servidor en cada clic, así que sobreviven a reinicios sin registrar mensajes.
+class OSRoleButton(discord.ui.DynamicItem[discord.ui.Button], template=r'os_role:(?P<role_id>\d+)'):
+    def __init__(self, role_id: int, label: str = "SO", emoji: str = None):
+        self.role_id = role_id
+        super().__init__(
+            discord.ui.Button(label=_truncate(label, BUTTON_LABEL_LIMIT), style=discord.ButtonStyle.secondary, emoji=emoji, custom_id=f"os_role:{role_id}")
+        )
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(int(match["role_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        cog = interaction.client.get_cog("ReactionRolesCog")
+        if cog:
+            await cog.pick_os_role(interaction, self.role_id, toggle=True)
+
+
+class OSRoleSelect(discord.ui.DynamicItem[discord.ui.Select], template=r'os_role_select'):
+    def __init__(self, options: list = None):
+        super().__init__(
+            discord.ui.Select(
+                placeholder="Selecciona tu sistema operativo...",
+                options=options or [discord.SelectOption(label="SO", value="0")],
+                custom_id="os_role_select"
+            )
+        )
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls()
+
+    async def callback(self, interaction: discord.Interaction):
+        value = interaction.data.get("values", ["0"])[0]
+        cog = interaction.client.get_cog("ReactionRolesCog")
+        if cog:
+            await cog.pick_os_role(interaction, int(value) if value.isdigit() else 0)
+
+
+def build_os_picker(guild, emoji_roles, style):
+    """Builds the embed and the components of the OS role picker of a guild."""
+    choices = [(emoji, role_id, guild.get_role(role_id)) for emoji, role_id in emoji_roles.items()]
+    choices = [(emoji, role_id, role.name) for emoji, role_id, role in choices if role]
+    embed = discord.Embed(
+        title="Selecciona tu Sistema Operativo",
+        description="Elige tu sistema operativo en el menú para obtener su rol:" if style == 'select'
+        else "Pulsa el botón de tu sistema operativo para obtener su rol:",
+        color=discord.Color.blue()
+    )
+    for emoji, _, name in choices:
+        embed.add_field(name=f"{emoji} {name}", value=f"Rol de **{name}**.", inline=False)
+    view = discord.ui.View(timeout=None)
+    if style == 'select':
+        options = [discord.SelectOption(label=name, value=str(role_id), emoji=emoji) for emoji, role_id, name in choices]
+        options.append(discord.SelectOption(label="Ninguno", value="0", emoji="✖️", description="Quita tu rol de SO"))
+        view.add_item(OSRoleSelect(options))
+        embed.set_footer(text="Elige \"Ninguno\" para quitar tu rol.\n(Solo puedes tener un rol de SO a la vez).")
+    else:
+        for emoji, role_id, name in choices:
+            view.add_item(OSRoleButton(role_id, name, emoji))
+        embed.set_footer(text="Vuelve a pulsar tu botón para quitar el rol.\n(Solo puedes tener un rol de SO a la vez).")
+    view.stop() # Los clics los atienden los DynamicItems registrados, no esta instancia
+    return embed, view
+
+
+def picker_signature(message):
+    """(style, role IDs) of the picker components of a message; style is None if it has none."""
+    style, role_ids = None, []
+    for row in message.components:
+        for component in getattr(row, 'children', [row]):
+            custom_id = getattr(component, 'custom_id', None) or ''
+            if custom_id.startswith('os_role:'):
+                style = 'buttons'
+                role_ids.append(int(custom_id.split(':', 1)[1]))
+            elif custom_id == 'os_role_select':
+                style = 'select'
+                role_ids.extend(int(option.value) for option in component.options if option.value != '0')
+    return style, role_ids
+
+
 class ReactionRolesCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.reaction_message = None
+        self.reaction_messages = {} # guild_id -> mensaje de reacción
+        self.message_guilds = {} # message_id -> guild_id, para filtrar los eventos de reacción en O(1)
+        self.healer = PanelHealer(self._heal_panel, 'Reaction roles') # Vuelve a publicar el mensaje si alguien lo borra
+        self.bot.add_dynamic_items(OSRoleButton, OSRoleSelect)
+
+    async def cog_unload(self):
+        self.bot.remove_dynamic_items(OSRoleButton, OSRoleSelect)
+        self.healer.stop()
+
+    async def pick_os_role(self, interaction: discord.Interaction, role_id, toggle=False):
+        """
+        Gives the member the chosen OS role and removes the others in a single role edit, then
+        confirms ephemerally. role_id 0 (or re-clicking the current role with toggle) removes it.
+        """
+        guild = interaction.guild
+        member = interaction.user
+        os_role_ids = set(emoji_roles_for(guild.id).values()) if guild else set()
+        if not os_role_ids or (role_id and role_id not in os_role_ids):
+            await interaction.response.send_message("Ese rol ya no está disponible en este selector.", ephemeral=True)
+            return
+        role = guild.get_role(role_id) if role_id else None
+        if role_id and role is None:
+            log.warning(f"Rol con ID {role_id} no encontrado en el gremio para el selector de SO.")
+            await interaction.response.send_message("Ese rol ya no existe en el servidor.", ephemeral=True)
+            return
+        if toggle and role in member.roles:
+            role = None
+        current = [r for r in member.roles if r.id in os_role_ids]
+        if current == ([role] if role else []):
+            message = f"Ya tienes el rol **{role.name}**." if role else "No tienes ningún rol de SO."
+            await interaction.response.send_message(message, ephemeral=True)
+            return
+
+        roles = [r for r in member.roles if r.id not in os_role_ids and not r.is_default()]
+        if role:
+            roles.append(role)
+        try:
+            await member.edit(roles=roles, reason="Selector de rol de SO")
+        except discord.Forbidden:
+            log.error(f"No tengo permisos para cambiar los roles de SO de {member.display_name}. Verifique la jerarquía de roles del bot.")
+            await interaction.response.send_message("No tengo permisos para cambiar tus roles. Avisa a un moderador.", ephemeral=True)
+            return
+        except discord.HTTPException as e:
+            log.error(f"Error al cambiar los roles de SO de {member.display_name}: {e}")
+            await interaction.response.send_message("No se pudo cambiar tu rol. Inténtalo de nuevo.", ephemeral=True)
+            return
+
+        removed_names = ", ".join(r.name for r in current if r != role)
+        if role:
+            confirmation = f"Ahora tienes el rol **{role.name}**." + (f" (Quitado: {removed_names})" if removed_names else "")
+        else:
+            confirmation = f"Rol **{removed_names}** quitado."
+        await interaction.response.send_message(confirmation, ephemeral=True)
+
+        log.info(f"Roles de SO de {member.display_name} cambiados por el selector: +{role.name if role else '-'} -{removed_names or '-'}.",
+                 extra={'guild_id': guild.id, 'user_id': member.id, 'role_id': role.id if role else None})
+        logging_cog = self.bot.get_cog("LoggingCog")
+        log_channel = logging_cog.get_log_channel(guild.id) if logging_cog else None
+        if log_channel:
+            await log_channel.send(
+                f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
+                f"Selector de SO: **{member.display_name}** (ID: {member.id}) "
+                + (f"obtiene el rol **{role.name}**" if role else "queda sin rol de SO")
+                + (f" (quitado: **{removed_names}**)." if role and removed_names else ".")
+            )
 
     async def _remove_other_os_roles(self, member, current_role_id_to_keep):
         """
@@ -30,7 +223,7 @@ class ReactionRolesCog(commands.Cog):
         guild = member.guild
         roles_to_remove = []
         
-        all_os_role_ids = list(EMOJI_ROLE_MAP.values())
+        all_os_role_ids = list(emoji_roles_for(guild.id).values())
 
         for os_role_id in all_os_role_ids:
             if os_role_id == current_role_id_to_keep:
@@ -44,19 +237,20 @@ class ReactionRolesCog(commands.Cog):
             try:
                 await member.remove_roles(*roles_to_remove)
                 removed_names = ", ".join([r.name for r in roles_to_remove])
-                print(f"Log: Roles '{removed_names}' eliminados de {member.display_name} para asegurar selección única de SO.")
+                log.info(f"Roles '{removed_names}' eliminados de {member.display_name} para asegurar selección única de SO.")
                 
                 logging_cog = self.bot.get_cog("LoggingCog")
-                if logging_cog and logging_cog.log_channel:
-                    await logging_cog.log_channel.send(
+                log_channel = logging_cog.get_log_channel(guild.id) if logging_cog else None
+                if log_channel:
+                    await log_channel.send(
                         f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
                         f"Roles **{removed_names}** eliminados de **{member.display_name}** (ID: {member.id}) "
                         f"para mantener una única selección de SO."
                     )
             except discord.Forbidden:
-                print(f"Log: ERROR: No tengo permisos para eliminar roles al asegurar selección única de {member.display_name}. Verifique la jerarquía de roles del bot.")
+                log.error(f"No tengo permisos para eliminar roles al asegurar selección única de {member.display_name}. Verifique la jerarquía de roles del bot.")
             except Exception as e:
-                print(f"Log: ERROR desconocido al intentar eliminar roles para selección única: {e}")
+                log.error(f"Error desconocido al intentar eliminar roles para selección única: {e}")
 
     async def _clear_other_reactions_for_user(self, message, user, correct_emoji_str):
         """
@@ -67,53 +261,113 @@ class ReactionRolesCog(commands.Cog):
             # Siempre obtenemos el mensaje fresco para trabajar con las reacciones más actuales.
             fresh_message = await message.channel.fetch_message(message.id)
         except (discord.NotFound, discord.Forbidden) as e:
-            print(f"Log: ERROR: No se pudo obtener el mensaje fresco para limpiar reacciones: {e}")
+            log.error(f"No se pudo obtener el mensaje fresco para limpiar reacciones: {e}")
             return
 
+        emoji_roles = emoji_roles_for(message.guild.id)
         for reaction in fresh_message.reactions:
-            if str(reaction.emoji) in EMOJI_ROLE_MAP and str(reaction.emoji) != correct_emoji_str:
+            if str(reaction.emoji) in emoji_roles and str(reaction.emoji) != correct_emoji_str:
                 try:
                     await reaction.remove(user)
-                    print(f"Log: Reacción '{reaction.emoji}' de {user.display_name} eliminada para asegurar selección única visual.")
+                    log.debug(f"Reacción '{reaction.emoji}' de {user.display_name} eliminada para asegurar selección única visual.")
                     await asyncio.sleep(0.1) 
                 except discord.NotFound:
                     pass
                 except discord.Forbidden:
-                    print(f"Log: ERROR: No tengo permisos para eliminar reacciones de {user.display_name}. Verifique el permiso 'Gestionar Mensajes' del bot.")
+                    log.error(f"No tengo permisos para eliminar reacciones de {user.display_name}. Verifique el permiso 'Gestionar Mensajes' del bot.")
                 except Exception as e:
-                    print(f"Log: ERROR desconocido al limpiar la reacción '{reaction.emoji}': {e}")
+                    log.error(f"Error desconocido al limpiar la reacción '{reaction.emoji}': {e}")
 
 
+    def _load_saved_message_ids(self):
+        """Returns {guild_id: reaction message ID} saved in CONFIG_FILE."""
+        try:
+            config = load_document(CONFIG_FILE)
+        except FileNotFoundError:
+            return {}
+        except json.JSONDecodeError:
+            log.error(f"Error al decodificar {CONFIG_FILE}. Se usa el message_id configurado.")
+            return {}
+        if 'reaction_message_id' in config: # Formato antiguo de un solo servidor
+            config = {str(PRIMARY_GUILD_ID): config}
+        return {int(guild_id): saved.get('reaction_message_id') for guild_id, saved in config.items()}
+
+    def _save_message_id(self, guild_id, message_id):
+        saved = self._load_saved_message_ids()
+        saved[guild_id] = message_id
+        save_document(CONFIG_FILE, {str(g): {'reaction_message_id': m} for g, m in saved.items()})
+
     @commands.Cog.listener()
     async def on_ready(self):
-        print(f'Cog "{self.qualified_name}" de Reaction Roles cargado y listo.')
+        log.info(f'Cog "{self.qualified_name}" de Reaction Roles cargado y listo.')
         
-        reaction_channel = self.bot.get_channel(REACTION_CHANNEL_ID)
-        if not reaction_channel:
-            print(f"Log: ADVERTENCIA: Canal de reacción con ID {REACTION_CHANNEL_ID} no encontrado o no accesible. Verifique la ID y permisos.")
-            return
+        for guild_id in guild_config.guild_ids('reaction_roles'):
+            settings = guild_config.section(guild_id, 'reaction_roles')
+            if not sharding.owns_guild(guild_id):
+                # Los eventos de ese servidor llegan a otro worker; solo se registra su mensaje
+                if picker_style_for(settings) != 'reactions':
+                    continue # Los clics del selector se atienden en cualquier proceso, sin registrar nada
+                saved_message_id = self._load_saved_message_ids().get(guild_id) or settings.get('message_id')
+                if saved_message_id:
+                    self.message_guilds[saved_message_id] = guild_id
+                continue
+            reaction_channel_id = settings.get('channel_id')
+            reaction_channel = self.bot.get_channel(reaction_channel_id) if reaction_channel_id else None
+            if not reaction_channel:
+                log.warning(f"Canal de reacción con ID {reaction_channel_id} no encontrado o no accesible. Verifique la ID y permisos.")
+                continue
 
-        global REACTION_MESSAGE_ID 
+            await self._publish_message(reaction_channel, settings)
+
+    async def _publish_message(self, reaction_channel, settings):
+        # Un solo proceso a la vez crea/configura el mensaje (reconexiones, workers)
+        async with state_lock(CONFIG_FILE, reaction_channel.id):
+            await self._setup_reaction_message(reaction_channel, settings)
+        reaction_message = self.reaction_messages.get(reaction_channel.guild.id)
+        self.healer.track(reaction_channel.id, reaction_message.id if reaction_message else None)
+
+    async def _heal_panel(self, channel_id):
+        """Re-creates the role message of `channel_id` after it was deleted (persisting the new ID)."""
+        channel = self.bot.get_channel(channel_id)
+        if channel:
+            self.message_guilds = {m: g for m, g in self.message_guilds.items() if g != channel.guild.id}
+            await self._publish_message(channel, guild_config.section(channel.guild.id, 'reaction_roles'))
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self.healer.deleted((payload.message_id,))
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        self.healer.deleted(payload.message_ids)
+
+    async def _setup_reaction_message(self, reaction_channel, settings):
+        style = picker_style_for(settings)
+        if style != 'reactions':
+            await self._setup_picker_message(reaction_channel, settings, style)
+            return
+        guild_id = reaction_channel.guild.id
+        reaction_message_id = self._load_saved_message_ids().get(guild_id) or settings.get('message_id')
+        reaction_message = None
         
         # Intentar obtener el mensaje existente si la ID está configurada
-        if REACTION_MESSAGE_ID is not None:
+        if reaction_message_id is not None:
             try:
-                self.reaction_message = await reaction_channel.fetch_message(REACTION_MESSAGE_ID)
-                print(f"Log: Mensaje de reacción EXISTENTE obtenido. ID: {REACTION_MESSAGE_ID}")
+                reaction_message = await reaction_channel.fetch_message(reaction_message_id)
+                log.debug(f"Mensaje de reacción EXISTENTE obtenido. ID: {reaction_message_id}")
             except discord.NotFound:
-                print(f"Log: ADVERTENCIA: Mensaje de reacción con ID {REACTION_MESSAGE_ID} no encontrado en el canal {REACTION_CHANNEL_ID}.")
-                print(f"Log: Se procederá a crear un nuevo mensaje.")
-                REACTION_MESSAGE_ID = None # <--- ¡Resetear a None para que el bot cree uno nuevo!
+                log.warning(f"Mensaje de reacción con ID {reaction_message_id} no encontrado en el canal {reaction_channel.id}. Se procederá a crear un nuevo mensaje.")
+                reaction_message_id = None # <--- ¡Resetear a None para que el bot cree uno nuevo!
             except discord.Forbidden:
-                print(f"Log: ERROR: No tengo permisos para leer el historial del canal {REACTION_CHANNEL_ID}. Verifique los permisos 'Leer Historial de Mensajes'.")
+                log.error(f"No tengo permisos para leer el historial del canal {reaction_channel.id}. Verifique los permisos 'Leer Historial de Mensajes'.")
                 return # Si no hay permisos para leer, no podemos hacer nada.
             except Exception as e:
-                print(f"Log: ERROR desconocido al obtener el mensaje de reacción: {e}")
+                log.error(f"Error desconocido al obtener el mensaje de reacción: {e}")
                 return
 
-        # Si REACTION_MESSAGE_ID es None (porque lo era desde el inicio o porque el mensaje no se encontró),
+        # Si reaction_message_id es None (porque lo era desde el inicio o porque el mensaje no se encontró),
         # entonces creamos un nuevo mensaje.
-        if REACTION_MESSAGE_ID is None:
+        if reaction_message_id is None:
             try:
                 embed = discord.Embed(
                     title="Selecciona tu Sistema Operativo",
@@ -126,38 +380,89 @@ class ReactionRolesCog(commands.Cog):
                 embed.add_field(name="🍓 Raspberry Pi", value="Reacciona para obtener el rol de **Raspberry Pi**.", inline=False)
                 embed.set_footer(text="Haz clic en una reacción para obtener el rol, o desclic para quitarlo.\n(Solo puedes tener un rol de SO a la vez).")
 
-                self.reaction_message = await reaction_channel.send(embed=embed)
-                REACTION_MESSAGE_ID = self.reaction_message.id
-                print(f"Log: Mensaje de reacción ENVIADO EXITOSAMENTE. ID: {REACTION_MESSAGE_ID}")
-                print(f"Log: ¡¡¡IMPORTANTE!!! Por favor, actualiza la variable REACTION_MESSAGE_ID en este archivo (cogs/reaction_roles_cog.py)")
-                print(f"Log: con la ID: {REACTION_MESSAGE_ID} y REINICIA el bot para que funcione correctamente en futuros inicios.")
+                reaction_message = await reaction_channel.send(embed=embed)
+                reaction_message_id = reaction_message.id
+                self._save_message_id(guild_id, reaction_message_id)
+                log.info(f"Mensaje de reacción ENVIADO EXITOSAMENTE. ID: {reaction_message_id} (guardada en {CONFIG_FILE}; se usará en futuros inicios).")
 
             except discord.Forbidden:
-                print(f"Log: ERROR: No tengo permisos para enviar mensajes en el canal {REACTION_CHANNEL_ID}. Verifique los permisos 'Enviar Mensajes'.")
+                log.error(f"No tengo permisos para enviar mensajes en el canal {reaction_channel.id}. Verifique los permisos 'Enviar Mensajes'.")
                 return
             except Exception as e:
-                print(f"Log: ERROR al enviar el mensaje de reacción: {e}")
+                log.error(f"Error al enviar el mensaje de reacción: {e}")
                 return
         
-        # Si self.reaction_message está definido (ya sea uno existente o uno nuevo), añadimos las reacciones
-        if self.reaction_message:
-            for emoji_str in EMOJI_ROLE_MAP.keys():
+        # Si reaction_message está definido (ya sea uno existente o uno nuevo), añadimos las reacciones
+        if reaction_message:
+            self.reaction_messages[guild_id] = reaction_message
+            self.message_guilds[reaction_message.id] = guild_id
+            for emoji_str in settings.get('emoji_roles', {}).keys():
                 try:
                     found_reaction = False
-                    for reaction in self.reaction_message.reactions:
+                    for reaction in reaction_message.reactions:
                         if str(reaction.emoji) == emoji_str and reaction.me: 
                             found_reaction = True
                             break
                     if not found_reaction:
-                        await self.reaction_message.add_reaction(emoji_str)
-                        print(f"Log: Reacción '{emoji_str}' añadida por el bot a mensaje {self.reaction_message.id}.")
+                        await reaction_message.add_reaction(emoji_str)
+                        log.debug(f"Reacción '{emoji_str}' añadida por el bot a mensaje {reaction_message.id}.")
                 except discord.HTTPException as e:
                     if "Already added" not in str(e): 
-                        print(f"Log: Advertencia/Error al añadir reacción '{emoji_str}' a mensaje {self.reaction_message.id}: {e}")
+                        log.warning(f"Error al añadir reacción '{emoji_str}' a mensaje {reaction_message.id}: {e}")
                 except Exception as e:
-                    print(f"Log: Error inesperado al añadir reacción '{emoji_str}': {e}")
+                    log.error(f"Error inesperado al añadir reacción '{emoji_str}': {e}")
         else:
-            print("Log: No se pudo configurar el mensaje de reacción para añadir emojis (objeto de mensaje no disponible).")
+            log.info("No se pudo configurar el mensaje de reacción para añadir emojis (objeto de mensaje no disponible).")
+
+    async def _setup_picker_message(self, channel, settings, style):
+        """
+        Publishes the select menu / buttons picker, reusing the configured message when the bot sent
+        it: a reaction message (REACTION_MESSAGE_ID) is edited in place and its reactions cleared.
+        """
+        guild = channel.guild
+        message_id = self._load_saved_message_ids().get(guild.id) or settings.get('message_id')
+        message = None
+        if message_id is not None:
+            try:
+                message = await channel.fetch_message(message_id)
+            except discord.NotFound:
+                log.warning(f"Mensaje del selector de SO con ID {message_id} no encontrado en el canal {channel.id}. Se creará uno nuevo.")
+            except discord.Forbidden:
+                log.error(f"No tengo permisos para leer el historial del canal {channel.id}. Verifique los permisos 'Leer Historial de Mensajes'.")
+                return
+            except Exception as e:
+                log.error(f"Error desconocido al obtener el mensaje del selector de SO: {e}")
+                return
+        if message and message.author.id != self.bot.user.id:
+            log.warning(f"El mensaje {message.id} no lo envió el bot y no se puede editar. Se publica un selector nuevo; el antiguo puede borrarse.")
+            message = None
+
+        emoji_roles = settings.get('emoji_roles', {})
+        expected = (style, [role_id for role_id in emoji_roles.values() if guild.get_role(role_id)])
+        embed, view = build_os_picker(guild, emoji_roles, style)
+        try:
+            if message is None:
+                message = await channel.send(embed=embed, view=view)
+                self._save_message_id(guild.id, message.id)
+                log.info(f"Selector de SO ({style}) ENVIADO. ID: {message.id} (guardada en {CONFIG_FILE}).")
+            elif picker_signature(message) != expected:
+                await message.edit(embed=embed, view=view)
+                log.info(f"Mensaje {message.id} convertido al selector de SO ({style}).")
+        except discord.Forbidden:
+            log.error(f"No tengo permisos para enviar o editar mensajes en el canal {channel.id}. Verifique los permisos 'Enviar Mensajes'.")
+            return
+        except Exception as e:
+            log.error(f"Error al publicar el selector de SO: {e}")
+            return
+
+        if message.reactions: # Reacciones que quedan del modo anterior
+            try:
+                await message.clear_reactions()
+            except discord.Forbidden:
+                log.warning(f"No tengo permiso 'Gestionar Mensajes' para quitar las reacciones antiguas del mensaje {message.id}.")
+            except discord.HTTPException as e:
+                log.warning(f"No se pudieron quitar las reacciones antiguas del mensaje {message.id}: {e}")
+        self.reaction_messages[guild.id] = message
 
 
     @commands.Cog.listener()
@@ -166,7 +471,7 @@ class ReactionRolesCog(commands.Cog):
         Se ejecuta cuando un usuario añade una reacción a un mensaje.
         Asigna el rol correspondiente y quita los demás roles y reacciones del SO para selección única.
         """
-        if payload.message_id != REACTION_MESSAGE_ID:
+        if self.message_guilds.get(payload.message_id) != payload.guild_id:
             return
 
         if payload.user_id == self.bot.user.id:
@@ -182,7 +487,7 @@ class ReactionRolesCog(commands.Cog):
         if not member: return
 
         emoji_identifier = str(payload.emoji)
-        role_id_to_add = EMOJI_ROLE_MAP.get(emoji_identifier)
+        role_id_to_add = emoji_roles_for(guild.id).get(emoji_identifier)
 
         if role_id_to_add:
             role_to_add = guild.get_role(role_id_to_add)
@@ -192,25 +497,28 @@ class ReactionRolesCog(commands.Cog):
                 if role_to_add not in member.roles:
                     try:
                         await member.add_roles(role_to_add)
-                        print(f"Log: Rol '{role_to_add.name}' añadido a {member.display_name} por reacción '{emoji_identifier}'.")
+                        log.info(f"Rol '{role_to_add.name}' añadido a {member.display_name} por reacción '{emoji_identifier}'.",
+                                 extra={'guild_id': guild.id, 'user_id': member.id, 'role_id': role_to_add.id})
                         logging_cog = self.bot.get_cog("LoggingCog")
-                        if logging_cog and logging_cog.log_channel:
-                            await logging_cog.log_channel.send(
+                        log_channel = logging_cog.get_log_channel(guild.id) if logging_cog else None
+                        if log_channel:
+                            await log_channel.send(
                                 f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
                                 f"Rol **{role_to_add.name}** añadido a **{member.display_name}** (ID: {member.id}) "
                                 f"por reacción '{emoji_identifier}' en mensaje ID {payload.message_id}."
                             )
                     except discord.Forbidden:
-                        print(f"Log: ERROR: No tengo permisos para añadir el rol '{role_to_add.name}' a {member.display_name}. Verifique la jerarquía de roles del bot.")
+                        log.error(f"No tengo permisos para añadir el rol '{role_to_add.name}' a {member.display_name}. Verifique la jerarquía de roles del bot.")
                     except Exception as e:
-                        print(f"Log: ERROR desconocido al añadir rol por reacción: {e}")
+                        log.error(f"Error desconocido al añadir rol por reacción: {e}")
 
-                if self.reaction_message:
-                    await self._clear_other_reactions_for_user(self.reaction_message, member, emoji_identifier)
+                reaction_message = self.reaction_messages.get(guild.id)
+                if reaction_message:
+                    await self._clear_other_reactions_for_user(reaction_message, member, emoji_identifier)
                 else:
-                    print(f"Log: Advertencia: No se pudo limpiar reacciones redundantes porque reaction_message no está disponible.")
+                    log.warning("No se pudo limpiar reacciones redundantes porque reaction_message no está disponible.")
             else:
-                print(f"Log: ADVERTENCIA: Rol con ID {role_id_to_add} no encontrado en el gremio para emoji '{emoji_identifier}'.")
+                log.warning(f"Rol con ID {role_id_to_add} no encontrado en el gremio para emoji '{emoji_identifier}'.")
 
 
     @commands.Cog.listener()
@@ -219,7 +527,7 @@ class ReactionRolesCog(commands.Cog):
         Se ejecuta cuando un usuario elimina una reacción de un mensaje.
         Quita el rol correspondiente.
         """
-        if payload.message_id != REACTION_MESSAGE_ID:
+        if self.message_guilds.get(payload.message_id) != payload.guild_id:
             return
 
         if payload.user_id == self.bot.user.id:
@@ -237,7 +545,7 @@ class ReactionRolesCog(commands.Cog):
         
         emoji_identifier = str(payload.emoji)
 
-        role_id_to_remove = EMOJI_ROLE_MAP.get(emoji_identifier)
+        role_id_to_remove = emoji_roles_for(guild.id).get(emoji_identifier)
 
         if role_id_to_remove:
             role_to_remove = guild.get_role(role_id_to_remove)
@@ -245,20 +553,22 @@ class ReactionRolesCog(commands.Cog):
                 if role_to_remove in member.roles:
                     try:
                         await member.remove_roles(role_to_remove)
-                        print(f"Log: Rol '{role_to_remove.name}' eliminado de {member.display_name} por quitar reacción '{emoji_identifier}'.")
+                        log.info(f"Rol '{role_to_remove.name}' eliminado de {member.display_name} por quitar reacción '{emoji_identifier}'.",
+                                 extra={'guild_id': guild.id, 'user_id': member.id, 'role_id': role_to_remove.id})
                         logging_cog = self.bot.get_cog("LoggingCog")
-                        if logging_cog and logging_cog.log_channel:
-                            await logging_cog.log_channel.send(
+                        log_channel = logging_cog.get_log_channel(guild.id) if logging_cog else None
+                        if log_channel:
+                            await log_channel.send(
                                 f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] "
                                 f"Rol **{role_to_remove.name}** eliminado de **{member.display_name}** (ID: {member.id}) "
                                 f"por quitar reacción '{emoji_identifier}' en mensaje ID {payload.message_id}."
                             )
                     except discord.Forbidden:
-                        print(f"Log: ERROR: No tengo permisos para eliminar el rol '{role_to_remove.name}' de {member.display_name}. Verifique la jerarquía de roles del bot.")
+                        log.error(f"No tengo permisos para eliminar el rol '{role_to_remove.name}' de {member.display_name}. Verifique la jerarquía de roles del bot.")
                     except Exception as e:
-                        print(f"Log: ERROR al eliminar rol por reacción: {e}")
+                        log.error(f"Error al eliminar rol por reacción: {e}")
             else:
-                print(f"Log: ADVERTENCIA: Rol con ID {role_id_to_remove} no encontrado en el gremio para emoji '{emoji_identifier}'.")
+                log.warning(f"Rol con ID {role_id_to_remove} no encontrado en el gremio para emoji '{emoji_identifier}'.")
 
 async def setup(bot):
     await bot.add_cog(ReactionRolesCog(bot))
\ No newline at end of file
@@ -2,11 +2,28 @@
 import discord
 from discord.ext import commands
 import datetime
+import logging
 import json
-import hashlib
+from utils.runtime import load_json_file, content_hash
+from utils.state_store import load_document, save_document, refresh_document_key, state_lock
 import asyncio
 import os
 import io
+import time
+import collections
+from discord.ext import tasks
+from utils.transcript_store import TranscriptStore
+from utils.ticket_stats import TicketStats, LogHistogram, format_duration
+from utils.deadline_scheduler import DeadlineScheduler
+from utils.category_allocator import CategoryAllocator
+from utils.attachment_archive import AttachmentMirror
+from utils.outbox import get_outbox, is_transient, send_durably
+from utils.closure_jobs import ClosureJournal, WorkerPool
+from utils.panel_healing import PanelHealer
+from utils import sharding
+from utils.guild_config import guild_config, PRIMARY_GUILD_ID
+
+log = logging.getLogger(__name__)
 
 # --- CONFIGURATION IDs ---
 # Dictionary mapping support channel IDs to their display names for the message
@@ -25,8 +42,19 @@ SUPPORT_CHANNELS = {
 
 ARCHIVE_CHANNEL_ID = 1382761178551291924 # ID of the channel where tickets will be archived
 
+# Ticket backend: "channel" (a private text channel per ticket) or "thread" (a private thread
+# in the originating support channel, archived and locked on close instead of deleted).
+TICKET_BACKEND = "channel"
+THREAD_TICKET_PARENT_ID = None # Optional dedicated channel for ticket threads (None = the support channel)
+THREAD_AUTO_ARCHIVE_MINUTES = 10080 # 7 days; idle auto-close normally acts first
+
 # ID de la categoría donde se crearán los canales de ticket
 TICKET_CATEGORY_ID = 1382766193232056340
+# Discord limita cada categoría a 50 canales. Al llenarse se crean categorías de desbordamiento
+# ("<nombre> (overflow N)") con los mismos permisos, y se borran cuando vuelven a quedar vacías.
+TICKET_CATEGORY_CAPACITY = 50
+OVERFLOW_CATEGORY_MARKER = " (overflow"
+OVERFLOW_COLLAPSE_DELAY = 300 # Seconds an overflow category must stay empty before it is deleted
 
 # IDs de los roles de administrador/moderador que deben tener acceso a los tickets.
 ADMIN_OR_MOD_ROLE_IDS = [
@@ -42,41 +70,233 @@ CONFIG_FILE = 'config/tickets_config.json' # File to save message IDs and hashes
 # Max messages to fetch for transcript to prevent timeouts on very long tickets
 MAX_TRANSCRIPT_MESSAGES = 1000 
 
-# --- Views for Ticket Creation Buttons ---
+# Ticket types offered in each support channel panel (buttons or select menu)
+TICKET_TYPES_FILE = 'config/ticket_types_config.json'
+MAX_TICKET_TYPE_BUTTONS = 25 # Discord limit (5 rows x 5 buttons); larger lists are rendered as a select menu
+MAX_TICKET_TYPE_OPTIONS = 25 # Discord limit of options in a select menu; extra types are left out of the panel
+
+# Local searchable archive of closed tickets (SQLite + full-text index)
+TRANSCRIPT_DB_FILE = 'data/transcripts.db'
+TRANSCRIPT_COMPRESS_AFTER_DAYS = 30 # Transcripts older than this are stored compressed
+TRANSCRIPT_RETENTION_DAYS = 365 # Transcripts older than this are deleted from the local archive
+TRANSCRIPT_SEARCH_LIMIT = 10 # Max results returned by !ticketsearch
+
+# Copia de los adjuntos (los enlaces del CDN de Discord caducan) en un zip junto al transcript,
+# que se sube al canal de archivo y se guarda en ATTACHMENT_ARCHIVE_DIR. Desactivado por defecto.
+ATTACHMENT_MIRRORING = False
+ATTACHMENT_ARCHIVE_DIR = 'data/attachments'
+ATTACHMENT_POOL_SIZE = 8 # HTTP connections shared by all tickets
+ATTACHMENT_CONCURRENCY_PER_TICKET = 3 # Simultaneous downloads per ticket
+ATTACHMENT_MAX_TICKET_BYTES = 24 * 1024 * 1024 # Per ticket; also capped by the server's upload limit
+ATTACHMENT_MAX_FILE_BYTES = 10 * 1024 * 1024 # Larger attachments keep only their URL
+
+# Pool of hidden, pre-created ticket channels claimed with a single edit (0 disables the pool)
+TICKET_POOL_SIZE = 0
+TICKET_POOL_PREFIX = "ticket-pool-"
+TICKET_POOL_REFILL_INTERVAL = 5 # Seconds between pool channel creations
+
+# Closures run as journaled jobs on a small worker pool; after a restart they resume from the last completed step
+CLOSURE_JOURNAL_FILE = 'data/closure_jobs.db'
+CLOSURE_STEPS = ('transcript', 'archive', 'index', 'log', 'dm', 'delete')
+CLOSURE_WORKERS = 2 # Closures running at the same time (each one pages through its ticket's history)
+CLOSURE_QUEUE_SIZE = 50 # Closures waiting for a worker; beyond this new closure requests are refused
+CLOSURE_MAX_ATTEMPTS = 3 # Failed runs of a closure before giving up (the ticket stays open)
+CLOSURE_RETRY_DELAY = 30 # Seconds before retrying a failed closure
+CLOSURE_BUSY_MESSAGE = "Too many tickets are being closed right now. Please click 'Close Ticket' again in a minute."
+
+# Support KPIs (open tickets per category, response/close times, status ratio)
+STATS_FILE = 'config/ticket_stats.json'
+STATS_SAVE_DELAY = 5 # Seconds to gather frequent stats changes (bot message IDs, first replies) into a single write
+STATS_DIGEST_TIME = datetime.time(hour=9, tzinfo=datetime.timezone.utc) # Daily digest to the log channel
+
+# Inactivity timeouts (hours without messages). Set IDLE_CLOSE_HOURS = 0 to disable auto-close.
+IDLE_WARN_HOURS = 48 # Post a warning in the ticket after this much silence
+IDLE_CLOSE_HOURS = 72 # Close the ticket as "unresolved" after this much silence
+
+# Valores del servidor principal. Otros servidores definen support_channels ({channel_id: nombre}),
+# archive_channel_id, category_id, staff_role_ids y thread_parent_id en config/guilds_config.json
+# (sección "tickets"); los tiempos, el pool y el backend son comunes a todos.
+guild_config.register_defaults('tickets', {
+    'support_channels': SUPPORT_CHANNELS,
+    'archive_channel_id': ARCHIVE_CHANNEL_ID,
+    'category_id': TICKET_CATEGORY_ID,
+    'staff_role_ids': ADMIN_OR_MOD_ROLE_IDS,
+    'thread_parent_id': THREAD_TICKET_PARENT_ID
+})
+
+
+def ticket_settings(guild_id):
+    """'tickets' settings of a guild (empty if it has no ticket system)."""
+    return guild_config.section(guild_id, 'tickets') or {}
+
+
+def support_channels_of(guild_id):
+    """{support channel ID: display name} of a guild (JSON keys are strings, converted here)."""
+    return {int(channel_id): name for channel_id, name in ticket_settings(guild_id).get('support_channels', {}).items()}
+
+
+def parse_ticket_topic(topic):
+    """
+    Extracts the ticket metadata stored in a ticket channel topic.
+    Topic format: "Support ticket for Display Name (ID: 1234567890) regarding a App Problem. Source: General Support."
+    (The "Source" part is missing on tickets opened before it was added.)
+    """
+    info = {'creator_name': None, 'creator_id': None, 'problem_type': None, 'source_channel': None}
+    if not topic:
+        return info
+    start_name_idx = topic.find("for ")
+    id_idx = topic.find(" (ID: ")
+    if start_name_idx != -1 and id_idx != -1 and start_name_idx < id_idx:
+        info['creator_name'] = topic[start_name_idx + len("for "):id_idx].strip()
+    if id_idx != -1:
+        end_id_idx = topic.find(")", id_idx)
+        try:
+            info['creator_id'] = int(topic[id_idx + len(" (ID: "):end_id_idx])
+        except ValueError:
+            pass
+    type_idx = topic.find("regarding a ")
+    if type_idx != -1:
+        end_type_idx = topic.find(".", type_idx)
+        info['problem_type'] = topic[type_idx + len("regarding a "):end_type_idx if end_type_idx != -1 else None].strip()
+    source_idx = topic.find("Source: ")
+    if source_idx != -1:
+        info['source_channel'] = topic[source_idx + len("Source: "):].rstrip(".").strip()
+    return info
+
+
+def transcript_entry(message):
+    """Structured transcript entry of a message (rendered to text by format_transcript_entry)."""
+    return {
+        'message_id': message.id,
+        'created_at': message.created_at,
+        'author_name': message.author.display_name,
+        'author_id': message.author.id,
+        'content': message.content,
+        'attachments': list(message.attachments),
+    }
+
+
+def format_transcript_entry(entry, mirrored=None, skipped=None):
+    """Transcript text of an entry. `mirrored`/`skipped` annotate attachments copied (or not) into the ticket zip."""
+    text = f"[{entry['created_at'].strftime('%Y-%m-%d %H:%M:%S')}] {entry['author_name']} ({entry['author_id']}): {entry['content']}\n"
+    for attachment in entry['attachments']:
+        if mirrored and attachment.id in mirrored:
+            text += f"        Attachment: {attachment.url} (archived as {mirrored[attachment.id]})\n"
+        elif skipped and attachment.id in skipped:
+            text += f"        Attachment: {attachment.url} (not archived: {skipped[attachment.id]})\n"
+        else:
+            text += f"        Attachment: {attachment.url}\n"
+    return text
 
-# Define the view for the main ticket creation message in support channels
-class TicketCreationView(discord.ui.View):
-    def __init__(self, cog_instance: commands.Cog):
-        super().__init__(timeout=None) # Keep view persistent even after bot restarts
-        self.cog = cog_instance # Reference to the cog instance to call its methods
+
+def format_utc(timestamp):
+    return datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')
+
+
+def is_legacy_bot_chrome(message):
+    """Welcome/confirmation/status messages of tickets opened before their IDs were recorded."""
+    if message.embeds and message.embeds[0].title and (
+        "Welcome to your" in message.embeds[0].title or "Confirm Ticket Closure" in message.embeds[0].title
+    ):
+        return True
+    if message.content and "Ticket closure confirmed as" in message.content:
+        return True
+    return any(
+        c.custom_id and (c.custom_id == "ticket_close_button" or c.custom_id.startswith("ticket_confirm:"))
+        for row in message.components for c in row.children
+    )
+
+
+def is_staff_member(member):
+    """True if the member is a server administrator or has one of the staff roles of its server."""
+    if member.guild_permissions.administrator:
+        return True
+    staff_role_ids = ticket_settings(member.guild.id).get('staff_role_ids', ())
+    return any(role.id in staff_role_ids for role in member.roles)
+
+async def reject_if_draining(interaction: discord.Interaction) -> bool:
+    """While the bot shuts down, new ticket interactions are refused (in-flight closures still finish)."""
+    cog = interaction.client.get_cog("TicketsCog")
+    if cog and cog.draining:
+        await interaction.response.send_message("The bot is restarting. Please try again in a minute.", ephemeral=True)
+        return True
+    return False
+
+
+# --- Components for Ticket Creation ---
+
+# Ticket types are defined in TICKET_TYPES_FILE (default + per support channel overrides) and
+# rendered as buttons or a select menu. One DynamicItem per component kind parses the custom_id
+# ("ticket_open:<type_key>") and routes the click with a dict lookup. The old hard-coded
+# custom_ids ("ticket_app_problem", ...) are still accepted until the panels get re-edited.
+class TicketTypeButton(discord.ui.DynamicItem[discord.ui.Button], template=r'ticket_open:(?P<key>[\w-]+)|ticket_(?P<legacy>app|web|discord)_problem'):
+    def __init__(self, type_key: str, label: str = "Open Ticket", emoji: str = None):
+        self.type_key = type_key
+        super().__init__(
+            discord.ui.Button(label=label, style=discord.ButtonStyle.blurple, emoji=emoji, custom_id=f"ticket_open:{type_key}")
+        )
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["key"] or f"{match['legacy']}_problem")
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         # Prevent bots from creating tickets (including this bot itself)
         if interaction.user.bot:
             await interaction.response.send_message("Bots cannot create tickets.", ephemeral=True)
             return False
-        return True
+        return not await reject_if_draining(interaction)
 
-    # Callback for App Problem button
-    @discord.ui.button(label="App Problem", style=discord.ButtonStyle.blurple, custom_id="ticket_app_problem", emoji="💻")
-    async def app_problem_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+    async def callback(self, interaction: discord.Interaction):
         # Always defer immediately to prevent "interaction failed" due to Discord's 3-second rule
         await interaction.response.defer(ephemeral=True)
-        await self.cog.create_ticket_channel(interaction, "App Problem")
+        cog = interaction.client.get_cog("TicketsCog")
+        if cog:
+            await cog.open_ticket_from_panel(interaction, self.type_key)
+
+
+class TicketTypeSelect(discord.ui.DynamicItem[discord.ui.Select], template=r'ticket_open_select'):
+    def __init__(self, options: list = None):
+        super().__init__(
+            discord.ui.Select(
+                placeholder="Select the type of problem...",
+                options=options or [discord.SelectOption(label="Open Ticket", value="none")],
+                custom_id="ticket_open_select"
+            )
+        )
 
-    # Callback for Web Problem button
-    @discord.ui.button(label="Web Problem", style=discord.ButtonStyle.blurple, custom_id="ticket_web_problem", emoji="🌐")
-    async def web_problem_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Always defer immediately
-        await interaction.response.defer(ephemeral=True)
-        await self.cog.create_ticket_channel(interaction, "Web Problem")
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls()
 
-    # Callback for Discord Problem button
-    @discord.ui.button(label="Discord Problem", style=discord.ButtonStyle.blurple, custom_id="ticket_discord_problem", emoji="💬")
-    async def discord_problem_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        # Always defer immediately
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.bot:
+            await interaction.response.send_message("Bots cannot create tickets.", ephemeral=True)
+            return False
+        return not await reject_if_draining(interaction)
+
+    async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        await self.cog.create_ticket_channel(interaction, "Discord Problem")
+        type_key = interaction.data.get("values", [None])[0]
+        cog = interaction.client.get_cog("TicketsCog")
+        if cog:
+            await cog.open_ticket_from_panel(interaction, type_key)
+
+
+def build_ticket_creation_view(layout: dict) -> discord.ui.View:
+    """Builds the ticket creation components of a support panel from its ticket type layout."""
+    view = discord.ui.View(timeout=None)
+    if layout['style'] == 'select':
+        options = [
+            discord.SelectOption(label=t['label'], value=t['key'], emoji=t.get('emoji'), description=t.get('description', '')[:100] or None)
+            for t in layout['types']
+        ]
+        view.add_item(TicketTypeSelect(options))
+    else:
+        for ticket_type in layout['types']:
+            view.add_item(TicketTypeButton(ticket_type['key'], ticket_type['label'], ticket_type.get('emoji')))
+    view.stop() # Clicks are routed to the registered DynamicItems, not to this instance
+    return view
 
 
 # --- Views for Ticket Closure Buttons ---
@@ -89,14 +309,16 @@ class TicketCloseView(discord.ui.View):
         # Prevent bots from interacting with closure buttons
         if interaction.user.bot:
             return False
+        if await reject_if_draining(interaction):
+            return False
         
         # 1. Check if the user is an Administrator (highest permission)
         if interaction.user.guild_permissions.administrator:
             return True
 
-        # 2. Check if the user has one of the specified ADMIN_OR_MOD_ROLE_IDS
+        # 2. Check if the user has one of the staff roles of this server
         user_has_admin_mod_role = False
-        for role_id in ADMIN_OR_MOD_ROLE_IDS:
+        for role_id in ticket_settings(interaction.guild.id).get('staff_role_ids', ()):
             admin_mod_role = interaction.guild.get_role(role_id)
             if admin_mod_role and admin_mod_role in interaction.user.roles:
                 user_has_admin_mod_role = True
@@ -105,18 +327,8 @@ class TicketCloseView(discord.ui.View):
         if user_has_admin_mod_role:
             return True
 
-        # 3. Check if the user is the channel creator by parsing the topic
-        ticket_creator_id = None
-        if interaction.channel.topic:
-            try:
-                # Assuming topic format: "Support ticket for Display Name (ID: 1234567890)"
-                start_index = interaction.channel.topic.find("(ID: ")
-                if start_index != -1:
-                    end_index = interaction.channel.topic.find(")", start_index)
-                    if end_index != -1:
-                        ticket_creator_id = int(interaction.channel.topic[start_index + 5:end_index])
-            except ValueError:
-                pass # ID not found or not an integer
+        # 3. Check if the user is the ticket creator (channel topic or open-ticket index for threads)
+        ticket_creator_id = self.cog._get_ticket_info(interaction.channel)['creator_id']
 
         if ticket_creator_id == interaction.user.id:
             return True
@@ -137,26 +349,21 @@ class TicketCloseView(discord.ui.View):
             # Edita el mensaje original para deshabilitar los botones.
             await interaction.edit_original_response(view=self) 
         except discord.NotFound:
-            print("Log: Original message for close button not found, probably already deleted.")
+            log.info("Original message for close button not found, probably already deleted.")
         except discord.Forbidden:
-            print("Log: Bot lacks permissions to edit original message for close button.")
+            log.warning("Bot lacks permissions to edit original message for close button.")
         except Exception as e:
-            print(f"Log: Error editing original message to disable close button: {e}")
+            log.error(f"Error editing original message to disable close button: {e}")
 
-        # Extract ticket creator ID from channel topic
-        ticket_creator_id = None
-        if interaction.channel.topic and "(ID: " in interaction.channel.topic:
-            try:
-                ticket_creator_id = int(interaction.channel.topic.split('(ID: ')[1].split(')')[0])
-            except (ValueError, IndexError):
-                pass # Fallback to None
+        # Extract ticket creator ID from channel topic (or the open-ticket index for threads)
+        ticket_creator_id = self.cog._get_ticket_info(interaction.channel)['creator_id']
 
         # Determine if the closer is an admin/mod/server admin
         closer_is_admin_or_mod = False
         if interaction.user.guild_permissions.administrator:
             closer_is_admin_or_mod = True
         else:
-            for role_id in ADMIN_OR_MOD_ROLE_IDS:
+            for role_id in ticket_settings(interaction.guild.id).get('staff_role_ids', ()):
                 admin_mod_role = interaction.guild.get_role(role_id)
                 if admin_mod_role and admin_mod_role in interaction.user.roles:
                     closer_is_admin_or_mod = True
@@ -164,8 +371,10 @@ class TicketCloseView(discord.ui.View):
 
         if not closer_is_admin_or_mod and interaction.user.id == ticket_creator_id:
             # If the closer is NOT an admin/mod AND IS the creator, directly finalize as "user-closed"
-            await interaction.followup.send("Closing your ticket. Archiving the conversation...", ephemeral=True)
-            await self.cog.finalize_ticket_closure(interaction.channel, interaction.user, "user-closed", ticket_creator_id, closer_is_admin=False)
+            if await self.cog.finalize_ticket_closure(interaction.channel, interaction.user, "user-closed", ticket_creator_id, closer_is_admin=False):
+                await interaction.followup.send("Closing your ticket. Archiving the conversation...", ephemeral=True)
+            else:
+                await interaction.followup.send(CLOSURE_BUSY_MESSAGE, ephemeral=True)
         elif closer_is_admin_or_mod:
             # If the closer IS an admin/mod, show confirmation buttons to mark status
             confirmation_embed = discord.Embed(
@@ -174,14 +383,12 @@ class TicketCloseView(discord.ui.View):
                 color=discord.Color.orange()
             )
             
-            # Send a new message to the ticket channel with the confirmation buttons
-            # Create the view instance here to pass to the message, and then store the message in it.
-            confirmation_message_view = TicketClosureConfirmationView(self.cog, ticket_creator_id, closer_is_admin_or_mod)
+            # Send a new message to the ticket channel with the (stateless) confirmation buttons
             confirmation_message = await interaction.channel.send(
                 embed=confirmation_embed, 
-                view=confirmation_message_view 
+                view=build_confirmation_view(ticket_creator_id, closer_is_admin_or_mod)
             )
-            confirmation_message_view.message = confirmation_message # Attach the message to the view instance
+            self.cog._record_bot_message(interaction.channel, confirmation_message)
 
             await interaction.followup.send("Please confirm the ticket status in the channel.", ephemeral=True)
         else:
@@ -189,88 +396,95 @@ class TicketCloseView(discord.ui.View):
             await interaction.followup.send("You do not have permission to close this ticket in this manner.", ephemeral=True)
 
 
-class TicketClosureConfirmationView(discord.ui.View):
-    def __init__(self, cog_instance: commands.Cog, original_creator_id: int, closer_is_admin: bool):
-        super().__init__(timeout=600) # Timeout after 10 minutes
-        self.cog = cog_instance
-        self.original_creator_id = original_creator_id # To pass to the cog for DM
-        self.closer_is_admin = closer_is_admin # Pass this state to finalize_ticket_closure
-        self.message = None # To store the message this view is attached to
+# Stateless confirmation buttons: all the state lives in the custom_id
+# ("ticket_confirm:<status>:<creator_id>:<closer_is_admin>") and one DynamicItem class registered
+# at startup handles every pending confirmation, so nothing is kept in memory and restarts are harmless.
+CONFIRMATION_TIMEOUT_SECONDS = 600 # Confirmation buttons expire 10 minutes after the message was posted
+
+CONFIRMATION_BUTTONS = {
+    "solved": {"label": "Mark as Solved", "style": discord.ButtonStyle.green, "emoji": "✅"},
+    "unresolved": {"label": "Mark as Unresolved", "style": discord.ButtonStyle.red, "emoji": "❌"},
+}
+
+
+class TicketClosureConfirmButton(discord.ui.DynamicItem[discord.ui.Button], template=r'ticket_confirm:(?P<status>solved|unresolved):(?P<creator_id>\d+):(?P<closer_is_admin>[01])'):
+    def __init__(self, status: str, original_creator_id: int, closer_is_admin: bool, disabled: bool = False):
+        self.status = status
+        self.original_creator_id = original_creator_id # To pass to the cog for DM (None is encoded as 0)
+        self.closer_is_admin = closer_is_admin
+        button_info = CONFIRMATION_BUTTONS[status]
+        super().__init__(
+            discord.ui.Button(
+                label=button_info["label"],
+                style=button_info["style"],
+                emoji=button_info["emoji"],
+                disabled=disabled,
+                custom_id=f"ticket_confirm:{status}:{original_creator_id or 0}:{int(closer_is_admin)}"
+            )
+        )
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        creator_id = int(match["creator_id"]) or None
+        return cls(match["status"], creator_id, match["closer_is_admin"] == "1")
 
     async def interaction_check(self, interaction: discord.Interaction) -> bool:
         # Only admins/mods should be able to confirm closure status
         if interaction.user.bot:
             return False
-        
-        # Check if the user has Administrator permission
-        if interaction.user.guild_permissions.administrator:
+        if await reject_if_draining(interaction):
+            return False
+        if is_staff_member(interaction.user):
             return True
-
-        # Check if the user has one of the specified ADMIN_OR_MOD_ROLE_IDS
-        for role_id in ADMIN_OR_MOD_ROLE_IDS:
-            admin_mod_role = interaction.guild.get_role(role_id)
-            if admin_mod_role and admin_mod_role in interaction.user.roles:
-                return True
-        
         await interaction.response.send_message("Only staff can mark ticket status.", ephemeral=True)
         return False
 
-    async def on_timeout(self):
-        # Disable buttons if nobody confirms within timeout
-        for item in self.children:
-            item.disabled = True
-        # If the message exists, try to edit it to remove clickable buttons.
-        if self.message:
-            try:
-                # Ensure the message still exists before trying to edit
-                await self.message.edit(view=self, content="Ticket closure confirmation timed out. Please click 'Close Ticket' again to restart the process.")
-            except discord.NotFound:
-                print("Log: Confirmation message not found during timeout, likely already deleted with channel.")
-                self.message = None # Clear message reference
-            except discord.Forbidden:
-                print("Log: Bot lacks permissions to edit confirmation message during timeout.")
-                self.message = None
-            except Exception as e:
-                print(f"Log: Error disabling confirmation view on timeout: {e}")
-        self.stop() # Stop the view to clean up its resources
+    async def callback(self, interaction: discord.Interaction):
+        # Expiry is derived from the message timestamp instead of a live timeout task
+        message_age = (discord.utils.utcnow() - interaction.message.created_at).total_seconds()
+        expired = message_age > CONFIRMATION_TIMEOUT_SECONDS
 
-    async def _handle_confirmation_click(self, interaction: discord.Interaction, status: str):
         # Disable buttons immediately to prevent further interactions
-        for item in self.children:
-            item.disabled = True
         try:
-            # Edit the confirmation message itself to remove clickable buttons
-            await interaction.message.edit(view=self)
+            await interaction.message.edit(
+                view=build_confirmation_view(self.original_creator_id, self.closer_is_admin, disabled=True),
+                content="Ticket closure confirmation timed out. Please click 'Close Ticket' again to restart the process." if expired else None
+            )
         except discord.NotFound:
-            print("Log: Confirmation message not found when trying to disable buttons after click.")
+            log.info("Confirmation message not found when trying to disable buttons after click.")
         except discord.Forbidden:
-            print("Log: Bot lacks permissions to edit confirmation message to disable buttons.")
+            log.warning("Bot lacks permissions to edit confirmation message to disable buttons.")
         except Exception as e:
-            print(f"Log: Error disabling confirmation buttons: {e}")
-
-        # The initial `close_ticket_button` already deferred the interaction.
-        # For these follow-up buttons, we want to send a new message as a response,
-        # or edit the original deferred response if we deferred it ephemeral.
-        # Since the first defer was ephemeral, we use followup.send for public messages.
-        await interaction.response.send_message(f"Initiating ticket closure with status: **{status.upper()}**...", ephemeral=True)
-
-        # Finalize the closure process
-        await self.cog.finalize_ticket_closure(
-            interaction.channel, 
-            interaction.user, 
-            status, 
-            self.original_creator_id, 
+            log.error(f"Error disabling confirmation buttons: {e}")
+
+        if expired:
+            await interaction.response.send_message("This confirmation has expired. Please click 'Close Ticket' again.", ephemeral=True)
+            return
+
+        await interaction.response.send_message(f"Initiating ticket closure with status: **{self.status.upper()}**...", ephemeral=True)
+
+        cog = interaction.client.get_cog("TicketsCog")
+        if not cog:
+            log.error("TicketsCog not available to finalize ticket closure.")
+            return
+        accepted = await cog.finalize_ticket_closure(
+            interaction.channel,
+            interaction.user,
+            self.status,
+            self.original_creator_id,
             self.closer_is_admin
         )
-        self.stop() # Stop the view after the action is complete
+        if not accepted:
+            await interaction.followup.send(CLOSURE_BUSY_MESSAGE, ephemeral=True)
 
-    @discord.ui.button(label="Mark as Solved", style=discord.ButtonStyle.green, custom_id="ticket_solved_button", emoji="✅")
-    async def solved_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._handle_confirmation_click(interaction, "solved")
 
-    @discord.ui.button(label="Mark as Unresolved", style=discord.ButtonStyle.red, custom_id="ticket_unresolved_button", emoji="❌")
-    async def unresolved_button(self, interaction: discord.Interaction, button: discord.ui.Button):
-        await self._handle_confirmation_click(interaction, "unresolved")
+def build_confirmation_view(original_creator_id: int, closer_is_admin: bool, disabled: bool = False) -> discord.ui.View:
+    """Builds the Solved/Unresolved buttons. The view is stopped so it is never kept in the view store."""
+    view = discord.ui.View(timeout=None)
+    for status in CONFIRMATION_BUTTONS:
+        view.add_item(TicketClosureConfirmButton(status, original_creator_id, closer_is_admin, disabled=disabled))
+    view.stop() # Clicks are routed to the registered DynamicItem, not to this instance
+    return view
 
 # --- Main Ticket Cog ---
 class TicketsCog(commands.Cog):
@@ -278,49 +492,191 @@ class TicketsCog(commands.Cog):
         self.bot = bot
         self.tickets_data = {} 
         self._load_config()
+        self.transcript_store = TranscriptStore(TRANSCRIPT_DB_FILE)
+        self.attachment_mirror = AttachmentMirror(
+            ATTACHMENT_ARCHIVE_DIR,
+            pool_size=ATTACHMENT_POOL_SIZE,
+            per_ticket_concurrency=ATTACHMENT_CONCURRENCY_PER_TICKET,
+            max_ticket_bytes=ATTACHMENT_MAX_TICKET_BYTES,
+            max_file_bytes=ATTACHMENT_MAX_FILE_BYTES
+        ) if ATTACHMENT_MIRRORING else None
+        self.guild_stats = {} # guild_id -> TicketStats
+        self._load_stats()
+        self._stats_save_handle = None # Pending batched stats write (see _schedule_stats_save)
+        self._stats_write_task = None # Batched write running in a thread
+        # Archive uploads and transcript DMs that fail transiently are retried from here after the channel is gone
+        self.outbox = get_outbox()
+        self.outbox.on_delivered('archive', self._archive_delivered)
+        self._delivered_archives = {} # ticket_id -> (channel_id, message_id) of deferred archives delivered before indexing
+        self.closure_journal = ClosureJournal(CLOSURE_JOURNAL_FILE)
+        self.closure_pool = WorkerPool(self._run_closure_job, CLOSURE_WORKERS, CLOSURE_QUEUE_SIZE) # Keys are ticket channel IDs
+        self._closure_channels = {} # ticket_id -> channel object handed from finalize_ticket_closure to its worker
+        self._closure_retries = {} # ticket_id -> TimerHandle of a failed closure waiting to be re-queued
+        self.draining = False # Set on shutdown: new ticket interactions and auto-closes are refused
+        # One scheduler for all idle deadlines; keys are ticket channel IDs
+        self.idle_scheduler = DeadlineScheduler(self._on_idle_deadline)
+        self._idle_state = {} # channel_id -> {'last_activity': ts, 'warned': bool}
+        self.ticket_pools = {} # guild_id -> deque of IDs of hidden pre-created channels
+        self._pool_refill_needed = asyncio.Event()
+        self._pool_task = None
+        self.category_allocators = {} # guild_id -> CategoryAllocator, built on_ready from the primary + overflow ticket categories
+        self._category_lock = asyncio.Lock()
+        self._collapse_task = None
+        # Time to get a usable ticket channel (ms), pooled claim vs full creation
+        self.channel_acquire_latency = {'pool': LogHistogram(), 'create': LogHistogram(), 'thread': LogHistogram()}
+        # Time from the user's click to the ephemeral channel link (ms)
+        self.ticket_link_latency = LogHistogram()
+        self._opening_tasks = set() # Welcome/log posts of new tickets still running
+
+        # Support channels of every server: channel ID -> display name (O(1) lookup from any handler)
+        self.support_channels = {channel_id: name for guild_id in guild_config.guild_ids('tickets') for channel_id, name in support_channels_of(guild_id).items()}
+        self.ticket_layouts = {} # support channel ID -> {'style', 'types', 'by_key'}
+        self.default_ticket_layout = None
+        self._load_ticket_types()
+        self.panel_healer = PanelHealer(self._heal_support_panel, 'Tickets') # Support panels deleted by hand are sent again
 
-        self.bot.add_view(TicketCreationView(self))
         self.bot.add_view(TicketCloseView(self)) 
+        self.bot.add_dynamic_items(TicketClosureConfirmButton, TicketTypeButton, TicketTypeSelect)
 
     def _load_config(self):
         """Loads the ticket message IDs and hashes for all support channels from the config file."""
         try:
-            with open(CONFIG_FILE, 'r') as f:
-                self.tickets_data = json.load(f)
-                print(f"Log: Tickets config loaded: {self.tickets_data}")
+            self.tickets_data = load_document(CONFIG_FILE)
+            log.info(f"Tickets config loaded: {self.tickets_data}")
         except FileNotFoundError:
-            print(f"Log: {CONFIG_FILE} not found. Will create a new one.")
+            log.info(f"{CONFIG_FILE} not found. Will create a new one.")
         except json.JSONDecodeError:
-            print(f"Log: Error decoding {CONFIG_FILE}. Starting with empty config.")
+            log.error(f"Error decoding {CONFIG_FILE}. Starting with empty config.")
         except Exception as e:
-            print(f"Log: Unexpected error loading tickets config: {e}")
+            log.error(f"Unexpected error loading tickets config: {e}")
 
     def _save_config(self):
         """Saves the current ticket message IDs and hashes for all support channels to the config file."""
-        os.makedirs(os.path.dirname(CONFIG_FILE), exist_ok=True) # Ensure the directory exists
         try:
-            with open(CONFIG_FILE, 'w') as f:
-                json.dump(self.tickets_data, f, indent=4)
-            print(f"Log: Tickets config saved.")
+            save_document(CONFIG_FILE, self.tickets_data)
+            log.info("Tickets config saved.")
+        except Exception as e:
+            log.error(f"Error saving tickets config: {e}")
+
+    def _load_stats(self):
+        """Loads the persisted ticket KPIs (rolling counters and percentile sketches)."""
+        try:
+            data = load_document(STATS_FILE)
+            if 'open_tickets' in data: # Formato antiguo de un solo servidor
+                data = {str(PRIMARY_GUILD_ID): data}
+            self.guild_stats = {int(guild_id): TicketStats.from_dict(stats) for guild_id, stats in data.items()}
+            open_count = sum(len(stats.open_tickets) for stats in self.guild_stats.values())
+            log.info(f"Ticket stats loaded: {open_count} open tickets tracked in {len(self.guild_stats)} server(s).")
+        except FileNotFoundError:
+            log.info(f"{STATS_FILE} not found. Starting ticket stats from scratch.")
+        except json.JSONDecodeError:
+            log.error(f"Error decoding {STATS_FILE}. Starting ticket stats from scratch.")
+        except Exception as e:
+            log.error(f"Unexpected error loading ticket stats: {e}")
+
+    def _stats_document(self):
+        # One key per server, so each worker process only writes the stats of its own servers
+        return {str(guild_id): stats.to_dict() for guild_id, stats in self.guild_stats.items()}
+
+    def _save_stats(self):
+        """Persists the ticket KPIs so they survive restarts."""
+        try:
+            save_document(STATS_FILE, self._stats_document())
         except Exception as e:
-            print(f"Log: ERROR saving tickets config: {e}")
+            log.error(f"Error saving ticket stats: {e}")
+
+    async def _write_stats(self, document):
+        """Batched save: the document is built on the event loop and written from a thread."""
+        try:
+            await asyncio.to_thread(save_document, STATS_FILE, document)
+        except Exception as e:
+            log.error(f"Error saving ticket stats: {e}")
+
+    async def _flush_stats(self):
+        """Writes the stats now, after any batched write still running (shutdown)."""
+        self._cancel_stats_save()
+        if self._stats_write_task:
+            await self._stats_write_task
+        self._save_stats()
+
+    def _schedule_stats_save(self):
+        """Saves the stats STATS_SAVE_DELAY seconds from now, once for all the changes made in between."""
+        if self._stats_save_handle is None:
+            self._stats_save_handle = asyncio.get_running_loop().call_later(STATS_SAVE_DELAY, self._save_scheduled_stats)
+
+    def _cancel_stats_save(self):
+        """Drops the pending batched write (the caller saves the stats right away)."""
+        if self._stats_save_handle is not None:
+            self._stats_save_handle.cancel()
+            self._stats_save_handle = None
+
+    def _save_scheduled_stats(self):
+        self._stats_save_handle = None
+        if self._stats_write_task and not self._stats_write_task.done():
+            self._schedule_stats_save() # The previous write is still running: these changes go in the next one
+            return
+        self._stats_write_task = asyncio.create_task(self._write_stats(self._stats_document()))
+
+    def _stats(self, guild_id):
+        """Ticket KPIs and open-ticket index of a server."""
+        if guild_id not in self.guild_stats:
+            self.guild_stats[guild_id] = TicketStats()
+        return self.guild_stats[guild_id]
+
+    @staticmethod
+    def _build_ticket_layout(layout_config):
+        types = [t for t in layout_config.get('types', []) if t.get('key') and t.get('label')]
+        if len(types) > MAX_TICKET_TYPE_OPTIONS:
+            log.error(f"{len(types)} ticket types configured in {TICKET_TYPES_FILE}, Discord allows {MAX_TICKET_TYPE_OPTIONS}. "
+                      f"Ignoring: {', '.join(t['key'] for t in types[MAX_TICKET_TYPE_OPTIONS:])}.")
+            types = types[:MAX_TICKET_TYPE_OPTIONS]
+        style = layout_config.get('style', 'buttons')
+        if style != 'select' and len(types) > MAX_TICKET_TYPE_BUTTONS:
+            style = 'select'
+        return {'style': style, 'types': types, 'by_key': {t['key']: t for t in types}}
+
+    def _load_ticket_types(self):
+        """Loads the ticket types per support channel from TICKET_TYPES_FILE."""
+        try:
+            types_config = load_json_file(TICKET_TYPES_FILE)
+        except FileNotFoundError:
+            log.error(f"{TICKET_TYPES_FILE} not found. Support panels will have no ticket types.")
+            types_config = {}
+        except json.JSONDecodeError as e:
+            log.error(f"Error decoding {TICKET_TYPES_FILE}: {e}. Keeping the previous ticket types.")
+            if self.default_ticket_layout is not None:
+                return
+            types_config = {}
+
+        self.default_ticket_layout = self._build_ticket_layout(types_config.get('default', {}))
+        channel_overrides = types_config.get('channels', {})
+        self.ticket_layouts = {
+            channel_id: self._build_ticket_layout(channel_overrides[str(channel_id)]) if str(channel_id) in channel_overrides else self.default_ticket_layout
+            for channel_id in self.support_channels
+        }
+        log.info(f"Ticket types loaded: {len(self.default_ticket_layout['types'])} default, {len(channel_overrides)} channel override(s).")
+
+    def _get_ticket_layout(self, channel_id):
+        return self.ticket_layouts.get(channel_id, self.default_ticket_layout)
 
     def _generate_ticket_embed_data(self, channel_id):
         """Generates the data for the ticket creation embed for a specific channel."""
-        channel_name = SUPPORT_CHANNELS.get(channel_id, "Support") # Default to "Support" if ID not found
+        channel_name = self.support_channels.get(channel_id, "Support") # Default to "Support" if ID not found
+        layout = self._get_ticket_layout(channel_id)
+        action_text = "choose the option" if layout['style'] == 'select' else "click one of the buttons"
 
         description_text = (
             "Welcome to the **Homedocks Support System**!\n"
-            "To get help, please click one of the buttons below that best describes your issue.\n"
+            f"To get help, please {action_text} below that best describes your issue.\n"
             "This will create a private channel where our team can assist you.\n\n"
             "**Here are the available ticket types for __"
             f"{channel_name.upper()}"  # Enfatiza la categoría
             "__:**\n\n" 
-            "**💻 App Problem:** For issues related to any application or software specific to this category.\n\n" 
-            "**🌐 Web Problem:** For issues with websites, online services, or web platforms in this category.\n\n" 
-            "**💬 Discord Problem:** For problems with Discord itself (permissions, server settings, bot issues, etc.) within this category.\n\n" 
-            "Please be ready to provide as much detail as possible once your ticket is opened."
         )
+        for ticket_type in layout['types']:
+            emoji = f"{ticket_type['emoji']} " if ticket_type.get('emoji') else ""
+            description_text += f"**{emoji}{ticket_type['label']}:** {ticket_type.get('description', '')}\n\n"
+        description_text += "Please be ready to provide as much detail as possible once your ticket is opened."
 
         embed_dict = {
             "title": f"🎫 Homedocks | {channel_name} Ticket System 🎫",
@@ -331,14 +687,41 @@ class TicketsCog(commands.Cog):
 
     def _calculate_content_hash(self, embed_data):
         """Calculates a hash of the embed data to detect changes."""
-        content_json_string = json.dumps(embed_data, sort_keys=True)
-        return hashlib.sha256(content_json_string.encode('utf-8')).hexdigest()
+        return content_hash(embed_data)
 
     async def _manage_support_channel_message(self, channel: discord.TextChannel):
         """Manages the main ticket creation message in a given support channel."""
+        # One update per panel at a time: on_ready fires again on reconnects and, with worker
+        # processes, a shard handoff can briefly run it in two of them
+        async with state_lock(CONFIG_FILE, channel.id):
+            refresh_document_key(CONFIG_FILE, self.tickets_data, channel.id)
+            await self._update_support_channel_message(channel)
+        self.panel_healer.track(channel.id, self.tickets_data.get(str(channel.id), {}).get('message_id'))
+
+    async def _heal_support_panel(self, channel_id):
+        """Re-creates the ticket panel of a support channel after its message was deleted."""
+        channel = self.bot.get_channel(channel_id)
+        if channel:
+            await self._manage_support_channel_message(channel)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self.panel_healer.deleted((payload.message_id,))
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        self.panel_healer.deleted(payload.message_ids)
+
+    async def _update_support_channel_message(self, channel: discord.TextChannel):
         channel_id_str = str(channel.id)
         embed_data = self._generate_ticket_embed_data(channel.id)
-        current_hash = self._calculate_content_hash(embed_data)
+        layout = self._get_ticket_layout(channel.id)
+        # The components are part of the hash so a changed ticket type list re-edits only the affected panels
+        current_hash = self._calculate_content_hash({
+            'embed': embed_data,
+            'style': layout['style'],
+            'types': [[t['key'], t['label'], t.get('emoji')] for t in layout['types']]
+        })
         
         message_id = self.tickets_data.get(channel_id_str, {}).get('message_id')
         last_hash = self.tickets_data.get(channel_id_str, {}).get('last_content_hash')
@@ -349,35 +732,35 @@ class TicketsCog(commands.Cog):
             try:
                 # Intenta buscar el mensaje existente
                 message_found = await channel.fetch_message(message_id)
-                print(f"Log: Found existing tickets message with ID: {message_id} in #{channel.name}")
+                log.debug(f"Found existing tickets message with ID: {message_id} in #{channel.name}")
             except discord.NotFound:
                 # El mensaje no existe en Discord, pero el bot cree que sí.
-                print(f"Log: Existing tickets message (ID: {message_id}) not found in #{channel.name}. It might have been deleted manually. Removing from config.")
+                log.info(f"Existing tickets message (ID: {message_id}) not found in #{channel.name}. It might have been deleted manually. Removing from config.")
                 # Limpia la entrada para este canal, para que se envíe un nuevo mensaje.
                 if channel_id_str in self.tickets_data:
                     del self.tickets_data[channel_id_str]
                 self._save_config() # Guarda la configuración actualizada inmediatamente
                 message_id = None # Reinicia message_id para que el siguiente bloque envíe un nuevo mensaje
             except discord.Forbidden:
-                print(f"Log: WARNING: Bot does not have permissions to fetch message {message_id} in #{channel.name}. Skipping update for this channel.")
+                log.warning(f"Bot does not have permissions to fetch message {message_id} in #{channel.name}. Skipping update for this channel.")
                 return # Salir si no se puede acceder al mensaje
 
         if message_found and last_hash == current_hash:
             # Si el mensaje existe Y el contenido no ha cambiado
-            print(f"Log: Tickets for #{channel.name} have not changed. No update needed for existing message.")
+            log.debug(f"Tickets for #{channel.name} have not changed. No update needed for existing message.")
         else:
             # Si no hay mensaje, o el hash es diferente (contenido ha cambiado), o el mensaje fue borrado manualmente
             try:
                 if message_found:
                     # El mensaje existe pero el contenido cambió, editarlo
                     updated_embed = discord.Embed.from_dict(embed_data)
-                    await message_found.edit(embed=updated_embed, view=TicketCreationView(self))
-                    print(f"Log: Existing tickets message in #{channel.name} updated successfully.")
+                    await message_found.edit(embed=updated_embed, view=build_ticket_creation_view(layout))
+                    log.info(f"Existing tickets message in #{channel.name} updated successfully.")
                     new_message_id = message_found.id # Su ID no cambia al editar
                 else:
                     # No hay mensaje, enviarlo de nuevo (o por primera vez)
-                    new_message = await channel.send(embed=discord.Embed.from_dict(embed_data), view=TicketCreationView(self))
-                    print(f"Log: New tickets message sent to #{channel.name}.")
+                    new_message = await channel.send(embed=discord.Embed.from_dict(embed_data), view=build_ticket_creation_view(layout))
+                    log.info(f"New tickets message sent to #{channel.name}.")
                     new_message_id = new_message.id
 
                 # Actualiza el config con el nuevo message_id y el nuevo hash
@@ -388,53 +771,160 @@ class TicketsCog(commands.Cog):
                 self._save_config()
 
             except discord.Forbidden:
-                print(f"Log: ERROR: Bot lacks permissions to send/edit messages in #{channel.name}.")
+                log.error(f"Bot lacks permissions to send/edit messages in #{channel.name}.")
             except Exception as e:
-                print(f"Log: Unexpected error managing tickets message in #{channel.name}: {e}")
+                log.error(f"Unexpected error managing tickets message in #{channel.name}: {e}")
 
     @commands.Cog.listener()
     async def on_ready(self):
-        print(f'Cog "{self.qualified_name}" for Tickets loaded and ready.')
+        log.info(f'Cog "{self.qualified_name}" for Tickets loaded and ready.')
         
-        for channel_id, display_name in SUPPORT_CHANNELS.items():
-            support_channel = self.bot.get_channel(channel_id)
-            if not support_channel:
-                print(f"Log: ADVERTENCIA: Support channel '{display_name}' with ID {channel_id} not found or not accessible. Verify ID and permissions.")
-                continue
-            
-            await self._manage_support_channel_message(support_channel)
-            await asyncio.sleep(1) # Small delay to avoid hitting rate limits when managing multiple channels
+        for guild_id in guild_config.guild_ids('tickets'):
+            if not sharding.owns_guild(guild_id):
+                continue # Sus tickets los gestiona el worker que tiene el shard de ese servidor
+            for channel_id, display_name in support_channels_of(guild_id).items():
+                support_channel = self.bot.get_channel(channel_id)
+                if not support_channel:
+                    log.warning(f"Support channel '{display_name}' with ID {channel_id} not found or not accessible. Verify ID and permissions.")
+                    continue
 
-    # --- Ticket Creation Logic ---
-    async def create_ticket_channel(self, interaction: discord.Interaction, problem_type: str):
-        # The interaction was already deferred in the button's callback.
-        guild = interaction.guild
-        user = interaction.user
+                await self._manage_support_channel_message(support_channel)
+                await asyncio.sleep(1) # Small delay to avoid hitting rate limits when managing multiple channels
 
-        # Create channel name
-        user_name_for_channel = user.global_name if user.global_name else user.name
-        ticket_channel_name = f"ticket-{user_name_for_channel.lower().replace(' ', '-')}-{problem_type.lower().replace(' ', '-')}"
-        ticket_channel_name = ticket_channel_name[:95] 
-        ticket_channel_name = "".join(c for c in ticket_channel_name if c.isalnum() or c == '-')
+            self._rebuild_category_allocator(guild_id)
+            self._rebuild_open_ticket_index(guild_id)
 
-        # Determine the source channel for the ticket (e.g., General Support)
-        source_channel_name = SUPPORT_CHANNELS.get(interaction.channel_id, "Unknown Category")
+        if TICKET_POOL_SIZE and self._pool_task is None:
+            self._pool_task = asyncio.create_task(self._ticket_pool_refiller())
+            self._pool_refill_needed.set()
 
-        # Define category for ticket channels
-        ticket_category = self.bot.get_channel(TICKET_CATEGORY_ID) # Fetch the category object
-        if not ticket_category:
-            print(f"Log: WARNING: Ticket category with ID {TICKET_CATEGORY_ID} not found. Tickets will be created without a category.")
-            ticket_category = None # Fallback: if category not found, set to None so it creates it at top level
+        await self._resume_closure_jobs()
 
-        # Define permissions for the new channel
+    def _rebuild_open_ticket_index(self, guild_id):
+        """Syncs the open-ticket index of a server with the channels that actually exist in its ticket categories."""
+        ticket_categories = self._ticket_categories(guild_id)
+        if not ticket_categories:
+            return
+        stats = self._stats(guild_id)
+        self._rebuild_ticket_pool(guild_id, ticket_categories)
+        existing_ids = set()
+        for ticket_channel in (c for category in ticket_categories for c in category.text_channels):
+            topic_info = parse_ticket_topic(ticket_channel.topic)
+            if not topic_info['creator_id']:
+                continue
+            existing_ids.add(str(ticket_channel.id))
+            # Tickets opened before stats existed (or while offline) are tracked but not counted as new
+            stats.ticket_opened(
+                ticket_channel.id, topic_info['source_channel'] or "Unknown Category", topic_info['creator_id'],
+                ticket_channel.created_at.timestamp(), count_as_new=False,
+                creator_name=topic_info['creator_name'], problem_type=topic_info['problem_type']
+            )
+            self._rebuild_idle_deadline(ticket_channel)
+        # Thread tickets have no topic: they are only known through the index, keep the ones still open
+        for channel_id, ticket in stats.open_tickets.items():
+            if ticket.get('backend') == 'thread':
+                ticket_thread = ticket_categories[0].guild.get_thread(int(channel_id))
+                if ticket_thread and not ticket_thread.archived:
+                    existing_ids.add(channel_id)
+                    self._rebuild_idle_deadline(ticket_thread)
+        for channel_id in list(stats.open_tickets):
+            if channel_id not in existing_ids:
+                stats.forget(channel_id)
+        self._save_stats()
+        log.info(f"Open ticket index of server {guild_id} rebuilt: {len(stats.open_tickets)} open tickets, {len(self.idle_scheduler)} idle deadlines.")
+
+    # --- Idle Ticket Auto-Close ---
+    def _track_activity(self, channel_id, timestamp, warned=False):
+        """Moves the idle deadline of a ticket. O(1): the scheduler only updates its dict."""
+        if not IDLE_CLOSE_HOURS:
+            return
+        self._idle_state[channel_id] = {'last_activity': timestamp, 'warned': warned}
+        hours = IDLE_CLOSE_HOURS if warned else IDLE_WARN_HOURS
+        self.idle_scheduler.schedule(channel_id, timestamp + hours * 3600)
+
+    def _rebuild_idle_deadline(self, ticket_channel):
+        """Recomputes the idle deadline of a ticket after a restart from its last message timestamp."""
+        ticket = self._stats(ticket_channel.guild.id).open_tickets.get(str(ticket_channel.id), {})
+        last_message_id = ticket_channel.last_message_id
+        if last_message_id and last_message_id == ticket.get('idle_warning_message_id'):
+            # The last message is our own warning: the silence started before it
+            self._track_activity(ticket_channel.id, ticket['idle_since'], warned=True)
+        elif last_message_id:
+            self._track_activity(ticket_channel.id, discord.utils.snowflake_time(last_message_id).timestamp())
+        else:
+            # A pooled channel was created long before its claim: the ticket's opening time counts
+            self._track_activity(ticket_channel.id, self._ticket_opened_at(ticket_channel).timestamp())
+
+    def _stop_tracking(self, channel_id):
+        self.idle_scheduler.cancel(channel_id)
+        self._idle_state.pop(channel_id, None)
+
+    async def _on_idle_deadline(self, channel_id):
+        state = self._idle_state.get(channel_id)
+        channel = self.bot.get_channel(channel_id)
+        if not state or not channel:
+            self._stop_tracking(channel_id)
+            return
+
+        if not state['warned']:
+            # After a long downtime, still give users the full grace period from the warning on
+            idle_since = max(state['last_activity'], time.time() - IDLE_WARN_HOURS * 3600)
+            try:
+                warning_message = await channel.send(
+                    f"⏰ This ticket has had no activity for {IDLE_WARN_HOURS} hours. "
+                    f"It will be closed automatically as **UNRESOLVED** in {IDLE_CLOSE_HOURS - IDLE_WARN_HOURS} hours unless someone replies."
+                )
+            except Exception as e:
+                log.error(f"Error sending idle warning to {channel.name}: {e}")
+                return
+            self._track_activity(channel_id, idle_since, warned=True)
+            ticket = self._stats(channel.guild.id).open_tickets.get(str(channel_id))
+            if ticket is not None:
+                ticket['idle_warning_message_id'] = warning_message.id
+                ticket['idle_since'] = idle_since
+                self._record_bot_message(channel, warning_message) # Also schedules the stats write
+            log.info(f"Idle warning sent to ticket {channel.name}.")
+            return
+
+        log.info(f"Ticket {channel.name} idle for {IDLE_CLOSE_HOURS} hours. Closing as unresolved.")
+        creator_id = self._get_ticket_info(channel)['creator_id']
+        if not await self.finalize_ticket_closure(channel, channel.guild.me, "unresolved", creator_id, closer_is_admin=True) and not self.draining:
+            self.idle_scheduler.schedule(channel_id, time.time() + CLOSURE_RETRY_DELAY) # Closure queue full: try again shortly
+
+    @commands.Cog.listener()
+    async def on_message(self, message):
+        # O(1) check: only messages inside open tickets matter
+        stats = self.guild_stats.get(message.guild.id) if message.guild else None
+        if message.author.bot or not stats or not stats.is_open(message.channel.id):
+            return
+        self._track_activity(message.channel.id, message.created_at.timestamp())
+        if isinstance(message.author, discord.Member) and is_staff_member(message.author):
+            if stats.staff_replied(message.channel.id, message.created_at.timestamp()):
+                self._schedule_stats_save()
+
+    def _get_log_channel(self, guild):
+        """Log channel of a server (LoggingCog's relay when another worker process owns it)."""
+        logging_cog = self.bot.get_cog("LoggingCog")
+        if logging_cog:
+            return logging_cog.get_log_channel(guild.id)
+        # Sin LoggingCog (p. ej. en los benchmarks) solo el servidor principal tiene canal de logs
+        return self.bot.get_channel(LOG_CHANNEL_ID) if guild.id == PRIMARY_GUILD_ID else None
+
+    def _record_bot_message(self, channel, message):
+        """
+        Remembers a welcome/confirmation/status message posted by the bot so the transcript skips it.
+        The ID is kept in memory at once and written with the next batched stats save.
+        """
+        ticket = self._stats(channel.guild.id).open_tickets.get(str(channel.id))
+        if ticket is None:
+            return
+        ticket.setdefault('bot_message_ids', []).append(message.id)
+        self._schedule_stats_save()
+
+    def _build_ticket_overwrites(self, guild, user=None):
+        """Permission overwrites of a ticket channel (user may be None for pooled channels). Returns (overwrites, staff role mentions)."""
         overwrites = {
             guild.default_role: discord.PermissionOverwrite(read_messages=False), 
-            user: discord.PermissionOverwrite(
-                read_messages=True, 
-                send_messages=True, 
-                attach_files=True,
-                embed_links=True
-            ), 
             guild.me: discord.PermissionOverwrite( 
                 read_messages=True, 
                 send_messages=True, 
@@ -442,11 +932,18 @@ class TicketsCog(commands.Cog):
                 manage_messages=True  
             )
         }
+        if user:
+            overwrites[user] = discord.PermissionOverwrite(
+                read_messages=True, 
+                send_messages=True, 
+                attach_files=True,
+                embed_links=True
+            )
 
         # Add permissions for each admin/moderator role in the list
         roles_to_mention = [] # New list to store role mentions for the welcome message
-        roles_added_count = 0
-        for role_id in ADMIN_OR_MOD_ROLE_IDS:
+        staff_role_ids = ticket_settings(guild.id).get('staff_role_ids', ())
+        for role_id in staff_role_ids:
             admin_mod_role = guild.get_role(role_id)
             if admin_mod_role:
                 overwrites[admin_mod_role] = discord.PermissionOverwrite(
@@ -455,254 +952,988 @@ class TicketsCog(commands.Cog):
                     manage_channels=True 
                 ) 
                 roles_to_mention.append(admin_mod_role.mention) # Add role mention to the list
-                print(f"Log: Added {admin_mod_role.name} role (ID: {role_id}) to ticket channel overwrites.")
-                roles_added_count += 1
             else:
-                print(f"Log: WARNING: Admin/Mod role with ID {role_id} not found. Ensure the bot has access and the role exists.")
+                log.warning(f"Admin/Mod role with ID {role_id} not found. Ensure the bot has access and the role exists.")
         
-        if roles_added_count == 0:
-            print("Log: WARNING: No ADMIN_OR_MOD_ROLE_IDS from the list were found or valid. Admins might not automatically see ticket channels.")
-
-
+        if not roles_to_mention:
+            log.warning(f"No staff roles of server {guild.id} were found or valid. Admins might not automatically see ticket channels.")
+        return overwrites, roles_to_mention
+
+    def _get_ticket_info(self, channel):
+        """Creator/problem/source of a ticket, from the channel topic or (thread tickets) the open-ticket index."""
+        info = parse_ticket_topic(getattr(channel, 'topic', None))
+        ticket = self._stats(channel.guild.id).open_tickets.get(str(channel.id))
+        if ticket:
+            info['creator_id'] = info['creator_id'] or ticket.get('creator_id')
+            info['creator_name'] = info['creator_name'] or ticket.get('creator_name')
+            info['problem_type'] = info['problem_type'] or ticket.get('problem_type')
+            info['source_channel'] = info['source_channel'] or ticket.get('category')
+        return info
+
+    def _ticket_opened_at(self, channel):
+        """Opening time of a ticket. Pooled channels were created earlier than the ticket, so the index wins."""
+        ticket = self._stats(channel.guild.id).open_tickets.get(str(channel.id))
+        if ticket:
+            return datetime.datetime.fromtimestamp(ticket['opened_at'], tz=datetime.timezone.utc)
+        return channel.created_at
+
+    # --- Ticket Category Sharding ---
+    def _rebuild_category_allocator(self, guild_id):
+        """Rebuilds the per-category occupancy of a server from the cache: its ticket category plus its overflow categories."""
+        category_id = ticket_settings(guild_id).get('category_id')
+        primary = self.bot.get_channel(category_id) if category_id else None
+        if not primary:
+            log.warning(f"Ticket category with ID {category_id} not found. Tickets will be created without a category.")
+            self.category_allocators.pop(guild_id, None)
+            return
+        allocator = CategoryAllocator(primary.id, TICKET_CATEGORY_CAPACITY)
+        allocator.add_category(primary.id, [c.id for c in primary.channels])
+        for category in primary.guild.categories:
+            if category.id != primary.id and category.name.startswith(f"{primary.name}{OVERFLOW_CATEGORY_MARKER}"):
+                allocator.add_category(category.id, [c.id for c in category.channels])
+        self.category_allocators[guild_id] = allocator
+        occupancy = ", ".join(f"{self.bot.get_channel(cid).name}: {allocator.occupancy(cid)}" for cid in allocator.category_ids())
+        log.info(f"Ticket categories: {occupancy}")
+        self._schedule_overflow_collapse()
+
+    def _ticket_categories(self, guild_id):
+        allocator = self.category_allocators.get(guild_id)
+        if not allocator:
+            return []
+        categories = (self.bot.get_channel(category_id) for category_id in allocator.category_ids())
+        return [category for category in categories if category]
+
+    async def _create_ticket_text_channel(self, guild, name, overwrites, topic=None, reason=None):
+        """Creates a channel in the least-full ticket category, opening an overflow category if all are full."""
+        allocator = self.category_allocators.get(guild.id)
+        if not allocator:
+            return await guild.create_text_channel(name, overwrites=overwrites, topic=topic, reason=reason)
+
+        category_id = allocator.reserve()
+        if category_id is None:
+            await self._open_overflow_category(guild)
+            category_id = allocator.reserve()
         try:
-            # Create the actual text channel
             new_channel = await guild.create_text_channel(
-                ticket_channel_name,
-                overwrites=overwrites,
-                category=ticket_category, 
-                topic=f"Support ticket for {user.display_name} (ID: {user.id}) regarding a {problem_type}." 
+                name, overwrites=overwrites, category=self.bot.get_channel(category_id) if category_id else None, topic=topic, reason=reason
             )
-            print(f"Log: New ticket channel created: {new_channel.name} by {user.display_name}.")
-            
-            # Construct the mentions string for staff
-            staff_mentions = ", ".join(roles_to_mention) if roles_to_mention else "Our support team"
+        except Exception:
+            if category_id:
+                allocator.release(category_id)
+            raise
+        if category_id:
+            allocator.confirm(category_id, new_channel.id)
+        return new_channel
+
+    async def _open_overflow_category(self, guild):
+        """Creates a new overflow category with the primary category's permissions (one at a time)."""
+        allocator = self.category_allocators[guild.id]
+        async with self._category_lock:
+            # Another ticket opening may have created one (or a slot was freed) while we waited
+            if any(allocator.occupancy(cid) < TICKET_CATEGORY_CAPACITY for cid in allocator.category_ids()):
+                return
+            primary = self.bot.get_channel(allocator.primary_id)
+            if not primary:
+                return
+            overflow_number = len(allocator.overflow_ids()) + 2
+            try:
+                category = await guild.create_category(
+                    f"{primary.name}{OVERFLOW_CATEGORY_MARKER} {overflow_number})",
+                    overwrites=primary.overwrites,
+                    position=primary.position + 1,
+                    reason="Ticket categories full"
+                )
+                allocator.add_category(category.id)
+                log.info(f"Ticket categories full. Overflow category '{category.name}' created.")
+            except discord.HTTPException as e:
+                log.error(f"Error creating overflow ticket category: {e}")
+
+    def _schedule_overflow_collapse(self):
+        if any(allocator.empty_overflow_ids() for allocator in self.category_allocators.values()):
+            if self._collapse_task is None or self._collapse_task.done():
+                self._collapse_task = asyncio.create_task(self._collapse_overflow_categories())
+
+    async def _collapse_overflow_categories(self):
+        """Deletes each overflow category once it has stayed empty for OVERFLOW_COLLAPSE_DELAY seconds."""
+        while True:
+            waits = [wait for allocator in self.category_allocators.values() if (wait := allocator.seconds_until_collapse(OVERFLOW_COLLAPSE_DELAY)) is not None]
+            if not waits:
+                return
+            await asyncio.sleep(min(waits))
+            expired = [(allocator, category_id) for allocator in self.category_allocators.values() for category_id in allocator.empty_overflow_ids(OVERFLOW_COLLAPSE_DELAY)]
+            await self._delete_overflow_categories(expired)
+
+    async def _delete_overflow_categories(self, empty_categories):
+        for allocator, category_id in empty_categories:
+            if category_id not in allocator.empty_overflow_ids(OVERFLOW_COLLAPSE_DELAY):
+                continue # A ticket landed in it while the previous category was being deleted
+            category = self.bot.get_channel(category_id)
+            # Removed from the allocator first so no new ticket gets placed there meanwhile
+            allocator.remove_category(category_id)
+            if not category:
+                continue
+            try:
+                await category.delete(reason="Overflow ticket category empty")
+                log.info(f"Empty overflow ticket category '{category.name}' deleted.")
+            except discord.HTTPException as e:
+                log.error(f"Error deleting empty overflow category '{category.name}': {e}")
 
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel):
+        allocator = self.category_allocators.get(channel.guild.id)
+        if allocator and channel.category_id in allocator:
+            allocator.channel_added(channel.category_id, channel.id)
 
-            # Send initial welcome message in the new ticket channel
-            welcome_embed = discord.Embed(
-                title=f"👋 Welcome to your {problem_type} Ticket, {user.display_name}!",
-                description=(
-                    "Please describe your problem in detail below. Our team will review your issue and get back to you as soon as possible.\n"
-                    "If your issue is resolved, or you no longer need assistance, you can close this ticket at any time by clicking the button below."
-                ),
-                color=discord.Color.green()
-            )
-            close_ticket_view = TicketCloseView(self) 
-            
-            # Send message with user mention AND staff mentions
-            await new_channel.send(
-                f"{user.mention} {staff_mentions}, a new ticket has been opened for you.", 
-                embed=welcome_embed, 
-                view=close_ticket_view
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel):
+        allocator = self.category_allocators.get(channel.guild.id)
+        if not allocator:
+            return
+        if channel.id in allocator:
+            allocator.remove_category(channel.id) # An overflow category deleted by hand
+        elif channel.category_id in allocator:
+            allocator.channel_removed(channel.category_id, channel.id)
+            self._schedule_overflow_collapse()
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before, after):
+        allocator = self.category_allocators.get(after.guild.id)
+        if allocator and before.category_id != after.category_id:
+            allocator.channel_removed(before.category_id, after.id)
+            allocator.channel_added(after.category_id, after.id)
+            self._schedule_overflow_collapse()
+
+    # --- Pre-warmed Ticket Channel Pool ---
+    def _rebuild_ticket_pool(self, guild_id, ticket_categories):
+        """Re-adopts the hidden pool channels that already exist in the ticket categories of a server."""
+        ticket_pool = self.ticket_pools.setdefault(guild_id, collections.deque())
+        pooled = set(ticket_pool)
+        for ticket_channel in (c for category in ticket_categories for c in category.text_channels):
+            if ticket_channel.name.startswith(TICKET_POOL_PREFIX) and ticket_channel.id not in pooled:
+                ticket_pool.append(ticket_channel.id)
+        if TICKET_POOL_SIZE:
+            log.info(f"Ticket channel pool of server {guild_id}: {len(ticket_pool)}/{TICKET_POOL_SIZE} channels ready.")
+
+    async def _claim_pooled_channel(self, guild, name, topic, overwrites):
+        """Turns a pooled channel of the server into a ticket with a single edit. Returns None if the pool is empty."""
+        ticket_pool = self.ticket_pools.get(guild.id, ())
+        while ticket_pool:
+            pooled_channel = self.bot.get_channel(ticket_pool.popleft())
+            self._pool_refill_needed.set()
+            if not pooled_channel:
+                continue # Deleted by hand while in the pool
+            try:
+                await pooled_channel.edit(name=name, topic=topic, overwrites=overwrites, reason="Ticket opened")
+                return pooled_channel
+            except discord.NotFound:
+                continue
+            except discord.HTTPException as e:
+                log.error(f"Error claiming pooled channel {pooled_channel.name}: {e}. Falling back to channel creation.")
+                await self._return_pooled_channel(guild, pooled_channel, e)
+                return None
+        return None
+
+    async def _return_pooled_channel(self, guild, pooled_channel, error):
+        """A failed claim left the channel untouched: it goes back to the pool (transient error) or is deleted."""
+        if is_transient(error):
+            self.ticket_pools.setdefault(guild.id, collections.deque()).appendleft(pooled_channel.id)
+            return
+        try:
+            await pooled_channel.delete(reason="Pooled ticket channel could not be claimed")
+        except discord.HTTPException as e:
+            log.error(f"Error deleting unclaimable pooled channel {pooled_channel.name}: {e}")
+
+    async def _ticket_pool_refiller(self):
+        """Keeps TICKET_POOL_SIZE hidden channels ready per server, creating them one at a time with backoff."""
+        await self.bot.wait_until_ready()
+        backoff = TICKET_POOL_REFILL_INTERVAL
+        while True:
+            await self._pool_refill_needed.wait()
+            self._pool_refill_needed.clear()
+            for guild_id, allocator in list(self.category_allocators.items()):
+                ticket_pool = self.ticket_pools.setdefault(guild_id, collections.deque())
+                while len(ticket_pool) < TICKET_POOL_SIZE:
+                    ticket_category = self.bot.get_channel(allocator.primary_id)
+                    if not ticket_category:
+                        log.warning(f"Ticket category {allocator.primary_id} not found. Ticket channel pool of server {guild_id} disabled.")
+                        break
+                    overwrites, _ = self._build_ticket_overwrites(ticket_category.guild)
+                    try:
+                        pooled_channel = await self._create_ticket_text_channel(
+                            ticket_category.guild,
+                            f"{TICKET_POOL_PREFIX}{os.urandom(3).hex()}",
+                            overwrites,
+                            reason="Pre-warmed ticket channel pool"
+                        )
+                        ticket_pool.append(pooled_channel.id)
+                        backoff = TICKET_POOL_REFILL_INTERVAL
+                    except discord.HTTPException as e:
+                        # discord.py already waits out 429s; anything else (e.g. category full) backs off exponentially
+                        backoff = min(backoff * 2, 600)
+                        log.error(f"Error refilling ticket channel pool: {e}. Retrying in {backoff}s.")
+                    # Stay well below the channel creation rate limit; ticket openings take priority
+                    await asyncio.sleep(backoff)
+
+    async def _open_ticket_thread(self, interaction, name, user):
+        """Thread backend: a private thread in the support channel (or the server's thread_parent_id) with the user added."""
+        thread_parent_id = ticket_settings(interaction.guild.id).get('thread_parent_id')
+        parent = self.bot.get_channel(thread_parent_id) if thread_parent_id else interaction.channel
+        thread = await parent.create_thread(
+            name=name,
+            type=discord.ChannelType.private_thread,
+            invitable=False,
+            auto_archive_duration=THREAD_AUTO_ARCHIVE_MINUTES,
+            reason=f"Ticket opened by {user.display_name}"
+        )
+        await thread.add_user(user)
+        # Staff join through the role mentions in the welcome message
+        return thread
+
+    # --- Ticket Creation Logic ---
+    async def open_ticket_from_panel(self, interaction: discord.Interaction, type_key: str):
+        """Routes a ticket type button/select click (already deferred) to create_ticket_channel."""
+        ticket_type = self._get_ticket_layout(interaction.channel_id)['by_key'].get(type_key)
+        if not ticket_type:
+            await interaction.followup.send("This ticket type is no longer available. Please pick another one.", ephemeral=True)
+            return
+        await self.create_ticket_channel(interaction, ticket_type['label'])
+
+    @commands.hybrid_command(name='reloadtickettypes')
+    @commands.guild_only()
+    async def reload_ticket_types(self, ctx):
+        """Recarga los tipos de ticket y reedita solo los paneles cuyo contenido cambió (solo staff)."""
+        if not is_staff_member(ctx.author):
+            await ctx.send("Only staff can reload ticket types.", delete_after=10, ephemeral=True)
+            return
+        await ctx.defer() # Re-editing the panels can take longer than the 3 s an interaction allows
+        self._load_ticket_types()
+        for channel_id in support_channels_of(ctx.guild.id):
+            support_channel = self.bot.get_channel(channel_id)
+            if support_channel:
+                await self._manage_support_channel_message(support_channel)
+        await ctx.send("Ticket types reloaded. Panels whose content changed have been updated.")
+
+    async def create_ticket_channel(self, interaction: discord.Interaction, problem_type: str):
+        # The interaction was already deferred in the button's callback.
+        guild = interaction.guild
+        user = interaction.user
+
+        # Create channel name
+        user_name_for_channel = user.global_name if user.global_name else user.name
+        ticket_channel_name = f"ticket-{user_name_for_channel.lower().replace(' ', '-')}-{problem_type.lower().replace(' ', '-')}"
+        ticket_channel_name = ticket_channel_name[:95] 
+        ticket_channel_name = "".join(c for c in ticket_channel_name if c.isalnum() or c == '-')
+
+        # Determine the source channel for the ticket (e.g., General Support)
+        source_channel_name = self.support_channels.get(interaction.channel_id, "Unknown Category")
+
+        # Define permissions for the new channel
+        overwrites, roles_to_mention = self._build_ticket_overwrites(guild, user)
+
+        try:
+            ticket_topic = f"Support ticket for {user.display_name} (ID: {user.id}) regarding a {problem_type}. Source: {source_channel_name}."
+            acquire_start = time.perf_counter()
+            if TICKET_BACKEND == "thread":
+                new_channel = await self._open_ticket_thread(interaction, ticket_channel_name, user)
+                acquire_path = 'thread'
+            else:
+                # Claim a pre-created channel from the pool (one edit) or create the actual text channel
+                new_channel = await self._claim_pooled_channel(guild, ticket_channel_name, ticket_topic, overwrites)
+                acquire_path = 'pool'
+            if not new_channel:
+                # Placed in the least-full ticket category (overflow categories are opened on demand)
+                new_channel = await self._create_ticket_text_channel(guild, ticket_channel_name, overwrites, topic=ticket_topic)
+                acquire_path = 'create'
+            acquire_ms = (time.perf_counter() - acquire_start) * 1000
+            self.channel_acquire_latency[acquire_path].add(acquire_ms)
+            log.info(f"New ticket channel created: {new_channel.name} by {user.display_name}.", extra={
+                'guild_id': guild.id, 'ticket_id': new_channel.id, 'user_id': user.id,
+                'acquire_path': acquire_path, 'acquire_ms': round(acquire_ms, 1)
+            })
+            self._stats(guild.id).ticket_opened(
+                new_channel.id, source_channel_name, user.id, time.time(),
+                creator_name=user.display_name, problem_type=problem_type, backend=TICKET_BACKEND,
+                bot_message_ids=[]
             )
+            self._save_stats()
+            self._track_activity(new_channel.id, time.time())
 
-            # Send the followup message after channel creation
+            # The user gets the link as soon as the channel exists; welcome and log are posted in the background
             await interaction.followup.send(f"Your ticket channel has been created: {new_channel.mention}", ephemeral=True)
+            link_ms = (discord.utils.utcnow() - interaction.created_at).total_seconds() * 1000
+            self.ticket_link_latency.add(link_ms)
+            log.debug(f"Ticket link for {new_channel.name} sent.", extra={'ticket_id': new_channel.id, 'link_ms': round(link_ms, 1)})
 
-            # Envío de log al canal de logs
-            log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-            if log_channel:
-                log_embed = discord.Embed(
-                    title="🎟️ Nuevo Ticket Abierto",
-                    color=discord.Color.blue()
-                )
-                log_embed.add_field(name="Abierto Por", value=user.mention, inline=True)
-                log_embed.add_field(name="Tipo de Problema", value=problem_type, inline=True)
-                log_embed.add_field(name="Canal de Origen", value=f"#{interaction.channel.name} ({source_channel_name})", inline=True)
-                log_embed.add_field(name="Canal de Ticket", value=new_channel.mention, inline=True)
-                log_embed.add_field(name="Hora de Apertura", value=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'), inline=True)
-                log_embed.set_footer(text=f"ID del Ticket: {new_channel.id}")
-                try:
-                    await log_channel.send(embed=log_embed)
-                    print(f"Log: Mensaje de nuevo ticket enviado al canal de logs para {new_channel.name}.")
-                except discord.Forbidden:
-                    print(f"Log: ERROR: No tengo permisos para enviar mensajes en el canal de logs ({LOG_CHANNEL_ID}).")
-                except Exception as e:
-                    print(f"Log: ERROR desconocido al enviar log de ticket abierto: {e}")
-            else:
-                print(f"Log: ADVERTENCIA: El canal de logs con ID {LOG_CHANNEL_ID} no fue encontrado o no está accesible en TicketsCog.")
+            task = asyncio.create_task(self._post_ticket_opening(interaction, new_channel, user, problem_type, source_channel_name, roles_to_mention))
+            self._opening_tasks.add(task)
+            task.add_done_callback(self._opening_tasks.discard)
 
         except discord.Forbidden:
             await interaction.followup.send("Error: I don't have permissions to create channels or set up their permissions. Please check my role permissions (Manage Channels, Manage Roles).", ephemeral=True)
-            print("Log: ERROR: Bot lacks permissions to create or configure ticket channels.")
+            log.error("Bot lacks permissions to create or configure ticket channels.")
         except Exception as e:
             await interaction.followup.send(f"An unexpected error occurred while creating your ticket: {e}", ephemeral=True)
-            print(f"Log: Unexpected error during ticket channel creation: {e}")
+            log.error(f"Unexpected error during ticket channel creation: {e}")
+
+    async def _post_ticket_opening(self, interaction, new_channel, user, problem_type, source_channel_name, roles_to_mention):
+        """Posts the welcome message and the log entry of a new ticket concurrently; a failure in one does not stop the other."""
+        results = await asyncio.gather(
+            self._send_ticket_welcome(new_channel, user, problem_type, roles_to_mention),
+            self._log_ticket_opened(interaction, new_channel, user, problem_type, source_channel_name),
+            return_exceptions=True
+        )
+        for step, result in zip(("welcome message", "log entry"), results):
+            if isinstance(result, BaseException):
+                log.error(f"Error posting the {step} of ticket {new_channel.name}: {result}", extra={'ticket_id': new_channel.id})
+
+    async def _send_ticket_welcome(self, new_channel, user, problem_type, roles_to_mention):
+        # Construct the mentions string for staff
+        staff_mentions = ", ".join(roles_to_mention) if roles_to_mention else "Our support team"
+
+        # Send initial welcome message in the new ticket channel
+        welcome_embed = discord.Embed(
+            title=f"👋 Welcome to your {problem_type} Ticket, {user.display_name}!",
+            description=(
+                "Please describe your problem in detail below. Our team will review your issue and get back to you as soon as possible.\n"
+                "If your issue is resolved, or you no longer need assistance, you can close this ticket at any time by clicking the button below."
+            ),
+            color=discord.Color.green()
+        )
+        close_ticket_view = TicketCloseView(self)
+
+        # Send message with user mention AND staff mentions
+        welcome_message = await new_channel.send(
+            f"{user.mention} {staff_mentions}, a new ticket has been opened for you.",
+            embed=welcome_embed,
+            view=close_ticket_view
+        )
+        self._record_bot_message(new_channel, welcome_message)
+
+    async def _log_ticket_opened(self, interaction, new_channel, user, problem_type, source_channel_name):
+        # Envío de log al canal de logs
+        log_channel = self._get_log_channel(interaction.guild)
+        if not log_channel:
+            log.warning(f"El servidor {interaction.guild.id} no tiene un canal de logs accesible en TicketsCog.")
+            return
+        log_embed = discord.Embed(
+            title="🎟️ Nuevo Ticket Abierto",
+            color=discord.Color.blue()
+        )
+        log_embed.add_field(name="Abierto Por", value=user.mention, inline=True)
+        log_embed.add_field(name="Tipo de Problema", value=problem_type, inline=True)
+        log_embed.add_field(name="Canal de Origen", value=f"#{interaction.channel.name} ({source_channel_name})", inline=True)
+        log_embed.add_field(name="Canal de Ticket", value=new_channel.mention, inline=True)
+        log_embed.add_field(name="Hora de Apertura", value=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'), inline=True)
+        log_embed.set_footer(text=f"ID del Ticket: {new_channel.id}")
+        try:
+            await log_channel.send(embed=log_embed)
+            log.info(f"Mensaje de nuevo ticket enviado al canal de logs para {new_channel.name}.")
+        except discord.Forbidden:
+            log.error(f"No tengo permisos para enviar mensajes en el canal de logs ({log_channel.id}).")
+
+    async def wait_ticket_openings(self):
+        """Waits for the welcome/log posts of the tickets opened so far."""
+        while self._opening_tasks:
+            await asyncio.gather(*self._opening_tasks, return_exceptions=True)
 
     # --- Ticket Closure Logic ---
-    async def finalize_ticket_closure(self, channel: discord.TextChannel, closer: discord.Member, status: str, original_creator_id: int, closer_is_admin: bool):
-        archive_channel = self.bot.get_channel(ARCHIVE_CHANNEL_ID)
-        if not archive_channel:
-            print(f"Log: ERROR: Archive channel with ID {ARCHIVE_CHANNEL_ID} not found. Cannot archive ticket.")
+    # Un cierre es un trabajo: se registra en el diario y lo ejecuta uno de los CLOSURE_WORKERS, paso a paso
+    # (CLOSURE_STEPS). Cada paso completado queda en el diario, así tras un reinicio solo se ejecutan los que faltan.
+    async def finalize_ticket_closure(self, channel: discord.TextChannel, closer: discord.Member, status: str, original_creator_id: int, closer_is_admin: bool, wait: bool = False):
+        """
+        Submits the closure of a ticket to the closure worker pool. Returns False if it was refused
+        (shutting down, or too many closures queued). With `wait`, returns once the closure has run.
+        """
+        if self.draining:
+            log.info(f"Closure of {channel.name} not started: the bot is shutting down.")
+            return False
+        # Guard against double closures (e.g. a staff click racing the idle auto-close)
+        if channel.id in self.closure_pool.pending:
+            log.info(f"Closure of {channel.name} already in progress. Ignoring duplicate request.")
+            return True
+        if self.closure_pool.full():
+            log.warning(f"Closure of {channel.name} refused: {self.closure_pool.queue.qsize()} closures already queued.")
+            return False
+
+        info = self._get_ticket_info(channel)
+        state = {
+            'channel_name': channel.name,
+            'status': status,
+            'closer_id': closer.id,
+            'closer_name': closer.display_name,
+            'closer_is_admin': closer_is_admin,
+            'creator_id': int(original_creator_id) if original_creator_id else info['creator_id'],
+            'creator_name': info['creator_name'],
+            'problem_type': info['problem_type'],
+            'source_channel': info['source_channel'],
+            'opened_at': self._ticket_opened_at(channel).timestamp(),
+            'closed_at': time.time()
+        }
+        if not await asyncio.to_thread(self.closure_journal.add, channel.id, channel.guild.id, state):
+            log.info(f"Closure of {channel.name} already journaled. Resuming it.")
+        self._closure_channels[channel.id] = channel
+        done = self.closure_pool.submit(channel.id)
+        if done is None: # The queue filled up while journaling
+            await asyncio.to_thread(self.closure_journal.remove, channel.id)
+            self._closure_channels.pop(channel.id, None)
+            return False
+        if wait:
+            await done
+        return True
+
+    async def drain(self, timeout):
+        """
+        Shutdown step: refuses new ticket interactions, waits up to `timeout` seconds for the queued and
+        running closures and saves the ticket state. Unfinished closures resume from the journal on the next start.
+        """
+        self.draining = True
+        self.idle_scheduler.stop()
+        for handle in self._closure_retries.values():
+            handle.cancel()
+        if self._closure_retries:
+            log.warning(f"{len(self._closure_retries)} failed ticket closures were waiting to be retried. They resume from the journal on the next start.",
+                        extra={'ticket_ids': sorted(self._closure_retries)})
+        retries_pending = len(self._closure_retries)
+        self._closure_retries.clear()
+        in_flight = len(self.closure_pool.pending)
+        deadline = time.monotonic() + timeout
+        try:
+            await asyncio.wait_for(self.wait_ticket_openings(), timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"Shutdown deadline reached with {len(self._opening_tasks)} ticket welcome/log posts unfinished.")
+        try:
+            await asyncio.wait_for(self.closure_pool.wait_idle(), max(deadline - time.monotonic(), 0))
+        except asyncio.TimeoutError:
+            log.warning(f"Shutdown deadline reached with {len(self.closure_pool.pending)} ticket closures unfinished. They resume on the next start.",
+                        extra={'ticket_ids': sorted(self.closure_pool.pending)})
+        await self._flush_stats()
+        self._save_config()
+        return {'closures_waited': in_flight, 'closures_resumable': len(self.closure_pool.pending) + retries_pending}
+
+    async def _resume_closure_jobs(self):
+        """Re-queues the closures journaled before a restart (only for the servers this process owns)."""
+        resumed = 0
+        for ticket_id, guild_id in await asyncio.to_thread(self.closure_journal.pending):
+            if sharding.owns_guild(guild_id) and ticket_id not in self.closure_pool.pending:
+                await self.closure_pool.submit_wait(ticket_id)
+                resumed += 1
+        if resumed:
+            log.info(f"Resuming {resumed} ticket closures interrupted by a restart.")
+
+    async def _resolve_ticket_channel(self, ticket_id):
+        """Live channel/thread of a ticket, or None if it no longer exists."""
+        channel = self._closure_channels.pop(ticket_id, None) or self.bot.get_channel(ticket_id)
+        if channel:
+            return channel
+        try:
+            return await self.bot.fetch_channel(ticket_id)
+        except (discord.NotFound, discord.Forbidden):
+            return None
+
+    def _schedule_closure_retry(self, ticket_id):
+        self._closure_retries[ticket_id] = asyncio.get_running_loop().call_later(CLOSURE_RETRY_DELAY, self._retry_closure, ticket_id)
+
+    def _retry_closure(self, ticket_id):
+        self._closure_retries.pop(ticket_id, None)
+        if self.draining:
+            return # drain() already logged it; the journal resumes it on the next start
+        if self.closure_pool.submit(ticket_id) is None:
+            log.warning(f"Closure retry of ticket {ticket_id} not queued: {self.closure_pool.queue.qsize()} closures already queued. Retrying in {CLOSURE_RETRY_DELAY}s.",
+                        extra={'ticket_id': ticket_id})
+            self._schedule_closure_retry(ticket_id)
+
+    async def _run_closure_job(self, ticket_id):
+        """Closure worker: runs the steps of a journaled closure that are not done yet, journaling each one."""
+        job = await asyncio.to_thread(self.closure_journal.get, ticket_id)
+        if job is None:
+            return
+        state = job['state']
+        channel = await self._resolve_ticket_channel(ticket_id)
+        for step in CLOSURE_STEPS:
+            if step in job['steps_done']:
+                continue
+            try:
+                keep_going = await getattr(self, f"_closure_{step}")(job, channel)
+            except Exception as e:
+                attempts = await asyncio.to_thread(self.closure_journal.failed_attempt, ticket_id)
+                if attempts < CLOSURE_MAX_ATTEMPTS and not self.draining:
+                    log.error(f"Closure of {state['channel_name']} failed at step '{step}': {e}. Retrying in {CLOSURE_RETRY_DELAY}s.",
+                              extra={'ticket_id': ticket_id, 'step': step, 'attempts': attempts})
+                    self._schedule_closure_retry(ticket_id)
+                elif attempts < CLOSURE_MAX_ATTEMPTS:
+                    log.error(f"Closure of {state['channel_name']} failed at step '{step}' while shutting down: {e}. It resumes on the next start.",
+                              extra={'ticket_id': ticket_id, 'step': step, 'attempts': attempts})
+                else:
+                    log.error(f"Closure of {state['channel_name']} failed at step '{step}' {attempts} times: {e}. Giving up; the ticket can be closed again.",
+                              extra={'ticket_id': ticket_id, 'step': step, 'attempts': attempts})
+                    await asyncio.to_thread(self.closure_journal.remove, ticket_id)
+                return
+            if keep_going is False: # The step cancelled the closure (e.g. no archive channel)
+                await asyncio.to_thread(self.closure_journal.remove, ticket_id)
+                return
+            job['steps_done'].append(step)
+            await asyncio.to_thread(self.closure_journal.complete_step, job, with_transcript=(step == 'transcript'))
+        await asyncio.to_thread(self.closure_journal.remove, ticket_id)
+        log.info(f"Closure of {state['channel_name']} completed.",
+                 extra={'ticket_id': ticket_id, 'status': state['status'], 'seconds': round(time.time() - state['closed_at'], 2)})
+
+    @staticmethod
+    def _closure_colour(status):
+        if status == "user-closed": # Specific color for user-closed
+            return discord.Color.greyple()
+        return discord.Color.green() if status == "solved" else discord.Color.red()
+
+    async def _closure_transcript(self, job, channel):
+        """Step 1: status message in the ticket, history, attachment mirror. The transcript is journaled."""
+        state = job['state']
+        if channel is None:
+            log.error(f"Ticket channel {state['channel_name']} no longer exists. Closure cancelled before its transcript was compiled.")
+            return False
+        archive_channel_id = ticket_settings(job['guild_id']).get('archive_channel_id')
+        if not (self.bot.get_channel(archive_channel_id) if archive_channel_id else None):
+            log.error(f"Archive channel with ID {archive_channel_id} not found. Cannot archive ticket.")
             # Intenta enviar un mensaje al canal del ticket antes de que se borre, si es posible.
             try:
                 await channel.send("Error: The archive channel could not be found. Please contact an administrator.", delete_after=10)
             except: # Ignore any error if channel is already gone
                 pass
-            return
+            return False
 
-        closure_by_text = "by a staff member" if closer_is_admin else "by the ticket creator"
-        
-        # Send confirmation message to the ticket channel
-        try:
-            await channel.send(f"Ticket closure confirmed as **{status.upper()}** {closure_by_text} ({closer.display_name}). Compiling transcript...")
-        except discord.Forbidden:
-            print(f"Log: Bot lacks permissions to send confirmation message in ticket channel {channel.name}.")
-        except Exception as e:
-            print(f"Log: Error sending initial closure confirmation message: {e}")
+        closure_by_text = "by a staff member" if state['closer_is_admin'] else "by the ticket creator"
 
+        # Messages the bot posted in the ticket (welcome, confirmations, status) are left out of the transcript.
+        # Tickets opened before their IDs were recorded fall back to matching the message content.
+        stats = self._stats(job['guild_id'])
+        recorded_ids = stats.open_tickets.get(str(channel.id), {}).get('bot_message_ids')
+        skip_message_ids = set(recorded_ids or ())
+
+        # Send confirmation message to the ticket channel (once: a resumed job already has it)
+        if not state.get('status_message_id'):
+            try:
+                status_message = await channel.send(f"Ticket closure confirmed as **{state['status'].upper()}** {closure_by_text} ({state['closer_name']}). Compiling transcript...")
+                state['status_message_id'] = status_message.id
+                await asyncio.to_thread(self.closure_journal.complete_step, job)
+            except discord.Forbidden:
+                log.warning(f"Bot lacks permissions to send confirmation message in ticket channel {channel.name}.")
+            except Exception as e:
+                log.error(f"Error sending initial closure confirmation message: {e}")
+        skip_message_ids.add(state.get('status_message_id'))
+
+        ticket_creator_id_str = str(state['creator_id']) if state['creator_id'] else "N/A"
         transcript_content_lines = [] # Collect all lines first
         transcript_content_lines.append(f"--- Ticket Transcript for Channel: #{channel.name} ---\n")
-        
-        ticket_creator_id_str = str(original_creator_id) if original_creator_id else "N/A"
-        ticket_creator_name = "Unknown User"
-        if channel.topic and "(ID: " in channel.topic:
-            try:
-                start_name_idx = channel.topic.find("for ")
-                end_name_idx = channel.topic.find(" (ID:")
-                if start_name_idx != -1 and end_name_idx != -1 and start_name_idx < end_name_idx:
-                    ticket_creator_name = channel.topic[start_name_idx + len("for "):end_name_idx].strip()
-            except Exception:
-                pass 
-
-        transcript_content_lines.append(f"Ticket opened by: {ticket_creator_name} (ID: {ticket_creator_id_str})\n")
-        transcript_content_lines.append(f"Ticket opened at: {channel.created_at.strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
-        transcript_content_lines.append(f"Ticket closed by: {closer.display_name} (ID: {closer.id})\n")
-        transcript_content_lines.append(f"Ticket closed at: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
-        transcript_content_lines.append(f"Final Status: {status.upper()}\n") 
-        transcript_content_lines.append(f"Closed by Role: {'Admin/Mod' if closer_is_admin else 'User'}\n")
+        transcript_content_lines.append(f"Ticket opened by: {state['creator_name'] or 'Unknown User'} (ID: {ticket_creator_id_str})\n")
+        transcript_content_lines.append(f"Ticket opened at: {format_utc(state['opened_at'])}\n")
+        transcript_content_lines.append(f"Ticket closed by: {state['closer_name']} (ID: {state['closer_id']})\n")
+        transcript_content_lines.append(f"Ticket closed at: {format_utc(state['closed_at'])}\n")
+        transcript_content_lines.append(f"Final Status: {state['status'].upper()}\n")
+        transcript_content_lines.append(f"Closed by Role: {'Admin/Mod' if state['closer_is_admin'] else 'User'}\n")
         transcript_content_lines.append("-" * 50 + "\n\n")
 
         # Fetch messages for transcript - LİMİTED TO MAX_TRANSCRIPT_MESSAGES
-        try:
-            messages_fetched = []
-            async for message in channel.history(limit=MAX_TRANSCRIPT_MESSAGES, oldest_first=True):
-                if message.author == self.bot.user and (
-                    (message.embeds and "Welcome to your" in (message.embeds[0].title if message.embeds else "")) or
-                    (message.content and "Ticket closure confirmed as" in message.content) or
-                    (message.embeds and "Confirm Ticket Closure" in (message.embeds[0].title if message.embeds else False)) or
-                    (message.components and any(c.custom_id in ["ticket_close_button", "ticket_solved_button", "ticket_unresolved_button"] for row in message.components for c in row.children))
-                ):
-                    continue
+        entries = [] # One structured entry per message, built in a single pass
+        ticket_attachments = []
+        async for message in channel.history(limit=MAX_TRANSCRIPT_MESSAGES, oldest_first=True):
+            if message.id in skip_message_ids:
+                continue
+            if recorded_ids is None and message.author == self.bot.user and is_legacy_bot_chrome(message):
+                continue
+            entry = transcript_entry(message)
+            entries.append(entry)
+            ticket_attachments.extend(entry['attachments'])
 
-                msg_line = f"[{message.created_at.strftime('%Y-%m-%d %H:%M:%S')}] {message.author.display_name} ({message.author.id}): {message.content}\n"
-                messages_fetched.append(msg_line)
-                if message.attachments:
-                    for attachment in message.attachments:
-                        messages_fetched.append(f"        Attachment: {attachment.url}\n")
-            
-            transcript_content_lines.extend(messages_fetched)
-            transcript_full_content = "".join(transcript_content_lines) # Join all lines once
+        transcript_header = "".join(transcript_content_lines)
 
-            # Determine color for archive embed based on status and closer
-            embed_color = discord.Color.green() if status == "solved" else discord.Color.red()
-            if status == "user-closed": # Specific color for user-closed
-                embed_color = discord.Color.greyple()
+        def render_transcript(mirrored=None, skipped=None):
+            return transcript_header + "".join(format_transcript_entry(entry, mirrored, skipped) for entry in entries)
 
-            # --- SEND TRANSCRIPT TO ARCHIVE CHANNEL ---
-            try:
-                # Create a NEW StringIO object for the archive channel
-                transcript_file_archive = io.StringIO(transcript_full_content)
-                archive_filename = f"transcript-{channel.name}.txt"
-                archive_file_obj = discord.File(transcript_file_archive, filename=archive_filename)
+        transcript_full_content = render_transcript()
 
-                archive_embed = discord.Embed(
-                    title=f"Ticket Closed: {channel.name} ({status.upper()})", 
-                    description=f"Ticket by <@{ticket_creator_id_str}> closed by {closer.mention}.",
-                    color=embed_color
+        # --- MIRROR ATTACHMENTS INTO A ZIP WITH THE TRANSCRIPT ---
+        state['attachment_archive'] = None
+        if self.attachment_mirror and ticket_attachments:
+            # El zip tiene que caber en el límite de subida del servidor, con el transcript incluido
+            budget = channel.guild.filesize_limit - len(transcript_full_content.encode('utf-8')) - 64 * 1024
+            try:
+                attachment_archive = await self.attachment_mirror.build_archive(
+                    channel.id, ticket_attachments, budget, render_transcript
                 )
-                archive_embed.add_field(name="Channel", value=f"#{channel.name}", inline=True)
-                archive_embed.add_field(name="Opened At", value=channel.created_at.strftime('%Y-%m-%d %H:%M:%S UTC'), inline=True)
-                archive_embed.add_field(name="Closed At", value=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'), inline=True)
-                archive_embed.add_field(name="Closer", value=closer.mention, inline=True)
-                archive_embed.add_field(name="Final Status", value=status.upper(), inline=True) 
-                archive_embed.add_field(name="Closed by Role", value="Admin/Mod" if closer_is_admin else "User", inline=True)
-                archive_embed.set_footer(text=f"Ticket ID: {channel.id}")
-
-                await archive_channel.send(embed=archive_embed, file=archive_file_obj)
-                print(f"Log: Ticket {channel.name} archived successfully with status: {status} by {'admin' if closer_is_admin else 'user'}.")
-            except discord.HTTPException as http_e:
-                print(f"Log: ERROR sending transcript to archive channel ({ARCHIVE_CHANNEL_ID}): HTTP error {http_e.status} - {http_e.text}. Likely file size limit or rate limit. Transcript content length: {len(transcript_full_content)} bytes.")
-                await channel.send(f"⚠️ Error archiving transcript: {http_e.text}. The channel will still be deleted.", delete_after=10)
+                transcript_full_content = attachment_archive['transcript']
+                state['attachment_archive'] = {
+                    'path': attachment_archive['path'],
+                    'mirrored': len(attachment_archive['mirrored']),
+                    'skipped': len(attachment_archive['skipped'])
+                }
+                log.info(f"Mirrored {len(attachment_archive['mirrored'])}/{len(ticket_attachments)} attachments of {channel.name}.",
+                         extra={'ticket_id': channel.id, 'zip_bytes': attachment_archive['size'], 'seconds': round(attachment_archive['seconds'], 2)})
             except Exception as e:
-                print(f"Log: Unexpected ERROR archiving transcript for {channel.name}: {e}")
-                await channel.send(f"⚠️ An unexpected error occurred while archiving the transcript: {e}. The channel will still be deleted.", delete_after=10)
+                log.error(f"Error mirroring attachments of {channel.name}: {e}. Archiving the plain transcript instead.")
 
+        job['transcript'] = transcript_full_content
 
-            # --- SEND LOG OF TICKET CLOSURE TO LOG CHANNEL ---
-            log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-            if log_channel:
-                log_embed_close = discord.Embed(
-                    title="Ticket Cerrado",
-                    description=f"El ticket {channel.name} ha sido cerrado.",
-                    color=embed_color 
+    async def _closure_archive(self, job, channel):
+        """Step 2: transcript (or attachment zip) and summary embed to the archive channel."""
+        state = job['state']
+        name = state['channel_name']
+        transcript_full_content = job['transcript']
+        archive_channel_id = ticket_settings(job['guild_id']).get('archive_channel_id')
+        archive_channel = self.bot.get_channel(archive_channel_id) if archive_channel_id else None
+        if not archive_channel:
+            log.error(f"Archive channel with ID {archive_channel_id} not found. Transcript of {name} kept only in the local archive.")
+            return
+
+        attachment_archive = state.get('attachment_archive')
+        try:
+            if attachment_archive and os.path.exists(attachment_archive['path']):
+                # Se sube en streaming desde el disco
+                archive_file_obj = discord.File(attachment_archive['path'], filename=f"ticket-{name}.zip")
+            else:
+                # Create a NEW StringIO object for the archive channel
+                transcript_file_archive = io.StringIO(transcript_full_content)
+                archive_filename = f"transcript-{name}.txt"
+                archive_file_obj = discord.File(transcript_file_archive, filename=archive_filename)
+
+            archive_embed = discord.Embed(
+                title=f"Ticket Closed: {name} ({state['status'].upper()})",
+                description=f"Ticket by <@{state['creator_id'] or 'N/A'}> closed by <@{state['closer_id']}>.",
+                color=self._closure_colour(state['status'])
+            )
+            archive_embed.add_field(name="Channel", value=f"#{name}", inline=True)
+            archive_embed.add_field(name="Opened At", value=format_utc(state['opened_at']), inline=True)
+            archive_embed.add_field(name="Closed At", value=format_utc(state['closed_at']), inline=True)
+            archive_embed.add_field(name="Closer", value=f"<@{state['closer_id']}>", inline=True)
+            archive_embed.add_field(name="Final Status", value=state['status'].upper(), inline=True)
+            archive_embed.add_field(name="Closed by Role", value="Admin/Mod" if state['closer_is_admin'] else "User", inline=True)
+            if attachment_archive:
+                archive_embed.add_field(
+                    name="Attachments",
+                    value=f"{attachment_archive['mirrored']} archived, {attachment_archive['skipped']} kept as links",
+                    inline=True
                 )
-                log_embed_close.add_field(name="Canal", value=f"#{channel.name}", inline=True)
-                log_embed_close.add_field(name="Cerrado Por", value=closer.mention, inline=True)
-                log_embed_close.add_field(name="Creador Original", value=f"<@{original_creator_id}>" if original_creator_id else "N/A", inline=True)
-                log_embed_close.add_field(name="Estado Final", value=status.upper(), inline=True)
-                log_embed_close.add_field(name="Rol de Cierre", value="Admin/Mod" if closer_is_admin else "Usuario", inline=True)
-                log_embed_close.add_field(name="Hora de Cierre", value=datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC'), inline=True)
-                log_embed_close.set_footer(text=f"ID del Ticket: {channel.id}")
-                try:
-                    # Create a NEW StringIO object for the log channel
-                    transcript_file_log = io.StringIO(transcript_full_content)
-                    log_filename = f"log_transcript_{channel.name}.txt"
-                    log_file_obj = discord.File(transcript_file_log, filename=log_filename)
-                    
-                    await log_channel.send(embed=log_embed_close, file=log_file_obj)
-                    print(f"Log: Mensaje de cierre de ticket enviado al canal de logs para {channel.name}.")
-                except discord.Forbidden:
-                    print(f"Log: ERROR: No tengo permisos para enviar mensajes en el canal de logs ({LOG_CHANNEL_ID}) al cerrar un ticket.")
-                except discord.HTTPException as http_e:
-                    print(f"Log: ERROR sending transcript to log channel ({LOG_CHANNEL_ID}): HTTP error {http_e.status} - {http_e.text}. Likely file size limit or rate limit. Transcript content length: {len(transcript_full_content)} bytes.")
-                except Exception as e:
-                    print(f"Log: ERROR desconocido al enviar log de cierre de ticket: {e}")
-
-            # --- SEND DM TO USER (IF POSSIBLE) ---
-            if original_creator_id and original_creator_id != "N/A":
+            archive_embed.set_footer(text=f"Ticket ID: {job['ticket_id']}")
+
+            archive_message = await send_durably(self.outbox, archive_channel, embed=archive_embed, file=archive_file_obj,
+                                                 tag=f"archive:{job['ticket_id']}")
+            if archive_message:
+                state['archive_channel_id'] = archive_message.channel.id
+                state['archive_message_id'] = archive_message.id
+                log.info(f"Ticket {name} archived successfully.", extra={
+                    'guild_id': job['guild_id'], 'ticket_id': job['ticket_id'], 'status': state['status'],
+                    'closer_id': state['closer_id'], 'closer_is_admin': state['closer_is_admin']
+                })
+            else:
+                # Discord falló de forma transitoria: el archivo queda en el outbox y se reintenta aunque el canal se borre.
+                # Cuando se entregue, _archive_delivered guarda el ID del mensaje en el archivo local.
+                log.warning(f"Archive upload of {name} deferred to the outbox.", extra={'guild_id': job['guild_id'], 'ticket_id': job['ticket_id']})
+        except discord.HTTPException as http_e:
+            log.error(f"Error sending transcript to archive channel ({archive_channel_id}): HTTP error {http_e.status} - {http_e.text}. Likely file size limit (rate limits and 5xx errors are retried from the outbox). Transcript content length: {len(transcript_full_content)} bytes.")
+            if channel:
                 try:
-                    ticket_creator = await self.bot.fetch_user(int(original_creator_id))
-                    if ticket_creator:
-                        dm_description = ""
-                        if status == "solved":
-                            dm_description = f"Your support ticket in **#{channel.name}** has been closed by {closer.display_name} with status: **Solved**.\nWe hope your issue was resolved!"
-                        elif status == "unresolved":
-                            dm_description = f"Your support ticket in **#{channel.name}** has been closed by {closer.display_name} with status: **Unresolved**.\nIf your issue persists, please open a new ticket."
-                        elif status == "user-closed":
-                            dm_description = f"Your support ticket in **#{channel.name}** has been closed by you.\nIf you need further assistance, please open a new ticket."
-
-                        dm_embed = discord.Embed(
-                            title="Your Homedocks Ticket Has Been Closed",
-                            description=dm_description,
-                            color=discord.Color.light_grey()
-                        )
-                        dm_embed.add_field(name="Ticket Channel", value=f"#{channel.name}", inline=True)
-                        dm_embed.add_field(name="Closed By", value=closer.display_name, inline=True)
-                        dm_embed.add_field(name="Final Status", value=status.upper(), inline=True) 
-                        dm_embed.set_footer(text="Thank you for using Homedocks Support!")
-                        
-                        # Create a NEW StringIO object for the DM
-                        transcript_file_dm = io.StringIO(transcript_full_content)
-                        dm_filename = f"transcript-{channel.name}.txt"
-                        dm_file_obj = discord.File(transcript_file_dm, filename=dm_filename)
-
-                        await ticket_creator.send(embed=dm_embed, file=dm_file_obj)
-                        print(f"Log: Transcript DM sent to {ticket_creator.display_name}.")
-                except (discord.Forbidden, discord.HTTPException) as dm_e:
-                    print(f"Log: Could not send DM to ticket creator {original_creator_id}: {dm_e}. Likely DMs disabled or file too large. Transcript content length: {len(transcript_full_content)} bytes.")
-                except Exception as ex:
-                    print(f"Log: Unexpected error sending DM for transcript: {ex}")
-
-            # Delete the ticket channel
-            await channel.delete(reason=f"Ticket closed by {closer.display_name} ({status})")
-            print(f"Log: Ticket channel {channel.name} deleted.")
+                    await channel.send(f"⚠️ Error archiving transcript: {http_e.text}. The channel will still be deleted.", delete_after=10)
+                except discord.HTTPException:
+                    pass
+
+    async def _closure_index(self, job, channel):
+        """Step 3: local searchable archive and ticket KPIs."""
+        state = job['state']
+        await self._store_transcript(job['ticket_id'], job['guild_id'], state, job['transcript'])
+        stats = self._stats(job['guild_id'])
+        if stats.is_open(job['ticket_id']): # Idempotent: a resumed job does not count the closure twice
+            stats.ticket_closed(job['ticket_id'], state['status'], state['closed_at'])
+            self._save_stats()
+        self._stop_tracking(job['ticket_id'])
+
+    async def _closure_log(self, job, channel):
+        """Step 4: closure embed and transcript to the server's log channel."""
+        state = job['state']
+        name = state['channel_name']
+        transcript_full_content = job['transcript']
+        log_channel = self._get_log_channel(discord.Object(id=job['guild_id']))
+        if not log_channel:
+            return
+        log_embed_close = discord.Embed(
+            title="Ticket Cerrado",
+            description=f"El ticket {name} ha sido cerrado.",
+            color=self._closure_colour(state['status'])
+        )
+        log_embed_close.add_field(name="Canal", value=f"#{name}", inline=True)
+        log_embed_close.add_field(name="Cerrado Por", value=f"<@{state['closer_id']}>", inline=True)
+        log_embed_close.add_field(name="Creador Original", value=f"<@{state['creator_id']}>" if state['creator_id'] else "N/A", inline=True)
+        log_embed_close.add_field(name="Estado Final", value=state['status'].upper(), inline=True)
+        log_embed_close.add_field(name="Rol de Cierre", value="Admin/Mod" if state['closer_is_admin'] else "Usuario", inline=True)
+        log_embed_close.add_field(name="Hora de Cierre", value=format_utc(state['closed_at']), inline=True)
+        log_embed_close.set_footer(text=f"ID del Ticket: {job['ticket_id']}")
+        try:
+            # Create a NEW StringIO object for the log channel
+            transcript_file_log = io.StringIO(transcript_full_content)
+            log_filename = f"log_transcript_{name}.txt"
+            log_file_obj = discord.File(transcript_file_log, filename=log_filename)
 
+            await log_channel.send(embed=log_embed_close, file=log_file_obj)
+            log.info(f"Mensaje de cierre de ticket enviado al canal de logs para {name}.")
         except discord.Forbidden:
-            # If bot can't send messages to the ticket channel (already deleted by someone else, or perms issue)
-            print(f"Log: ERROR: Bot lacks permissions to send final messages/archive/delete ticket channel {channel.name}. Channel might be gone.")
+            log.error(f"No tengo permisos para enviar mensajes en el canal de logs ({log_channel.id}) al cerrar un ticket.")
+        except discord.HTTPException as http_e:
+            log.error(f"Error sending transcript to log channel ({log_channel.id}): HTTP error {http_e.status} - {http_e.text}. Likely file size limit (rate limits and 5xx errors are retried from the outbox). Transcript content length: {len(transcript_full_content)} bytes.")
+
+    async def _closure_dm(self, job, channel):
+        """Step 5: transcript DM to the ticket creator (if possible)."""
+        state = job['state']
+        name = state['channel_name']
+        transcript_full_content = job['transcript']
+        if not state['creator_id']:
+            return
+        try:
+            ticket_creator = await self.bot.fetch_user(int(state['creator_id']))
+            if ticket_creator:
+                dm_description = ""
+                if state['status'] == "solved":
+                    dm_description = f"Your support ticket in **#{name}** has been closed by {state['closer_name']} with status: **Solved**.\nWe hope your issue was resolved!"
+                elif state['status'] == "unresolved":
+                    dm_description = f"Your support ticket in **#{name}** has been closed by {state['closer_name']} with status: **Unresolved**.\nIf your issue persists, please open a new ticket."
+                elif state['status'] == "user-closed":
+                    dm_description = f"Your support ticket in **#{name}** has been closed by you.\nIf you need further assistance, please open a new ticket."
+
+                dm_embed = discord.Embed(
+                    title="Your Homedocks Ticket Has Been Closed",
+                    description=dm_description,
+                    color=discord.Color.light_grey()
+                )
+                dm_embed.add_field(name="Ticket Channel", value=f"#{name}", inline=True)
+                dm_embed.add_field(name="Closed By", value=state['closer_name'], inline=True)
+                dm_embed.add_field(name="Final Status", value=state['status'].upper(), inline=True)
+                dm_embed.set_footer(text="Thank you for using Homedocks Support!")
+
+                # Create a NEW StringIO object for the DM
+                transcript_file_dm = io.StringIO(transcript_full_content)
+                dm_filename = f"transcript-{name}.txt"
+                dm_file_obj = discord.File(transcript_file_dm, filename=dm_filename)
+
+                if await send_durably(self.outbox, ticket_creator, embed=dm_embed, file=dm_file_obj):
+                    log.info(f"Transcript DM sent to {ticket_creator.display_name}.")
+        except (discord.Forbidden, discord.HTTPException) as dm_e:
+            log.warning(f"Could not send DM to ticket creator {state['creator_id']}: {dm_e}. Likely DMs disabled or file too large. Transcript content length: {len(transcript_full_content)} bytes.")
+
+    async def _closure_delete(self, job, channel):
+        """Step 6: delete the ticket channel (thread tickets are archived and locked instead)."""
+        state = job['state']
+        reason = f"Ticket closed by {state['closer_name']} ({state['status']})"
+        if channel is None:
+            log.info(f"Ticket channel {state['channel_name']} already gone.")
+            return
+        try:
+            if isinstance(channel, discord.Thread):
+                await channel.edit(archived=True, locked=True, reason=reason)
+                log.info(f"Ticket thread {channel.name} archived and locked.")
+            else:
+                await channel.delete(reason=reason)
+                log.info(f"Ticket channel {channel.name} deleted.")
+        except discord.NotFound:
+            log.info(f"Ticket channel {state['channel_name']} already gone.")
+
+    async def _archive_delivered(self, ticket_id, message):
+        """Outbox hook: a deferred archive upload was delivered, so the local archive can link to it."""
+        ticket_id = int(ticket_id)
+        stored = await asyncio.to_thread(self.transcript_store.set_archive_message, ticket_id, message.channel.id, message.id)
+        if not stored:
+            # Delivered before the closure indexed the transcript: _store_transcript picks it up
+            self._delivered_archives[ticket_id] = (message.channel.id, message.id)
+        log.info(f"Deferred archive of ticket {ticket_id} delivered.", extra={'ticket_id': ticket_id, 'message_id': message.id})
+
+    async def _store_transcript(self, ticket_id, guild_id, state, transcript_text):
+        """Writes the transcript and its metadata into the local full-text archive (off the event loop)."""
+        if ticket_id in self._delivered_archives:
+            state['archive_channel_id'], state['archive_message_id'] = self._delivered_archives.pop(ticket_id)
+        try:
+            await asyncio.to_thread(
+                self.transcript_store.add_ticket,
+                ticket_id=ticket_id,
+                guild_id=guild_id,
+                channel_name=state['channel_name'],
+                transcript=transcript_text,
+                closed_at=state['closed_at'],
+                creator_id=state['creator_id'],
+                creator_name=state['creator_name'],
+                problem_type=state['problem_type'],
+                source_channel=state['source_channel'],
+                status=state['status'],
+                closer_id=state['closer_id'],
+                opened_at=state['opened_at'],
+                archive_channel_id=state.get('archive_channel_id'),
+                archive_message_id=state.get('archive_message_id')
+            )
+            log.info(f"Transcript of {state['channel_name']} stored in the local archive.")
+        except Exception as e:
+            log.error(f"Error storing transcript of {state['channel_name']} in the local archive: {e}")
+
+    # --- Local Transcript Archive ---
+    async def cog_load(self):
+        if self.attachment_mirror:
+            await self.attachment_mirror.start()
+        self.transcript_maintenance.start()
+        self.stats_digest.start()
+        self.idle_scheduler.start()
+        self.closure_pool.start()
+
+    async def cog_unload(self):
+        if self._pool_task:
+            self._pool_task.cancel()
+        if self._collapse_task:
+            self._collapse_task.cancel()
+        self.bot.remove_dynamic_items(TicketClosureConfirmButton, TicketTypeButton, TicketTypeSelect)
+        self.outbox.on_delivered('archive', None)
+        self.panel_healer.stop()
+        self.idle_scheduler.stop()
+        for handle in self._closure_retries.values():
+            handle.cancel()
+        self.closure_pool.stop()
+        if self._stats_save_handle is not None or self._stats_write_task:
+            await self._flush_stats() # Batched changes not written yet
+        self.transcript_maintenance.cancel()
+        self.stats_digest.cancel()
+        self.transcript_store.close()
+        self.closure_journal.close()
+        if self.attachment_mirror:
+            await self.attachment_mirror.close()
+
+    @tasks.loop(hours=24)
+    async def transcript_maintenance(self):
+        """Compresses old transcripts and applies the retention policy of the local archive."""
+        try:
+            compressed = await asyncio.to_thread(self.transcript_store.compact, TRANSCRIPT_COMPRESS_AFTER_DAYS)
+            purged = await asyncio.to_thread(self.transcript_store.purge, TRANSCRIPT_RETENTION_DAYS)
+            if self.attachment_mirror:
+                purged += await asyncio.to_thread(self.attachment_mirror.purge, TRANSCRIPT_RETENTION_DAYS)
+            log.info(f"Transcript archive maintenance: {compressed} compressed, {purged} purged.")
         except Exception as e:
-            print(f"Log: An unexpected error occurred during ticket closure for {channel.name}: {e}")
+            log.error(f"Error during transcript archive maintenance: {e}")
+
+    @commands.hybrid_command(name='ticketsearch')
+    @commands.guild_only()
+    async def ticket_search(self, ctx, *, query: str):
+        """Busca en los transcripts archivados (solo staff). Uso: /ticketsearch mdns"""
+        if not is_staff_member(ctx.author):
+            await ctx.send("Only staff can search archived tickets.", delete_after=10, ephemeral=True)
+            return
+        await ctx.defer()
+
+        start = time.perf_counter()
+        results = await asyncio.to_thread(self.transcript_store.search, query, ctx.guild.id, TRANSCRIPT_SEARCH_LIMIT) # Only this server's tickets
+        elapsed_ms = (time.perf_counter() - start) * 1000
+
+        if not results:
+            await ctx.send(f"No archived tickets match `{query}`.")
+            return
+
+        embed = discord.Embed(title=f"🔎 Archived tickets matching: {query}"[:256], color=discord.Color.blue())
+        for row in results:
+            closed_at = datetime.datetime.fromtimestamp(row['closed_at'], tz=datetime.timezone.utc).strftime('%Y-%m-%d')
+            if row['archive_message_id']:
+                link = f"https://discord.com/channels/{row['guild_id']}/{row['archive_channel_id']}/{row['archive_message_id']}"
+                location = f"[Archive message]({link})"
+            else:
+                location = f"Local copy only: `/tickettranscript {row['ticket_id']}`"
+            embed.add_field(
+                name=f"#{row['channel_name']} ({(row['status'] or 'unknown').upper()})"[:256],
+                value=(
+                    f"By <@{row['creator_id']}> · {row['problem_type'] or 'N/A'} · {row['source_channel'] or 'N/A'}\n"
+                    f"Closed {closed_at} · {location}"
+                ),
+                inline=False
+            )
+        embed.set_footer(text=f"{len(results)} result(s) in {elapsed_ms:.1f} ms")
+        await ctx.send(embed=embed)
+
+    @commands.hybrid_command(name='tickettranscript')
+    @commands.guild_only()
+    async def ticket_transcript(self, ctx, ticket_id: str):
+        """Envía el transcript archivado de un ticket de este servidor (solo staff). Uso: /tickettranscript <ID del canal>"""
+        if not is_staff_member(ctx.author):
+            await ctx.send("Only staff can read archived tickets.", delete_after=10, ephemeral=True)
+            return
+        if not ticket_id.isdigit():
+            await ctx.send("Usage: `/tickettranscript <ticket channel ID>` (shown by `/ticketsearch`).", ephemeral=True)
+            return
+        await ctx.defer()
+        stored = await asyncio.to_thread(self.transcript_store.get_transcript, int(ticket_id), ctx.guild.id)
+        if stored is None:
+            await ctx.send(f"No archived transcript for ticket `{ticket_id}` in this server.")
+            return
+        channel_name, transcript = stored
+        await ctx.send(
+            f"Archived transcript of **#{channel_name}**:",
+            file=discord.File(io.BytesIO(transcript.encode('utf-8')), filename=f"transcript-{channel_name}.txt")
+        )
+
+    # --- Ticket Analytics ---
+    def _build_stats_embed(self, guild_id, title):
+        stats = self._stats(guild_id)
+        embed = discord.Embed(title=title, color=discord.Color.blue())
+        open_lines = [f"**{category}:** {count}" for category, count in sorted(stats.open_by_category.items())]
+        embed.add_field(name=f"Open Tickets ({len(stats.open_tickets)})", value="\n".join(open_lines) or "None", inline=False)
+        embed.add_field(
+            name="First Staff Response",
+            value=(
+                f"p50: {format_duration(stats.first_response.quantile(0.5))}\n"
+                f"p90: {format_duration(stats.first_response.quantile(0.9))}\n"
+                f"avg: {format_duration(stats.first_response.mean())}"
+            ),
+            inline=True
+        )
+        embed.add_field(
+            name="Time to Close",
+            value=(
+                f"p50: {format_duration(stats.time_to_close.quantile(0.5))}\n"
+                f"p90: {format_duration(stats.time_to_close.quantile(0.9))}\n"
+                f"avg: {format_duration(stats.time_to_close.mean())}"
+            ),
+            inline=True
+        )
+        ratio = stats.status_ratio()
+        ratio_lines = [
+            f"**{status.upper()}:** {stats.status_counts.get(status, 0)} ({ratio.get(status, 0):.0%})"
+            for status in ("solved", "unresolved", "user-closed")
+        ]
+        embed.add_field(name=f"Closed Tickets ({stats.closed_total})", value="\n".join(ratio_lines), inline=False)
+        latency_lines = [
+            f"**{path}:** p50 {sketch.quantile(0.5):.0f} ms · p90 {sketch.quantile(0.9):.0f} ms ({sketch.count})"
+            for path, sketch in self.channel_acquire_latency.items() if sketch.count
+        ]
+        if self.ticket_link_latency.count:
+            sketch = self.ticket_link_latency
+            latency_lines.append(f"**click → link:** p50 {sketch.quantile(0.5):.0f} ms · p90 {sketch.quantile(0.9):.0f} ms ({sketch.count})")
+        if latency_lines:
+            embed.add_field(name="Ticket Channel Setup (since restart)", value="\n".join(latency_lines), inline=False)
+        embed.set_footer(text=f"Tickets opened since tracking started: {stats.opened_total}")
+        return embed
+
+    @commands.hybrid_command(name='ticketstats')
+    @commands.guild_only()
+    async def ticket_stats_command(self, ctx):
+        """Muestra los KPIs de soporte (solo staff)."""
+        if not is_staff_member(ctx.author):
+            await ctx.send("Only staff can view ticket stats.", delete_after=10, ephemeral=True)
+            return
+        await ctx.send(embed=self._build_stats_embed(ctx.guild.id, "📊 Ticket Stats"))
+
+    @tasks.loop(time=STATS_DIGEST_TIME)
+    async def stats_digest(self):
+        """Daily KPI digest posted to the log channel of each server."""
+        # Only servers whose ticket categories are on this worker's shards: the other workers post theirs
+        for guild_id in list(self.category_allocators):
+            guild = self.bot.get_guild(guild_id)
+            log_channel = self._get_log_channel(guild) if guild else None
+            if not log_channel:
+                log.warning(f"Log channel of server {guild_id} not available for the ticket stats digest.")
+                continue
+            try:
+                await log_channel.send(embed=self._build_stats_embed(guild_id, "📊 Daily Ticket Digest"))
+            except Exception as e:
+                log.error(f"Error sending ticket stats digest of server {guild_id}: {e}")
+
+    @stats_digest.before_loop
+    async def before_stats_digest(self):
+        await self.bot.wait_until_ready()
 
 
 async def setup(bot):
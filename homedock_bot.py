@@ -4,28 +4,51 @@ import discord
 from discord.ext import commands
 from dotenv import load_dotenv
 import asyncio
-import traceback # Importar traceback para mejor depuración
+import logging
+import signal
+import time
 
-# Cargar las variables de entorno desde .env
+# Cargar las variables de entorno desde .env (antes de importar utils: leen su configuración al importarse)
 load_dotenv()
+
+from utils import runtime # Modo opcional de runtime rápido (uvloop + orjson)
+from utils import sharding # Shards opcionales, en uno o varios procesos worker
+from utils import command_sync # Comandos slash: sincronización solo cuando cambian
+from utils import structured_log # Logging por cola: consola + JSON-lines con rotación
+from utils import state_store, outbox # Cerrados de forma ordenada al apagar
+from utils import leadership # Instancia en espera (HOMEDOCK_STANDBY): lease por flock
+
+# Cada worker escribe su propio fichero de log (la rotación no es segura entre procesos)
+structured_log.setup_logging(suffix=f"worker{sharding.WORKER_INDEX}" if sharding.is_worker() else None)
+log = logging.getLogger('homedock_bot')
+
 TOKEN = os.getenv('DISCORD_BOT_TOKEN')
+# Segundos que dura todo el apagado (SIGTERM/Ctrl+C): drenado de los cogs, cierre del gateway y de los almacenes.
+# Debe ser menor que el plazo del orquestador (docker stop espera 10s por defecto); para drenar más tiempo
+# sube los dos a la vez (p. ej. HOMEDOCK_DRAIN_TIMEOUT=25 con stop_grace_period: 30s).
+DRAIN_TIMEOUT = float(os.getenv('HOMEDOCK_DRAIN_TIMEOUT', '8'))
+# Parte del plazo reservada para cerrar el gateway y los almacenes después de drenar los cogs
+SHUTDOWN_RESERVE = min(2.0, DRAIN_TIMEOUT / 4)
 
 # Definir los intents que tu bot necesita
 # Estos intents deben estar activados también en el Portal de Desarrolladores de Discord
 intents = discord.Intents.default()
-intents.message_content = True # Necesario para leer el contenido de los comandos (ej. !ping)
+# Necesario para los comandos con prefijo (ej. !ping). Con HOMEDOCK_MESSAGE_CONTENT=0 se desactiva y los
+# comandos se usan como /ping o mencionando al bot (los transcripts de tickets pierden el texto de los usuarios).
+intents.message_content = command_sync.MESSAGE_CONTENT_INTENT
 intents.members = True         # Necesario para gestionar roles y obtener información de miembros (CRÍTICO para reaction_roles y tickets)
 intents.presences = True       # Necesario si quieres ver el estado de presencia de los miembros
 intents.guilds = True          # CRUCIAL para que el bot pueda acceder a información del servidor y gestionar canales, roles, etc.
 intents.reactions = True       # Necesario para manejar interacciones con reacciones (ej. reaction_roles)
 
 
-# Crear una instancia del bot
-bot = commands.Bot(command_prefix='!', intents=intents)
+# Crear una instancia del bot (AutoShardedBot si HOMEDOCK_SHARD_COUNT > 1)
+command_prefix = '!' if intents.message_content else commands.when_mentioned
+bot = sharding.create_bot(command_prefix=command_prefix, intents=intents)
 
 async def load_cogs():
     """Carga todos los cogs del directorio 'cogs'."""
-    print("Iniciando carga de cogs...")
+    log.info("Iniciando carga de cogs...")
     for filename in os.listdir('./cogs'):
         if filename.endswith('.py'):
             cog_name = filename[:-3]
@@ -33,38 +56,171 @@ async def load_cogs():
                 continue
             try:
                 await bot.load_extension(f'cogs.{cog_name}')
-                print(f'-> Cog "{cog_name}" cargado exitosamente.')
+                log.info(f'-> Cog "{cog_name}" cargado exitosamente.')
             except Exception as e:
-                print(f'ERROR al cargar el cog "{cog_name}": {e}')
-                traceback.print_exc() # Imprimir el stack trace completo para depuración
-    print("Carga de cogs completada.")
+                log.exception(f'Error al cargar el cog "{cog_name}": {e}') # Incluye el stack trace completo para depuración
+    log.info("Carga de cogs completada.")
+
+@bot.event
+async def setup_hook():
+    """Se ejecuta tras el login (ya se conoce la application_id) y antes de conectar al gateway."""
+    # La instancia en espera no tiene cogs: sincronizar su árbol vacío borraría los comandos
+    if not leadership.is_leader():
+        return
+    # Con varios procesos worker, solo el primero sincroniza los comandos (son globales)
+    if sharding.is_worker() and sharding.WORKER_INDEX != 0:
+        return
+    try:
+        await command_sync.sync_command_tree(bot.tree, bot.application_id)
+    except discord.HTTPException as e:
+        log.error(f"Error al sincronizar los comandos de aplicación: {e}")
 
 @bot.event
 async def on_ready():
     """Evento que se dispara cuando el bot está conectado y listo."""
-    print(f'{bot.user} ha iniciado sesión y está online!')
+    if not leadership.is_leader():
+        log.info(f'{bot.user} conectado en espera: cachés al día, sin cogs. Activa: {leadership.get_lease().holder() or "desconocida"}.')
+        return
+    log.info(f'{bot.user} ha iniciado sesión y está online!')
     # Aquí puedes añadir código que quieras que se ejecute una vez que el bot esté listo,
     # por ejemplo, establecer un estado de actividad.
     await bot.change_presence(activity=discord.Game(name="Homedocks | !help"))
 
 
+async def standby_interaction_check(interaction):
+    """En espera no se atiende ningún comando slash (los atiende la instancia activa)."""
+    return leadership.is_leader()
+
+
+async def take_over():
+    """
+    Instancia en espera: cuando consigue el lease (la activa murió o se apagó), carga los cogs, que leen
+    el estado que la activa dejó guardado (paneles, tickets, diarios de cierres y outbox), y les entrega
+    un evento ready para que hagan su arranque normal sobre las cachés ya pobladas.
+    """
+    await leadership.get_lease().wait_acquire()
+    if shutting_down:
+        leadership.release()
+        return
+    start = time.perf_counter()
+    log.warning("Lease de la instancia activa adquirido. Tomando el relevo...")
+    bot.help_command = standby_help_command
+    await load_cogs()
+    if bot.application_id:
+        try:
+            await command_sync.sync_command_tree(bot.tree, bot.application_id)
+        except discord.HTTPException as e:
+            log.error(f"Error al sincronizar los comandos de aplicación: {e}")
+    if bot.is_ready():
+        bot.dispatch('ready') # Si aún no está listo, el ready real llegará a los cogs ya cargados
+    takeover_ms = round((time.perf_counter() - start) * 1000)
+    log.info(f"Relevo completado: instancia activa en {takeover_ms} ms.", extra={'takeover_ms': takeover_ms})
+
+
+async def graceful_shutdown(signal_name):
+    """
+    Drena el bot antes de salir: cada cog con un método drain(timeout) deja de aceptar trabajo nuevo y
+    termina el que tiene en curso (LoggingCog el último, para enviar los logs de los cierres), después
+    se cierran los almacenes de estado y por último la conexión al gateway. Loguea la duración de cada paso.
+    """
+    global shutting_down
+    if shutting_down:
+        return
+    shutting_down = True
+    for task in standby_tasks:
+        task.cancel()
+    start = time.perf_counter()
+    deadline = start + DRAIN_TIMEOUT - SHUTDOWN_RESERVE # Aquí terminan los drenajes de los cogs; el resto es para el gateway y los stores
+    log.info(f"{signal_name} recibido. Drenando (plazo {DRAIN_TIMEOUT:.0f}s)...", extra={'signal': signal_name})
+
+    timings = {}
+    for cog_name, cog in sorted(bot.cogs.items(), key=lambda item: item[0] == 'LoggingCog'):
+        drain = getattr(cog, 'drain', None)
+        if drain is None:
+            continue
+        step = time.perf_counter()
+        try:
+            fields = await drain(max(0.0, deadline - step)) or {}
+        except Exception as e:
+            log.exception(f"Error al drenar {cog_name}: {e}")
+            fields = {}
+        timings[cog_name] = round((time.perf_counter() - step) * 1000)
+        log.info(f"Drenado {cog_name} en {timings[cog_name]} ms.", extra={'cog': cog_name, 'drain_ms': timings[cog_name], **fields})
+
+    # El estado ya está guardado: la instancia en espera puede tomar el relevo mientras esta se desconecta
+    if leadership.is_leader() and leadership.get_lease() is not None:
+        leadership.release()
+        log.info("Lease liberado para la instancia en espera.")
+
+    # Cierra el gateway; al descargar las extensiones los cogs cierran sus propias bases de datos
+    step = time.perf_counter()
+    await bot.close()
+    timings['gateway'] = round((time.perf_counter() - step) * 1000)
+
+    step = time.perf_counter()
+    store = state_store.get_store()
+    if store is not None:
+        store.close()
+    outbox.get_outbox().close()
+    timings['state_stores'] = round((time.perf_counter() - step) * 1000)
+
+    total = round((time.perf_counter() - start) * 1000)
+    log.info(f"Apagado completado en {total} ms.", extra={'drain_total_ms': total, 'steps_ms': timings, 'dropped_log_records': structured_log.dropped_records()})
+
+
+def install_signal_handlers():
+    """SIGTERM (docker stop, systemd) y SIGINT (Ctrl+C) lanzan el drenado en lugar de cortar el proceso."""
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, lambda name=sig.name: shutdown_tasks.append(asyncio.create_task(graceful_shutdown(name))))
+        except NotImplementedError: # Windows: solo Ctrl+C, sin drenado
+            pass
+
+
+shutting_down = False
+shutdown_tasks = [] # Referencia a la tarea de apagado para que no la recoja el GC
+standby_tasks = [] # Tarea que espera el lease en la instancia en espera
+standby_help_command = None # !help se quita en espera para que no respondan las dos instancias
+
+
 # --- Ejecutar el Bot ---
-if TOKEN:
+if TOKEN and sharding.is_supervisor():
+    # Proceso principal en modo multi-proceso: solo lanza y vigila los workers (cada uno ejecuta este script)
+    log.info(f"Lanzando {sharding.SHARD_PROCESSES} procesos worker para {sharding.SHARD_COUNT} shards...")
+    sharding.run_supervisor(os.path.abspath(__file__))
+elif TOKEN:
     async def main():
+        global standby_help_command
         # Cargar los cogs ANTES de que el bot se conecte.
         # Esto asegura que los listeners on_ready de los cogs estén registrados
         # y se disparen correctamente una vez que el bot esté listo.
-        await load_cogs()
-        print("Intentando iniciar el bot...")
+        bot.tree.interaction_check = standby_interaction_check
+        lease = leadership.get_lease()
+        if lease is None or lease.try_acquire():
+            await load_cogs()
+        else:
+            # Otra instancia está activa: conectar sin cogs y esperar su lease
+            log.info(f"Instancia en espera. Activa: {lease.holder() or 'desconocida'}.")
+            standby_help_command, bot.help_command = bot.help_command, None
+            standby_tasks.append(asyncio.create_task(take_over()))
+        log.info(f"Runtime: {runtime.describe()}")
+        log.info(f"Sharding: {sharding.describe()}")
+        log.info(f"Standby: {leadership.describe()}")
+        log.info(f"Message content intent: {'activado' if intents.message_content else 'desactivado (solo comandos slash y menciones)'}")
+        log.info("Intentando iniciar el bot...")
+        install_signal_handlers()
         await bot.start(TOKEN)
+        # bot.start vuelve cuando graceful_shutdown cierra el bot: esperar a que termine de cerrar los almacenes
+        if shutdown_tasks:
+            await asyncio.gather(*shutdown_tasks)
 
-    # Ejecuta la función main
+    # Ejecuta la función main (sobre uvloop si HOMEDOCK_FAST_RUNTIME=1 y está instalado)
     try:
-        asyncio.run(main())
+        runtime.run(main())
     except KeyboardInterrupt:
-        print("Bot apagado manualmente.")
+        log.info("Bot apagado manualmente.")
     except Exception as e:
-        print(f"Error fatal al iniciar el bot: {e}")
-        traceback.print_exc()
+        log.exception(f"Error fatal al iniciar el bot: {e}")
 else:
-    print("Error: El token del bot no está configurado. Asegúrate de que la variable de entorno DISCORD_BOT_TOKEN esté establecida en tu archivo .env")
\ No newline at end of file
+    log.error("El token del bot no está configurado. Asegúrate de que la variable de entorno DISCORD_BOT_TOKEN esté establecida en tu archivo .env")
\ No newline at end of file
@@ -0,0 +1,128 @@
+# tests/test_antispam.py
+from utils.antispam import ANTISPAM_DEFAULTS, ANTISPAM_FINGERPRINTS, SlidingWindow, SpamGuard
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_guard(**kwargs):
+    clock = FakeClock()
+    return SpamGuard(clock=clock, **kwargs), clock
+
+
+def settings(**overrides):
+    return {**ANTISPAM_DEFAULTS, **overrides}
+
+
+def test_sliding_window_keeps_only_limit_plus_one_recent_events():
+    window = SlidingWindow(3)
+    for now in range(10):
+        events = window.add(float(now), window=100)
+    assert len(events) == 4
+
+    events = window.add(200.0, window=100)
+    assert [now for now, _ in events] == [200.0]
+
+
+def test_flood_is_reported_on_every_message_past_the_limit():
+    guard, clock = make_guard()
+    config = settings(user_messages=3)
+    results = []
+    for i in range(6):
+        clock.now += 0.1
+        results.append(guard.observe(1, 10, 100, f"mensaje {i}", 0, config))
+    assert results[:3] == [[], [], []]
+    assert all('flood' in violations for violations in results[3:])
+
+
+def test_alert_cooldown_only_limits_alerts_not_detection():
+    # Regression: the cooldown used to hide the violation, so spam after the first alert was not deleted
+    guard, clock = make_guard()
+    config = settings(user_messages=1, alert_cooldown=60)
+    guard.observe(1, 10, 100, "primero", 0, config)
+    alerts = []
+    for i in range(5):
+        clock.now += 1
+        violations = guard.observe(1, 10, 100, f"mensaje {i}", 0, config)
+        assert 'flood' in violations
+        alerts.extend(kind for kind in violations if guard.should_alert(kind, (1, 100), config['alert_cooldown']))
+    assert alerts == ['flood']
+
+    clock.now += 61
+    assert guard.should_alert('flood', (1, 100), 60)
+    assert guard.should_alert('flood', (1, 200), 60) # Other users have their own cooldown
+
+
+def test_duplicates_above_the_default_fingerprint_count_are_detected():
+    # Regression: only ANTISPAM_FINGERPRINTS fingerprints were kept, so a higher threshold never triggered
+    guard, clock = make_guard()
+    threshold = ANTISPAM_FINGERPRINTS + 4
+    config = settings(duplicate_messages=threshold, user_messages=1000)
+    results = []
+    for _ in range(threshold):
+        clock.now += 0.1
+        results.append(guard.observe(1, 10, 100, "Compra   NITRO gratis", 0, config))
+    assert 'duplicate' not in results[-2]
+    assert 'duplicate' in results[-1]
+
+
+def test_duplicates_are_normalized_and_ignore_empty_messages():
+    guard, clock = make_guard()
+    config = settings(duplicate_messages=2)
+    guard.observe(1, 10, 100, "Hola  Mundo", 0, config)
+    assert 'duplicate' in guard.observe(1, 10, 100, "hola mundo", 0, config)
+    assert guard.observe(1, 10, 200, "", 0, config) == []
+    assert 'duplicate' not in guard.observe(1, 10, 200, "", 0, config)
+
+
+def test_mentions_are_counted_over_the_window_with_a_bounded_history():
+    guard, clock = make_guard()
+    config = settings(mentions=5, user_messages=1000)
+    for _ in range(5):
+        clock.now += 0.1
+        assert 'mentions' not in guard.observe(1, 10, 100, "a", 1, config)
+    assert 'mentions' in guard.observe(1, 10, 100, "b", 1, config)
+
+    for _ in range(100):
+        clock.now += 0.01
+        guard.observe(1, 10, 100, "c", 1, config)
+    assert len(guard.users[(1, 100)].mentions) <= config['mentions'] + 1
+
+    clock.now += config['window_seconds'] + 1
+    assert 'mentions' not in guard.observe(1, 10, 100, "d", 0, config)
+
+
+def test_raid_needs_volume_and_distinct_authors():
+    guard, clock = make_guard()
+    config = settings(channel_messages=5, channel_authors=3, user_messages=1000, duplicate_messages=1000)
+    violations = []
+    for i in range(10):
+        clock.now += 0.1
+        violations = guard.observe(1, 10, 100, f"solo {i}", 0, config)
+    assert 'raid' not in violations # One author only
+
+    for i in range(6):
+        clock.now += 0.1
+        violations = guard.observe(1, 10, 200 + i % 3, f"raid {i}", 0, config)
+    assert 'raid' in violations
+
+
+def test_state_is_bounded_by_size_and_idle_time():
+    guard, clock = make_guard(max_users=3, max_channels=2, ttl=60)
+    config = settings()
+    for user_id in range(10):
+        guard.observe(1, 10 + user_id, user_id, "hola", 0, config)
+    assert len(guard.users) == 3 and len(guard.channels) == 2
+    assert guard.evicted > 0
+
+    clock.now += 61
+    guard.observe(1, 10, 999, "hola", 0, config)
+    assert list(guard.users) == [(1, 999)]
+
+    guard.forget_user(1, 999)
+    assert guard.stats()['users'] == 0
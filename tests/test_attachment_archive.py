@@ -0,0 +1,108 @@
+# tests/test_attachment_archive.py
+import asyncio
+import os
+import time
+import types
+import zipfile
+
+import pytest
+from aiohttp import web
+
+from utils.attachment_archive import AttachmentMirror
+
+FILES = {'/captura.png': b"\x89PNG" + b"p" * 2000, '/log.txt': b"error: puerto ocupado\n" * 100, '/liar.bin': b"x" * 500}
+
+
+def attachment(attachment_id, filename, size, url):
+    return types.SimpleNamespace(id=attachment_id, filename=filename, size=size, url=url)
+
+
+def render(mirrored, skipped):
+    return f"mirrored={sorted(mirrored.values())} skipped={sorted(skipped.items())}"
+
+
+async def serve_files():
+    async def handler(request):
+        if request.path not in FILES:
+            raise web.HTTPNotFound()
+        return web.Response(body=FILES[request.path])
+
+    app = web.Application()
+    app.router.add_get('/{name}', handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}"
+
+
+def test_plan_respects_the_file_and_ticket_limits(tmp_path):
+    mirror = AttachmentMirror(str(tmp_path), max_ticket_bytes=100, max_file_bytes=60)
+    attachments = [attachment(1, "a", 50, ""), attachment(2, "b", 70, ""), attachment(3, "c", 40, ""), attachment(4, "d", 30, "")]
+
+    selected, skipped = mirror.plan(attachments, budget=1000)
+    assert [a.id for a in selected] == [1, 3]
+    assert skipped == {2: "file too large", 4: "ticket size limit reached"}
+
+    selected, _ = mirror.plan(attachments, budget=45) # Budget left by the channel's upload limit
+    assert [a.id for a in selected] == [3]
+
+
+def test_build_archive_zips_downloads_with_the_transcript(tmp_path):
+    async def main():
+        runner, base = await serve_files()
+        mirror = AttachmentMirror(str(tmp_path))
+        try:
+            attachments = [
+                attachment(1, "captura.png", len(FILES['/captura.png']), base + "/captura.png"),
+                attachment(2, "../log final.txt", len(FILES['/log.txt']), base + "/log.txt"),
+                attachment(3, "missing.txt", 10, base + "/missing.txt"),
+                attachment(4, "liar.bin", 100, base + "/liar.bin"), # CDN sends more than announced
+            ]
+            return await mirror.build_archive(42, attachments, 10 ** 6, render)
+        finally:
+            await mirror.close()
+            await runner.cleanup()
+
+    result = asyncio.run(main())
+    assert result['mirrored'] == {1: "attachments/001-captura.png", 2: "attachments/002-log_final.txt"}
+    assert result['skipped'] == {3: "download failed (HTTP 404)", 4: "download failed (ValueError)"}
+
+    with zipfile.ZipFile(result['path']) as archive:
+        assert archive.read("transcript.txt").decode() == result['transcript']
+        assert archive.read("attachments/002-log_final.txt") == FILES['/log.txt']
+        assert archive.getinfo("attachments/001-captura.png").compress_type == zipfile.ZIP_STORED
+        assert archive.getinfo("attachments/002-log_final.txt").compress_type == zipfile.ZIP_DEFLATED
+    assert os.listdir(tmp_path) == ["ticket-42.zip"] # No staging files or .part left behind
+
+
+def test_cancelled_download_cancels_the_archive(tmp_path):
+    async def main():
+        mirror = AttachmentMirror(str(tmp_path))
+
+        async def cancelled_download(attachment, path, semaphore):
+            raise asyncio.CancelledError()
+
+        mirror._download = cancelled_download
+        try:
+            await mirror.build_archive(1, [attachment(1, "a.txt", 10, "")], 10 ** 6, render)
+        finally:
+            await mirror.close()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(main())
+    assert not os.path.exists(os.path.join(tmp_path, "ticket-1.zip"))
+
+
+def test_purge_removes_only_old_archives(tmp_path):
+    mirror = AttachmentMirror(str(tmp_path))
+    for name in ("ticket-1.zip", "ticket-2.zip", "notes.txt"):
+        (tmp_path / name).write_bytes(b"x")
+    old = time.time() - 400 * 86400
+    os.utime(tmp_path / "ticket-1.zip", (old, old))
+    os.utime(tmp_path / "notes.txt", (old, old))
+
+    assert mirror.purge(365) == 1
+    assert sorted(os.listdir(tmp_path)) == ["notes.txt", "ticket-2.zip"]
+    assert AttachmentMirror(str(tmp_path / "missing")).purge(1) == 0
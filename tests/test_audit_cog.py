@@ -0,0 +1,43 @@
+# tests/test_audit_cog.py
+import asyncio
+import types
+
+from cogs import audit_cog
+from cogs.audit_cog import AuditCog
+
+
+class SlowChannel:
+    id = 900
+
+    async def send(self, embed=None):
+        await asyncio.sleep(60)
+
+
+def make_cog(log_channel=None):
+    logging_cog = types.SimpleNamespace(log_channels={}, get_log_channel=lambda guild_id: log_channel)
+    return AuditCog(types.SimpleNamespace(get_cog=lambda name: logging_cog))
+
+
+def test_settings_are_cached_with_the_ignored_channels_as_a_set(monkeypatch):
+    reads = []
+
+    def section(guild_id, name):
+        reads.append(guild_id)
+        return {1: {'enabled': True, 'ignored_channel_ids': [5]}, 2: {'enabled': False}}.get(guild_id)
+
+    monkeypatch.setattr(audit_cog.guild_config, "section", section)
+    monkeypatch.setattr(audit_cog.sharding, "owns_guild", lambda guild_id: True)
+    cog = make_cog()
+
+    assert cog._audited(1, 6) and not cog._audited(1, 5)
+    assert cog._settings(1)['ignored_channel_ids'] == {5}
+    assert not cog._audited(2, 6) and not cog._audited(3, 6) # Disabled / not configured
+    assert reads == [1, 2, 3] # One read per guild
+
+
+def test_drain_is_bounded_by_its_timeout():
+    cog = make_cog(SlowChannel())
+    cog.pending[1].append("entrada")
+
+    result = asyncio.run(asyncio.wait_for(cog.drain(0.05), 5))
+    assert result == {'audit_entries_left': 0} # Popped for sending; the warning reports it as lost
@@ -0,0 +1,99 @@
+# tests/test_category_allocator.py
+from utils.category_allocator import CategoryAllocator
+
+
+def test_reserve_picks_the_least_full_category():
+    allocator = CategoryAllocator(1, capacity=3)
+    allocator.add_category(2)
+    allocator.channel_added(1, 100)
+
+    assert allocator.reserve() == 2
+    assert allocator.reserve() in (1, 2)
+    assert allocator.occupancy(1) + allocator.occupancy(2) == 3
+
+
+def test_reservations_count_until_released_so_categories_never_overfill():
+    allocator = CategoryAllocator(1, capacity=2)
+
+    assert allocator.reserve() == 1
+    assert allocator.reserve() == 1
+    assert allocator.reserve() is None # Full with pending reservations only
+
+    allocator.release(1)
+    assert allocator.occupancy(1) == 1
+    assert allocator.reserve() == 1
+
+
+def test_confirm_turns_a_reservation_into_a_channel_and_double_reports_are_harmless():
+    allocator = CategoryAllocator(1, capacity=50)
+    category_id = allocator.reserve()
+    allocator.confirm(category_id, 100)
+    allocator.channel_added(category_id, 100) # The gateway create event arrives too
+
+    assert allocator.occupancy(1) == 1
+    assert not allocator.pending
+
+    allocator.channel_removed(1, 100)
+    allocator.channel_removed(1, 100)
+    assert allocator.occupancy(1) == 0
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_overflow_categories_collapse_only_after_staying_empty():
+    clock = FakeClock()
+    allocator = CategoryAllocator(1, capacity=1, clock=clock)
+    allocator.add_category(2, [200])
+    allocator.add_category(3) # Opened empty at t=0
+
+    clock.now = 299
+    allocator.channel_removed(2, 200) # Emptied at t=299
+    assert allocator.empty_overflow_ids(300) == []
+    assert allocator.seconds_until_collapse(300) == 1
+
+    clock.now = 300
+    assert allocator.empty_overflow_ids(300) == [3]
+    assert allocator.seconds_until_collapse(300) == 0
+
+    clock.now = 598
+    assert allocator.empty_overflow_ids(300) == [3]
+    allocator.channel_removed(1, 999)
+    clock.now = 599
+    assert sorted(allocator.empty_overflow_ids(300)) == [2, 3]
+
+
+def test_a_ticket_landing_in_an_empty_overflow_category_resets_its_timer():
+    clock = FakeClock()
+    allocator = CategoryAllocator(1, capacity=1, clock=clock)
+    allocator.channel_added(1, 100) # Primary full
+    allocator.add_category(2)
+
+    clock.now = 250
+    assert allocator.reserve() == 2
+    assert allocator.empty_overflow_ids() == []
+    allocator.release(2) # Channel creation failed: empty again, counting from now
+
+    clock.now = 400
+    assert allocator.empty_overflow_ids(300) == []
+    assert allocator.seconds_until_collapse(300) == 150
+
+    allocator.channel_added(2, 200)
+    assert allocator.seconds_until_collapse(300) is None
+
+
+def test_the_primary_category_is_never_collapsed():
+    allocator = CategoryAllocator(1, capacity=50)
+    allocator.add_category(2)
+    assert allocator.empty_overflow_ids() == [2]
+
+    allocator.remove_category(1)
+    allocator.remove_category(2)
+    assert allocator.category_ids() == [1]
+    assert 2 not in allocator
+    assert allocator.seconds_until_collapse(0) is None
@@ -0,0 +1,196 @@
+# tests/test_closure_jobs.py
+import asyncio
+
+import pytest
+
+from cogs.tickets_cog import CLOSURE_MAX_ATTEMPTS, CLOSURE_STEPS, TicketsCog
+from utils.closure_jobs import ClosureJournal, WorkerPool
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = ClosureJournal(str(tmp_path / "closures.db"))
+    yield journal
+    journal.close()
+
+
+def test_journal_keeps_progress_across_a_restart(tmp_path):
+    path = str(tmp_path / "closures.db")
+    journal = ClosureJournal(path)
+    assert journal.add(1, 10, {'channel_name': "ticket-ana"})
+    assert not journal.add(1, 10, {'channel_name': "otro"}) # One job per ticket
+    journal.add(2, 20, {'channel_name': "ticket-bob"})
+
+    job = journal.get(1)
+    job['steps_done'].append('transcript')
+    job['transcript'] = "hola"
+    job['state']['archive_message_id'] = 99
+    journal.complete_step(job, with_transcript=True)
+    job['transcript'] = "no se guarda"
+    journal.complete_step(job) # Later steps do not rewrite the transcript
+    assert journal.failed_attempt(1) == 1
+    journal.close()
+
+    reopened = ClosureJournal(path)
+    job = reopened.get(1)
+    assert job['steps_done'] == ['transcript'] and job['transcript'] == "hola"
+    assert job['state'] == {'channel_name': "ticket-ana", 'archive_message_id': 99} and job['attempts'] == 1
+    assert [tuple(row) for row in reopened.pending()] == [(1, 10), (2, 20)]
+    reopened.remove(1)
+    assert reopened.get(1) is None and reopened.failed_attempt(1) == 0
+    reopened.close()
+
+
+def test_worker_pool_refuses_work_when_full_and_deduplicates_keys():
+    async def scenario():
+        release = asyncio.Event()
+        handled = []
+
+        async def handler(key):
+            await release.wait()
+            handled.append(key)
+
+        pool = WorkerPool(handler, workers=1, max_queued=1)
+        first = pool.submit(1)
+        assert pool.submit(1) is first # Already queued
+        assert pool.submit(2) is None and pool.full() # Backpressure, not waiting
+        pool.start()
+        await asyncio.sleep(0) # The worker takes 1, freeing the queue
+        second = pool.submit(2)
+        assert second is not None and pool.pending == {1, 2} and pool.running == {1}
+
+        waiting = asyncio.create_task(pool.submit_wait(3))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+        release.set()
+        third = await asyncio.wait_for(waiting, 5) # Queued once there is room
+        await asyncio.wait_for(third, 5)
+        await asyncio.wait_for(pool.wait_idle(), 5)
+        pool.stop()
+        return handled, first.done() and second.done(), pool.pending
+
+    handled, done, pending = asyncio.run(scenario())
+    assert handled == [1, 2, 3] and done and pending == set()
+
+
+def test_worker_pool_survives_handler_errors():
+    async def scenario():
+        handled = []
+
+        async def handler(key):
+            if key == 1:
+                raise RuntimeError("boom")
+            handled.append(key)
+
+        pool = WorkerPool(handler, workers=2, max_queued=10)
+        pool.start()
+        done = [pool.submit(key) for key in (1, 2)]
+        await asyncio.wait_for(asyncio.gather(*done), 5)
+        pool.stop()
+        return handled
+
+    assert asyncio.run(scenario()) == [2]
+
+
+def make_cog(journal, failing_step=None):
+    cog = object.__new__(TicketsCog)
+    cog.closure_journal = journal
+    cog.draining = False
+    cog._closure_channels = {}
+    cog._closure_retries = {}
+    cog.ran = []
+
+    async def resolve(ticket_id):
+        return None
+    cog._resolve_ticket_channel = resolve
+
+    def make_step(name):
+        async def step(job, channel):
+            if name == failing_step:
+                raise RuntimeError(f"{name} failed")
+            cog.ran.append(name)
+            job['state'][name] = True
+        return step
+    for name in CLOSURE_STEPS:
+        setattr(cog, f"_closure_{name}", make_step(name))
+    return cog
+
+
+def test_resumed_closure_only_runs_the_missing_steps(journal):
+    journal.add(1, 10, {'channel_name': "ticket-ana", 'status': "resolved", 'closed_at': 0})
+    job = journal.get(1)
+    job['steps_done'] = ['transcript', 'archive']
+    journal.complete_step(job)
+    cog = make_cog(journal)
+
+    asyncio.run(cog._run_closure_job(1))
+    assert cog.ran == ['index', 'log', 'dm', 'delete']
+    assert journal.get(1) is None
+
+
+def test_failed_step_keeps_progress_and_schedules_a_retry(journal):
+    journal.add(1, 10, {'channel_name': "ticket-ana", 'status': "resolved", 'closed_at': 0})
+    cog = make_cog(journal, failing_step='log')
+
+    async def scenario():
+        await cog._run_closure_job(1)
+        handles = dict(cog._closure_retries)
+        for handle in handles.values():
+            handle.cancel()
+        return handles
+
+    assert list(asyncio.run(scenario())) == [1]
+    job = journal.get(1)
+    assert job['steps_done'] == ['transcript', 'archive', 'index'] and job['attempts'] == 1
+    assert job['state']['index'] is True # What completed steps produced is journaled
+
+
+def test_closure_is_dropped_after_too_many_attempts(journal):
+    journal.add(1, 10, {'channel_name': "ticket-ana", 'status': "resolved", 'closed_at': 0})
+    for _ in range(CLOSURE_MAX_ATTEMPTS - 1):
+        journal.failed_attempt(1)
+    cog = make_cog(journal, failing_step='transcript')
+
+    asyncio.run(cog._run_closure_job(1))
+    assert journal.get(1) is None and cog._closure_retries == {}
+
+
+def test_retry_is_requeued_later_when_the_pool_is_full(journal):
+    async def scenario():
+        cog = make_cog(journal)
+
+        async def handler(key):
+            pass
+        cog.closure_pool = WorkerPool(handler, workers=1, max_queued=1)
+        cog.closure_pool.submit(5) # Fills the queue (no workers started)
+
+        cog._retry_closure(1)
+        requeued = list(cog._closure_retries)
+        for handle in cog._closure_retries.values():
+            handle.cancel()
+        cog._closure_retries.clear()
+
+        cog.closure_pool.queue.get_nowait() # Room again
+        cog.closure_pool.pending.discard(5)
+        cog._retry_closure(1)
+        return requeued, cog._closure_retries, cog.closure_pool.pending
+
+    requeued, retries, pending = asyncio.run(scenario())
+    assert requeued == [1] and retries == {} and pending == {1}
+
+
+def test_resume_requeues_the_journaled_closures(journal, monkeypatch):
+    journal.add(1, 10, {'channel_name': "ticket-ana"})
+    journal.add(2, 20, {'channel_name': "ticket-bob"})
+    monkeypatch.setattr("cogs.tickets_cog.sharding.owns_guild", lambda guild_id: guild_id == 10)
+
+    async def scenario():
+        cog = make_cog(journal)
+
+        async def handler(key):
+            pass
+        cog.closure_pool = WorkerPool(handler, workers=1, max_queued=10)
+        await cog._resume_closure_jobs()
+        return cog.closure_pool.pending
+
+    assert asyncio.run(scenario()) == {1} # Guild 20 belongs to another worker process
@@ -0,0 +1,58 @@
+# tests/test_command_sync.py
+import asyncio
+import json
+
+import discord
+from discord import app_commands
+
+from utils.command_sync import command_tree_hash, sync_command_tree
+
+
+def make_tree(description="Responde pong"):
+    tree = app_commands.CommandTree(discord.Client(intents=discord.Intents.none()))
+
+    @tree.command(name='ping', description=description)
+    async def ping(interaction: discord.Interaction):
+        pass
+
+    @tree.command(name='ticketsearch', description="Busca en los transcripts")
+    async def ticket_search(interaction: discord.Interaction, query: str):
+        pass
+
+    syncs = []
+
+    async def fake_sync():
+        syncs.append(1)
+        return tree.get_commands()
+
+    tree.sync = fake_sync
+    return tree, syncs
+
+
+def test_hash_changes_with_the_definition_not_with_registration_order():
+    tree, _ = make_tree()
+    assert command_tree_hash(tree, 1) == command_tree_hash(make_tree()[0], 1)
+    assert command_tree_hash(tree, 1) != command_tree_hash(make_tree("Otra descripción")[0], 1)
+    assert command_tree_hash(tree, 1) != command_tree_hash(tree, 2)
+
+
+def test_sync_only_runs_when_the_tree_changed(tmp_path):
+    path = str(tmp_path / "command_tree_sync.json")
+    tree, syncs = make_tree()
+
+    assert asyncio.run(sync_command_tree(tree, 1, path)) # First start: no stored hash
+    assert json.loads(open(path, encoding='utf-8').read())['commands'] == ["ping", "ticketsearch"]
+    assert not asyncio.run(sync_command_tree(tree, 1, path)) # Restart with the same commands
+    assert len(syncs) == 1
+
+    changed, changed_syncs = make_tree("Otra descripción")
+    assert asyncio.run(sync_command_tree(changed, 1, path))
+    assert len(changed_syncs) == 1
+
+
+def test_a_corrupt_sync_file_forces_a_sync(tmp_path):
+    path = tmp_path / "command_tree_sync.json"
+    path.write_text("{", encoding='utf-8')
+    tree, syncs = make_tree()
+    assert asyncio.run(sync_command_tree(tree, 1, str(path)))
+    assert syncs == [1]
@@ -0,0 +1,87 @@
+# tests/test_deadline_scheduler.py
+import asyncio
+import time
+
+from utils.deadline_scheduler import DeadlineScheduler
+
+
+def run_scheduler(actions, wait=0.15):
+    """Runs `actions(scheduler)` on a started scheduler and returns the keys fired, in order."""
+    fired = []
+
+    async def main():
+        async def callback(key):
+            fired.append(key)
+
+        scheduler = DeadlineScheduler(callback)
+        scheduler.start()
+        actions(scheduler)
+        await asyncio.sleep(wait)
+        scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(main())
+    return fired, scheduler
+
+
+def test_fires_in_deadline_order_and_forgets_fired_keys():
+    def actions(scheduler):
+        now = time.time()
+        scheduler.schedule('b', now + 0.04)
+        scheduler.schedule('a', now + 0.02)
+        scheduler.schedule('c', now + 10)
+
+    fired, scheduler = run_scheduler(actions)
+    assert fired == ['a', 'b']
+    assert len(scheduler) == 1 and 'c' in scheduler
+
+
+def test_moving_a_deadline_later_postpones_it():
+    def actions(scheduler):
+        now = time.time()
+        scheduler.schedule('a', now + 0.02)
+        scheduler.schedule('a', now + 10)
+
+    fired, scheduler = run_scheduler(actions)
+    assert fired == []
+    assert scheduler.deadline('a') > time.time() + 5
+
+
+def test_moving_a_deadline_earlier_wakes_the_task():
+    def actions(scheduler):
+        scheduler.schedule('a', time.time() + 10)
+        scheduler.schedule('a', time.time() + 0.02)
+
+    fired, _ = run_scheduler(actions)
+    assert fired == ['a']
+
+
+def test_cancelled_keys_never_fire():
+    def actions(scheduler):
+        scheduler.schedule('a', time.time() + 0.02)
+        scheduler.schedule('b', time.time() + 0.03)
+        scheduler.cancel('a')
+
+    fired, scheduler = run_scheduler(actions)
+    assert fired == ['b']
+    assert len(scheduler) == 0
+
+
+def test_a_failing_callback_does_not_stop_the_scheduler():
+    fired = []
+
+    async def main():
+        async def callback(key):
+            if key == 'bad':
+                raise RuntimeError("boom")
+            fired.append(key)
+
+        scheduler = DeadlineScheduler(callback)
+        scheduler.start()
+        scheduler.schedule('bad', time.time() + 0.01)
+        scheduler.schedule('good', time.time() + 0.03)
+        await asyncio.sleep(0.1)
+        scheduler.stop()
+
+    asyncio.run(main())
+    assert fired == ['good']
@@ -0,0 +1,58 @@
+# tests/test_guild_config.py
+import json
+
+from utils.guild_config import PRIMARY_GUILD_ID, GuildConfig
+
+OTHER_GUILD_ID = 222
+
+
+def make_config(tmp_path, data):
+    path = tmp_path / "guilds_config.json"
+    path.write_text(data if isinstance(data, str) else json.dumps(data), encoding='utf-8')
+    config = GuildConfig()
+    config.load(str(path))
+    return config
+
+
+def test_without_a_file_only_the_primary_guild_uses_the_defaults(tmp_path):
+    config = GuildConfig()
+    config.load(str(tmp_path / "missing.json"))
+    config.register_defaults('logging', {'log_channel_id': 1})
+
+    assert config.section(PRIMARY_GUILD_ID, 'logging') == {'log_channel_id': 1}
+    assert config.section(OTHER_GUILD_ID, 'logging') is None
+    assert config.guild_ids('logging') == [PRIMARY_GUILD_ID]
+    assert config.guild_ids('tickets') == []
+
+
+def test_file_adds_guilds_and_overrides_the_primary_defaults(tmp_path):
+    config = make_config(tmp_path, {
+        str(PRIMARY_GUILD_ID): {'logging': {'log_channel_id': 9}},
+        str(OTHER_GUILD_ID): {'logging': {'log_channel_id': 5}, 'tickets': {'category_id': 7}},
+    })
+    config.register_defaults('logging', {'log_channel_id': 1, 'enabled': True})
+
+    assert config.section(PRIMARY_GUILD_ID, 'logging') == {'log_channel_id': 9, 'enabled': True}
+    assert config.section(OTHER_GUILD_ID, 'logging') == {'log_channel_id': 5} # Defaults are only for the primary guild
+    assert config.guild_ids('logging') == [PRIMARY_GUILD_ID, OTHER_GUILD_ID]
+    assert config.guild_ids('tickets') == [OTHER_GUILD_ID]
+
+
+def test_cached_sections_are_invalidated_by_load_and_register_defaults(tmp_path):
+    config = make_config(tmp_path, {})
+    config.register_defaults('audit', {'enabled': True})
+    assert config.section(PRIMARY_GUILD_ID, 'audit') == {'enabled': True}
+
+    config.register_defaults('audit', {'enabled': False})
+    assert config.section(PRIMARY_GUILD_ID, 'audit') == {'enabled': False}
+
+    (tmp_path / "guilds_config.json").write_text(json.dumps({str(PRIMARY_GUILD_ID): {'audit': {'enabled': True}}}), encoding='utf-8')
+    config.load(str(tmp_path / "guilds_config.json"))
+    assert config.section(PRIMARY_GUILD_ID, 'audit') == {'enabled': True}
+
+
+def test_invalid_json_falls_back_to_the_single_server_defaults(tmp_path):
+    config = make_config(tmp_path, "{not json")
+    config.register_defaults('rules', {'channel_id': 3})
+    assert config.guilds == {}
+    assert config.section(PRIMARY_GUILD_ID, 'rules') == {'channel_id': 3}
@@ -0,0 +1,56 @@
+# tests/test_leadership.py
+import asyncio
+import os
+
+import pytest
+
+from utils import leadership
+from utils.leadership import LeaderLease
+
+pytestmark = pytest.mark.skipif(leadership.fcntl is None, reason="flock not available on this platform")
+
+
+def test_only_one_lease_holder_at_a_time(tmp_path):
+    path = str(tmp_path / "locks" / "leader.lock")
+    active, standby = LeaderLease(path), LeaderLease(path)
+
+    assert active.try_acquire()
+    assert active.try_acquire() # Re-entrant for the holder
+    assert not standby.try_acquire()
+    assert not standby.held
+    assert f"pid={os.getpid()}" in standby.holder()
+
+    active.release()
+    assert not active.held
+    assert standby.try_acquire()
+    standby.release()
+
+
+def test_standby_takes_over_when_the_holder_releases(tmp_path, monkeypatch):
+    monkeypatch.setattr(leadership, 'STANDBY_POLL_INTERVAL', 0.01)
+    path = str(tmp_path / "leader.lock")
+    active, standby = LeaderLease(path), LeaderLease(path)
+    assert active.try_acquire()
+
+    async def main():
+        waiter = asyncio.create_task(standby.wait_acquire())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        active.release()
+        await asyncio.wait_for(waiter, 1)
+
+    asyncio.run(main())
+    assert standby.held and standby.acquired_at is not None
+    standby.release()
+
+
+def test_holder_is_empty_without_a_lease_file(tmp_path):
+    assert LeaderLease(str(tmp_path / "missing.lock")).holder() == ""
+
+
+def test_without_standby_mode_every_process_is_the_leader(monkeypatch):
+    monkeypatch.setattr(leadership, 'STANDBY_ENABLED', False)
+    monkeypatch.setattr(leadership, '_lease', None)
+    assert leadership.get_lease() is None
+    assert leadership.is_leader()
+    assert leadership.describe() == "disabled"
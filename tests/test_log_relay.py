@@ -0,0 +1,91 @@
+# tests/test_log_relay.py
+import asyncio
+import io
+
+import discord
+import pytest
+
+from utils.log_relay import LogRelayChannel, deliver_relayed_logs
+from utils.state_store import StateStore
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "fake"
+
+
+class FakeChannel:
+    def __init__(self, channel_id, failures=()):
+        self.id = channel_id
+        self.failures = list(failures)
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        error = self.failures.pop(0) if self.failures else None
+        if error is not None:
+            raise error
+        self.sent.append((content, kwargs))
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = StateStore(str(tmp_path / "state.db"))
+    yield store
+    store.close()
+
+
+def relay(store, channel_id, *contents):
+    channel = LogRelayChannel(store, channel_id)
+
+    async def main():
+        for content in contents:
+            await channel.send(content)
+    asyncio.run(main())
+
+
+def deliver(store, channels):
+    return asyncio.run(deliver_relayed_logs(store, {channel.id: channel for channel in channels}))
+
+
+def test_relayed_messages_are_delivered_in_order_with_embeds_and_files(store):
+    channel = LogRelayChannel(store, 1)
+
+    async def main():
+        await channel.send("texto", embed=discord.Embed(title="Ticket cerrado"), file=discord.File(io.BytesIO(b"transcript"), filename="t.txt"))
+        await channel.send("segundo")
+    asyncio.run(main())
+
+    log_channel = FakeChannel(1)
+    assert deliver(store, [log_channel]) == 2
+    (content, kwargs), (second, _) = log_channel.sent
+    assert content == "texto" and second == "segundo"
+    assert kwargs['embed'].title == "Ticket cerrado"
+    assert kwargs['file'].fp.read() == b"transcript"
+    assert store.pending_logs([1]) == []
+
+
+def test_transient_error_keeps_the_entry_at_the_head(store):
+    relay(store, 1, "a", "b")
+    log_channel = FakeChannel(1, failures=[discord.HTTPException(FakeResponse(503), "unavailable")])
+
+    assert deliver(store, [log_channel]) == 0
+    assert [entry['content'] for entry in store.pending_logs([1])] == ["a", "b"]
+    assert deliver(store, [log_channel]) == 2
+
+
+def test_permanent_error_drops_the_entry_and_delivers_the_rest(store):
+    # Regression: a 403/404/413 on one entry used to block every later relayed log forever
+    relay(store, 1, "too large", "b", "c")
+    log_channel = FakeChannel(1, failures=[discord.HTTPException(FakeResponse(413), "payload too large")])
+
+    assert deliver(store, [log_channel]) == 2
+    assert [content for content, _ in log_channel.sent] == ["b", "c"]
+    assert store.pending_logs([1]) == []
+
+
+def test_only_the_owned_channels_are_delivered(store):
+    relay(store, 1, "mine")
+    relay(store, 2, "other worker")
+    assert deliver(store, [FakeChannel(1)]) == 1
+    assert [entry['content'] for entry in store.pending_logs([2])] == ["other worker"]
@@ -0,0 +1,70 @@
+# tests/test_message_cache.py
+from utils.message_cache import MessageCache
+
+
+def add(cache, channel_id, message_id, content="hola", attachments=()):
+    cache.add(channel_id, message_id, 7, "ana", 1750000000.0, content, attachments)
+
+
+def test_records_round_trip_as_text():
+    cache = MessageCache()
+    add(cache, 1, 10, "Mi contenedor 🚀 no arranca", ["log.txt"])
+
+    assert cache.get(1, 10) == (7, "ana", 1750000000.0, "Mi contenedor 🚀 no arranca", ("log.txt",))
+    assert cache.get(1, 11) is None
+    assert cache.get(2, 10) is None
+
+
+def test_update_returns_the_previous_content_and_keeps_the_byte_count_exact():
+    cache = MessageCache()
+    add(cache, 1, 10, "antes")
+    add(cache, 1, 11, "otro")
+    before = cache.update(1, 10, "después, con bastante más texto")
+
+    assert before[3] == "antes"
+    assert cache.get(1, 10)[3] == "después, con bastante más texto"
+    assert cache.update(1, 99, "nada") is None
+
+    fresh = MessageCache()
+    add(fresh, 1, 10, "después, con bastante más texto")
+    add(fresh, 1, 11, "otro")
+    assert cache.bytes == fresh.bytes
+
+
+def test_pop_and_forget_channel_release_everything():
+    cache = MessageCache()
+    add(cache, 1, 10)
+    add(cache, 1, 11)
+    add(cache, 2, 20)
+
+    assert cache.pop(1, 10)[3] == "hola"
+    assert cache.pop(1, 10) is None
+    cache.forget_channel(1)
+    cache.pop(2, 20)
+    assert cache.stats() == {'messages': 0, 'channels': 0, 'bytes': 0, 'evicted': 0}
+
+
+def test_each_channel_is_a_ring_buffer():
+    cache = MessageCache(per_channel=3)
+    for message_id in range(5):
+        add(cache, 1, message_id)
+
+    assert list(cache.channels[1]) == [2, 3, 4]
+    assert cache.count == 3 and cache.evicted == 2
+
+
+def test_byte_ceiling_evicts_from_the_least_recently_active_channel():
+    probe = MessageCache()
+    add(probe, 1, 0, "x" * 100)
+    record_bytes = probe.bytes
+
+    cache = MessageCache(max_bytes=record_bytes * 4, per_channel=100)
+    for message_id in range(3):
+        add(cache, 1, message_id, "x" * 100)
+    for message_id in range(3):
+        add(cache, 2, 100 + message_id, "x" * 100)
+
+    assert cache.bytes <= cache.max_bytes
+    assert cache.count == 4
+    assert 1 not in cache.channels or len(cache.channels[1]) < 3
+    assert len(cache.channels[2]) == 3 # The active channel keeps its history
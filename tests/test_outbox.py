@@ -0,0 +1,181 @@
+# tests/test_outbox.py
+import asyncio
+
+import discord
+import pytest
+
+from utils.outbox import OUTBOX_BACKOFF_MAX, DeliveryOutbox, backoff_delay, is_transient, replay_outbox, send_durably
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "fake"
+
+
+def http_error(status):
+    return discord.HTTPException(FakeResponse(status), "fake error")
+
+
+class FakeDestination:
+    """Channel stand-in: `failures` holds the errors raised by the next sends (None = success)."""
+
+    def __init__(self, target_id=1, failures=()):
+        self.id = target_id
+        self.failures = list(failures)
+        self.sent = []
+
+    async def send(self, content=None, **kwargs):
+        error = self.failures.pop(0) if self.failures else None
+        if error is not None:
+            raise error
+        self.sent.append(content)
+        return content
+
+
+@pytest.fixture
+def outbox(tmp_path):
+    outbox = DeliveryOutbox(str(tmp_path / "outbox.db"))
+    yield outbox
+    outbox.close()
+
+
+def replay(outbox, destination, **kwargs):
+    async def resolve(kind, target_id):
+        return destination
+    return asyncio.run(replay_outbox(outbox, resolve, ignore_backoff=True, **kwargs))
+
+
+def test_transient_errors_and_backoff():
+    assert is_transient(http_error(429)) and is_transient(http_error(503))
+    assert not is_transient(http_error(403))
+    assert backoff_delay(1, retry_after=120) == 120
+    assert backoff_delay(100) <= OUTBOX_BACKOFF_MAX
+
+
+def test_transient_failure_is_journaled_and_later_messages_queue_behind_it(outbox):
+    destination = FakeDestination(failures=[http_error(503)])
+
+    assert asyncio.run(send_durably(outbox, destination, "primero")) is None
+    assert asyncio.run(send_durably(outbox, destination, "segundo")) is None # Must not overtake the first
+    assert outbox.entries == 2 and outbox.has_pending('channel', 1)
+
+    assert replay(outbox, destination) == 2
+    assert destination.sent == ["primero", "segundo"]
+    assert outbox.entries == 0 and not outbox.has_pending('channel', 1)
+
+
+def test_permanent_errors_are_raised_not_journaled(outbox):
+    destination = FakeDestination(failures=[http_error(403)])
+    with pytest.raises(discord.HTTPException):
+        asyncio.run(send_durably(outbox, destination, "hola"))
+    assert outbox.entries == 0
+
+
+def test_replay_postpones_the_destination_on_transient_failure(outbox):
+    for content in ("a", "b"):
+        outbox.append('channel', 1, content=content)
+    destination = FakeDestination(failures=[http_error(503)])
+
+    assert replay(outbox, destination) == 0 # "b" waits behind "a"
+    assert outbox.entries == 2
+    assert outbox.due(limit=10) == [] # Backed off
+
+    assert replay(outbox, destination) == 2
+    assert destination.sent == ["a", "b"]
+
+
+def test_replay_drops_entries_with_permanent_errors(outbox):
+    outbox.append('channel', 1, content="a")
+    outbox.append('channel', 1, content="b")
+
+    assert replay(outbox, FakeDestination(failures=[http_error(404)])) == 1
+    assert outbox.entries == 0 and outbox.failed == 1
+
+
+def test_journal_is_bounded_and_survives_a_restart(tmp_path):
+    path = str(tmp_path / "outbox.db")
+    outbox = DeliveryOutbox(path, max_entries=3)
+    for i in range(5):
+        outbox.append('user', 7, content=str(i), file_name="t.txt", file_data=b"x" * 10)
+    assert outbox.entries == 3 and outbox.evicted == 2
+    outbox.close()
+
+    reopened = DeliveryOutbox(path, max_entries=3)
+    assert reopened.entries == 3 and reopened.has_pending('user', 7)
+    assert [entry['content'] for entry in reopened.due(float('inf'))] == ["2", "3", "4"]
+    reopened.close()
+
+
+def test_tagged_entry_runs_its_delivery_hook(outbox):
+    delivered = []
+
+    async def hook(value, message):
+        delivered.append((value, message))
+
+    outbox.on_delivered('archive', hook)
+    destination = FakeDestination(failures=[http_error(503)])
+    assert asyncio.run(send_durably(outbox, destination, "transcript", tag="archive:42")) is None
+    outbox.append('channel', 1, content="sin tag")
+
+    assert replay(outbox, destination) == 2
+    assert delivered == [("42", "transcript")] # The untagged entry calls no hook
+
+
+def test_hook_errors_do_not_block_the_replay(outbox):
+    async def hook(value, message):
+        raise RuntimeError("boom")
+
+    outbox.on_delivered('archive', hook)
+    outbox.append('channel', 1, content="a", tag="archive:1")
+    outbox.append('channel', 1, content="b")
+    destination = FakeDestination()
+
+    assert replay(outbox, destination) == 2
+    assert destination.sent == ["a", "b"] and outbox.entries == 0
+
+
+def test_journals_without_tags_are_migrated(tmp_path):
+    import sqlite3
+    path = str(tmp_path / "outbox.db")
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE outbox (id INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, target_id INTEGER NOT NULL, "
+        "created_at REAL NOT NULL, next_attempt_at REAL NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, last_error TEXT, "
+        "content TEXT, embed TEXT, file_name TEXT, file_data BLOB, file_path TEXT, size INTEGER NOT NULL)"
+    )
+    conn.execute("INSERT INTO outbox (kind, target_id, created_at, next_attempt_at, content, size) VALUES ('channel', 1, 0, 0, 'viejo', 5)")
+    conn.commit()
+    conn.close()
+
+    outbox = DeliveryOutbox(path)
+    assert [(entry['content'], entry['tag']) for entry in outbox.due(float('inf'))] == [("viejo", None)]
+    outbox.close()
+
+
+def test_deferred_archive_delivery_is_recorded_in_the_transcript_store(tmp_path):
+    import types
+
+    from cogs.tickets_cog import TicketsCog
+    from utils.transcript_store import TranscriptStore
+
+    cog = object.__new__(TicketsCog)
+    cog.transcript_store = TranscriptStore(str(tmp_path / "transcripts.db"))
+    cog._delivered_archives = {}
+    message = types.SimpleNamespace(id=600, channel=types.SimpleNamespace(id=500))
+    state = {
+        'channel_name': "ticket-ana", 'closed_at': 1.0, 'creator_id': 3, 'creator_name': "ana", 'problem_type': None,
+        'source_channel': None, 'status': "resolved", 'closer_id': 4, 'opened_at': 0.0
+    }
+
+    async def scenario():
+        await cog._archive_delivered("1", message) # Delivered before the closure indexed the ticket
+        await cog._store_transcript(1, 10, state, "mdns")
+        await cog._archive_delivered("2", types.SimpleNamespace(id=700, channel=message.channel))
+        await cog._store_transcript(2, 10, dict(state, channel_name="ticket-bob"), "mdns")
+        await cog._archive_delivered("2", types.SimpleNamespace(id=800, channel=message.channel)) # After indexing
+
+    asyncio.run(scenario())
+    rows = {row['ticket_id']: row['archive_message_id'] for row in cog.transcript_store.search("mdns", 10)}
+    assert rows == {1: 600, 2: 800} and cog._delivered_archives == {}
+    cog.transcript_store.close()
@@ -0,0 +1,147 @@
+# tests/test_panel_content.py
+import asyncio
+import json
+import os
+import types
+
+import discord
+import pytest
+
+from cogs.information_ticket_usage import InformationTicketUsage
+from cogs.rules_cog import RulesCog
+from utils import panel_content
+from utils.panel_content import EMBED_MAX_FIELDS, PanelContent, validate_embed_data
+
+RULES = {"title": "Reglas", "description": "Sé amable", "color": 65280, "fields": [{"name": "1", "value": "Nada de spam"}]}
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "fake"
+
+
+class FakeMessage:
+    def __init__(self, message_id, embed=None):
+        self.id = message_id
+        self.embeds = [embed] if embed else []
+        self.author = None
+        self.edits = 0
+
+    async def edit(self, embed=None):
+        self.embeds = [embed]
+        self.edits += 1
+
+
+class FakeChannel:
+    def __init__(self, guild_id=1, channel_id=100):
+        self.id = channel_id
+        self.name = "reglas"
+        self.guild = types.SimpleNamespace(id=guild_id)
+        self.messages = {}
+        self.sent = 0
+
+    async def fetch_message(self, message_id):
+        if message_id not in self.messages:
+            raise discord.NotFound(FakeResponse(404), "Unknown Message")
+        return self.messages[message_id]
+
+    async def send(self, embed=None):
+        self.sent += 1
+        message = FakeMessage(1000 + self.sent, embed)
+        self.messages[message.id] = message
+        return message
+
+    async def history(self, limit=None):
+        for message in reversed(list(self.messages.values())):
+            yield message
+
+
+def write_panel(directory, name, data):
+    path = directory / f"{name}.json"
+    path.write_text(json.dumps(data) if not isinstance(data, str) else data, encoding="utf-8")
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000)) # Distinct mtime on coarse filesystems
+
+
+@pytest.fixture
+def panels_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(panel_content, "PANEL_CONTENT_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_validate_embed_data_enforces_discord_limits():
+    data = json.loads(json.dumps(RULES))
+    validate_embed_data(data)
+    assert data["fields"][0]["inline"] is False # Defaulted
+    for bad in ({**RULES, "color": "verde"}, {**RULES, "title": "x" * 300}, {**RULES, "fields": [{"name": "1"}]},
+                {**RULES, "fields": [{"name": "n", "value": "v"}] * (EMBED_MAX_FIELDS + 1)},
+                {**RULES, "description": "x" * 4000, "fields": [{"name": "n", "value": "v" * 1000}] * 3}):
+        with pytest.raises(ValueError):
+            validate_embed_data(bad)
+
+
+def test_reload_only_applies_valid_changes(panels_dir):
+    content = PanelContent("rules")
+    assert content.data is None and not content.reload() # Missing file
+
+    write_panel(panels_dir, "rules", RULES)
+    assert content.reload() and content.data["title"] == "Reglas"
+    assert not content.reload() # Unchanged on disk
+
+    write_panel(panels_dir, "rules", "{ no es json")
+    assert not content.reload() and content.data["title"] == "Reglas" # The previous version stays
+
+    write_panel(panels_dir, "rules", {**RULES, "title": "Normas"})
+    assert content.reload() and content.data["title"] == "Normas"
+
+
+def make_cog(cog_class, panels_dir, monkeypatch):
+    write_panel(panels_dir, cog_class.panel_key, RULES)
+    monkeypatch.setattr(cog_class, "config_file", str(panels_dir / "state.json"))
+    bot = types.SimpleNamespace(user="bot", get_cog=lambda name: None)
+    return cog_class(bot)
+
+
+def test_panel_is_sent_once_and_edited_only_when_its_content_changes(panels_dir, monkeypatch):
+    cog = make_cog(RulesCog, panels_dir, monkeypatch)
+    channel = FakeChannel()
+
+    async def scenario():
+        await cog._publish_panel(channel)
+        message_id = cog.panels[1]['rules_message_id']
+        await cog._publish_panel(channel) # Same hash: untouched
+        assert channel.messages[message_id].edits == 0
+
+        write_panel(panels_dir, "rules", {**RULES, "title": "Normas"})
+        cog.content.reload()
+        await cog._publish_panel(channel)
+        assert channel.messages[message_id].edits == 1 and channel.messages[message_id].embeds[0].title == "Normas"
+
+        del channel.messages[message_id] # Deleted by hand: a new message is sent
+        await cog._publish_panel(channel)
+        return message_id
+
+    old_message_id = asyncio.run(scenario())
+    new_message_id = cog.panels[1]['rules_message_id']
+    assert new_message_id != old_message_id and len(channel.messages) == 1
+    assert cog.healer.channels == {100: new_message_id} # The healer watches the current message
+    saved = json.loads((panels_dir / "state.json").read_text())
+    assert saved == {"1": {"rules_message_id": new_message_id, "last_rules_hash": cog.panels[1]['last_rules_hash']}}
+
+
+def test_old_single_server_config_is_read_as_the_primary_guild(panels_dir, monkeypatch):
+    (panels_dir / "state.json").write_text(json.dumps({"rules_message_id": 5, "last_rules_hash": "abc"}))
+    cog = make_cog(RulesCog, panels_dir, monkeypatch)
+    assert cog.panels == {panel_content.PRIMARY_GUILD_ID: {"rules_message_id": 5, "last_rules_hash": "abc"}}
+
+
+def test_ticket_info_panel_reuses_its_message_from_history(panels_dir, monkeypatch):
+    cog = make_cog(InformationTicketUsage, panels_dir, monkeypatch)
+    channel = FakeChannel()
+    existing = FakeMessage(7, discord.Embed(title="Ticket System"))
+    existing.author = "bot"
+    channel.messages[7] = existing
+
+    asyncio.run(cog._publish_panel(channel))
+    assert cog.panels[1]['ticket_info_message_id'] == 7 and existing.edits == 1 and len(channel.messages) == 1
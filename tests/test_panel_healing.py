@@ -0,0 +1,90 @@
+# tests/test_panel_healing.py
+import asyncio
+
+from utils import panel_healing
+from utils.panel_healing import PanelHealer
+
+
+def fast_timings(monkeypatch):
+    monkeypatch.setattr(panel_healing, "PANEL_HEAL_DELAY", 0.01)
+    monkeypatch.setattr(panel_healing, "PANEL_HEAL_SPACING", 0)
+
+
+def test_track_replaces_the_previous_message_of_a_channel():
+    healer = PanelHealer(None, "Test")
+    healer.track(1, 10)
+    healer.track(1, 11)
+    healer.track(2, None) # Nothing published there
+    assert healer.messages == {11: 1} and healer.channels == {1: 11}
+
+
+def test_deleting_a_tracked_message_recreates_its_panel_once(monkeypatch):
+    fast_timings(monkeypatch)
+    recreated = []
+
+    async def scenario():
+        async def recreate(channel_id):
+            recreated.append(channel_id)
+            healer.track(channel_id, 20)
+
+        healer = PanelHealer(recreate, "Test")
+        healer.track(1, 10)
+        healer.deleted((99,)) # Unmanaged message: ignored
+        healer.deleted((10,))
+        healer.deleted((10,)) # Same deletion delivered twice (raw + bulk)
+        await asyncio.gather(*healer._scheduled.values())
+        return healer
+
+    healer = asyncio.run(scenario())
+    assert recreated == [1] and healer.channels == {1: 20} and healer._scheduled == {}
+
+
+def test_repeated_deletions_back_off(monkeypatch):
+    fast_timings(monkeypatch)
+
+    async def scenario():
+        async def recreate(channel_id):
+            healer.track(channel_id, channel_id * 100)
+
+        healer = PanelHealer(recreate, "Test")
+        delays = []
+        for _ in range(3):
+            delays.append(healer._next_delay(1))
+            healer.track(1, 100)
+            healer.deleted((100,))
+            await asyncio.gather(*healer._scheduled.values())
+        return delays
+
+    assert asyncio.run(scenario()) == [0.01, 0.02, 0.04]
+
+
+def test_backoff_is_capped_and_resets_after_the_window(monkeypatch):
+    healer = PanelHealer(None, "Test")
+    healer._streaks[1] = (30, panel_healing.time.monotonic())
+    assert healer._next_delay(1) == panel_healing.PANEL_HEAL_MAX_DELAY
+    healer._streaks[1] = (30, panel_healing.time.monotonic() - panel_healing.PANEL_HEAL_WINDOW - 1)
+    assert healer._next_delay(1) == panel_healing.PANEL_HEAL_DELAY
+
+
+def test_recreate_errors_are_logged_and_stop_cancels_pending_heals(monkeypatch):
+    fast_timings(monkeypatch)
+
+    async def scenario():
+        async def recreate(channel_id):
+            raise RuntimeError("sin permisos")
+
+        healer = PanelHealer(recreate, "Test")
+        healer.track(1, 10)
+        healer.deleted((10,))
+        await asyncio.gather(*healer._scheduled.values()) # Does not raise
+
+        monkeypatch.setattr(panel_healing, "PANEL_HEAL_DELAY", 60)
+        healer.track(2, 20)
+        healer.deleted((20,))
+        task = healer._scheduled[2]
+        healer.stop()
+        await asyncio.sleep(0)
+        return task.cancelled(), healer._scheduled
+
+    cancelled, scheduled = asyncio.run(scenario())
+    assert cancelled and scheduled == {}
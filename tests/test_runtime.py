@@ -0,0 +1,59 @@
+# tests/test_runtime.py
+import asyncio
+
+import pytest
+
+from utils import runtime
+from utils.runtime import OrjsonCodec, StdlibCodec, select_codec
+
+SAMPLE = {
+    'tickets': {'123': {'message_id': 456, 'hash': "abc"}},
+    'nombre': "Soporte técnico 🚀",
+    'types': [{'key': "bug", 'label': "Bug"}, {}],
+    'empty': [],
+    'ratio': 0.25,
+    'enabled': True,
+    'missing': None,
+}
+
+requires_orjson = pytest.mark.skipif(runtime.orjson is None, reason="orjson not installed")
+
+
+def test_stdlib_codec_round_trips():
+    codec = StdlibCodec()
+    assert codec.loads(codec.dumps_pretty(SAMPLE)) == SAMPLE
+    assert codec.loads(codec.canonical_bytes(SAMPLE)) == SAMPLE
+
+
+@requires_orjson
+def test_both_codecs_write_identical_files():
+    # Toggling the fast runtime must not rewrite every config and state file
+    assert StdlibCodec().dumps_pretty(SAMPLE) == OrjsonCodec().dumps_pretty(SAMPLE)
+
+
+@requires_orjson
+def test_canonical_bytes_do_not_depend_on_the_codec():
+    shuffled = {key: SAMPLE[key] for key in reversed(list(SAMPLE))}
+    assert StdlibCodec().canonical_bytes(shuffled) == OrjsonCodec().canonical_bytes(SAMPLE)
+
+
+def test_select_codec_falls_back_to_stdlib(monkeypatch):
+    assert select_codec(fast=False).name == "json"
+    monkeypatch.setattr(runtime, 'orjson', None)
+    assert select_codec(fast=True).name == "json"
+    assert "orjson" in runtime.describe(fast=True)
+
+
+def test_json_file_helpers_create_the_parent_directory(tmp_path):
+    path = str(tmp_path / "config" / "state.json")
+    runtime.save_json_file(path, SAMPLE)
+    assert runtime.load_json_file(path) == SAMPLE
+    assert runtime.content_hash(SAMPLE) == runtime.content_hash(dict(reversed(list(SAMPLE.items()))))
+
+
+def test_run_uses_the_default_loop_without_fast_mode():
+    async def main():
+        return type(asyncio.get_running_loop()).__module__
+
+    assert runtime.get_loop_factory(fast=False) is None
+    assert runtime.run(main(), fast=False).startswith("asyncio")
@@ -0,0 +1,35 @@
+# tests/test_sharding.py
+import pytest
+
+from utils import sharding
+
+
+@pytest.mark.parametrize("shards, processes, groups", [
+    (1, 1, [[0]]), (5, 2, [[0, 1, 2], [3, 4]]), (4, 4, [[0], [1], [2], [3]]), (7, 3, [[0, 1, 2], [3, 4], [5, 6]]),
+])
+def test_plan_workers_splits_shards_into_contiguous_groups(shards, processes, groups):
+    assert sharding.plan_workers(shards, processes) == groups
+
+
+def test_shard_for_guild_uses_discords_formula():
+    guild_id = 1382490687391400057
+    assert sharding.shard_for_guild(guild_id, 1) == 0
+    assert sharding.shard_for_guild(guild_id, 4) == (guild_id >> 22) % 4
+
+
+def test_a_worker_only_owns_the_guilds_of_its_shards(monkeypatch):
+    assert sharding.owns_guild(123) # No worker processes: every guild
+
+    guild_id = 5 << 22
+    monkeypatch.setattr(sharding, 'WORKER_SHARD_IDS', [sharding.shard_for_guild(guild_id)])
+    assert sharding.is_worker() and not sharding.is_supervisor()
+    assert sharding.owns_guild(guild_id)
+    monkeypatch.setattr(sharding, 'WORKER_SHARD_IDS', [sharding.shard_for_guild(guild_id) + 1])
+    assert not sharding.owns_guild(guild_id)
+
+
+def test_restart_delay_backs_off_exponentially_up_to_the_cap():
+    delays = [sharding.restart_delay(crashes) for crashes in range(1, 10)]
+    assert delays[:3] == [sharding.WORKER_RESTART_DELAY, 2 * sharding.WORKER_RESTART_DELAY, 4 * sharding.WORKER_RESTART_DELAY]
+    assert delays == sorted(delays)
+    assert max(delays) == sharding.WORKER_RESTART_MAX_DELAY
@@ -0,0 +1,118 @@
+# tests/test_state_store.py
+import asyncio
+import json
+
+import pytest
+
+from utils import state_store
+from utils.state_store import StateStore, load_document, refresh_document_key, save_document, state_lock
+
+
+@pytest.fixture
+def shared_store(tmp_path, monkeypatch):
+    """Multi-process mode: every process of the host opens the same SQLite file."""
+    store = StateStore(str(tmp_path / "state.db"))
+    monkeypatch.setattr(state_store, '_store', store)
+    monkeypatch.setattr(state_store, '_snapshots', {})
+    monkeypatch.setattr(state_store, 'LOCK_DIR', str(tmp_path / "locks"))
+    yield store
+    store.close()
+
+
+def as_worker(monkeypatch, snapshots):
+    """Switches to another worker's view of the documents it loaded."""
+    monkeypatch.setattr(state_store, '_snapshots', snapshots)
+
+
+def test_single_process_mode_uses_the_json_file(tmp_path):
+    path = str(tmp_path / "config" / "tickets.json")
+    with pytest.raises(FileNotFoundError):
+        load_document(path)
+    save_document(path, {"1": {'message_id': 5}})
+    assert json.loads(open(path, encoding='utf-8').read()) == {"1": {'message_id': 5}}
+    assert load_document(path) == {"1": {'message_id': 5}}
+
+
+def test_kv_get_put_delete(shared_store):
+    shared_store.put('ns', 1, {'a': [1, 2]})
+    assert shared_store.get('ns', "1") == {'a': [1, 2]}
+    shared_store.delete('ns', 1)
+    assert shared_store.get('ns', 1, default="none") == "none"
+
+
+def test_first_load_imports_the_json_file(tmp_path, shared_store):
+    path = str(tmp_path / "stats.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"10": {'opened': 1}}, f)
+
+    assert load_document(path) == {"10": {'opened': 1}}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({"10": {'opened': 99}}, f)
+    assert load_document(path) == {"10": {'opened': 1}} # The store is the source of truth from now on
+
+
+def test_workers_only_write_the_keys_they_changed(tmp_path, shared_store, monkeypatch):
+    path = str(tmp_path / "stats.json")
+    shared_store.write_many(path, {"1": shared_store.encode({'n': 0}), "2": shared_store.encode({'n': 0})})
+
+    worker_a, worker_b = {}, {}
+    as_worker(monkeypatch, worker_a)
+    doc_a = load_document(path)
+    as_worker(monkeypatch, worker_b)
+    doc_b = load_document(path)
+
+    doc_b["2"] = {'n': 2}
+    save_document(path, doc_b)
+    as_worker(monkeypatch, worker_a)
+    doc_a["1"] = {'n': 1}
+    save_document(path, doc_a) # Its stale copy of "2" is not written back
+
+    assert load_document(path) == {"1": {'n': 1}, "2": {'n': 2}}
+
+    del doc_a["1"]
+    save_document(path, doc_a)
+    assert shared_store.get(path, "1") is None
+
+
+def test_refresh_document_key_reads_another_workers_change(tmp_path, shared_store, monkeypatch):
+    path = str(tmp_path / "config.json")
+    shared_store.put(path, "1", {'v': 1})
+    data = load_document(path)
+    shared_store.put(path, "1", {'v': 2})
+    shared_store.put(path, "2", {'v': 3})
+
+    refresh_document_key(path, data, 1)
+    assert data == {"1": {'v': 2}}
+    shared_store.delete(path, "1")
+    refresh_document_key(path, data, "1")
+    assert data == {}
+
+
+def test_state_lock_serializes_sections_on_the_same_key(shared_store):
+    events = []
+
+    async def section(name):
+        async with state_lock('tickets', 42):
+            events.append(f"{name} in")
+            await asyncio.sleep(0.02)
+            events.append(f"{name} out")
+
+    async def main():
+        await asyncio.gather(section("a"), section("b"))
+
+    asyncio.run(main())
+    assert events == ["a in", "a out", "b in", "b out"]
+
+
+def test_log_relay_queue_is_ordered_per_channel(shared_store):
+    shared_store.enqueue_log(1, "primero")
+    shared_store.enqueue_log(2, "otro canal")
+    shared_store.enqueue_log(1, "segundo", {'title': "t"}, "a.txt", b"data")
+
+    pending = shared_store.pending_logs([1])
+    assert [entry['content'] for entry in pending] == ["primero", "segundo"]
+    assert pending[1]['embed'] == {'title': "t"} and pending[1]['file_data'] == b"data"
+    assert shared_store.pending_logs([]) == []
+
+    shared_store.ack_log(pending[0]['id'])
+    assert [entry['content'] for entry in shared_store.pending_logs([1, 2])] == ["otro canal", "segundo"]
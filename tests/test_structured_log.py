@@ -0,0 +1,57 @@
+# tests/test_structured_log.py
+import json
+import logging
+import queue
+import sys
+
+from utils.structured_log import DroppingQueueHandler, JsonLinesFormatter, TextFormatter, event_fields, parse_levels
+
+
+def make_record(msg="Ticket %s opened", args=("ana",), exc_info=None, **extra):
+    record = logging.LogRecord("cogs.tickets_cog", logging.INFO, __file__, 1, msg, args, exc_info)
+    record.__dict__.update(extra)
+    return record
+
+
+def test_event_fields_are_the_extra_keys_only():
+    assert event_fields(make_record(ticket_id=1, guild_id=2)) == {'ticket_id': 1, 'guild_id': 2}
+    assert event_fields(make_record()) == {}
+
+
+def test_json_lines_formatter_writes_one_object_with_the_event_fields():
+    line = JsonLinesFormatter().format(make_record(ticket_id=1, channel=object()))
+    entry = json.loads(line)
+    assert "\n" not in line
+    assert entry['msg'] == "Ticket ana opened" and entry['level'] == "INFO" and entry['logger'] == "cogs.tickets_cog"
+    assert entry['ticket_id'] == 1 and isinstance(entry['channel'], str) # Unknown objects are stringified
+    assert entry['ts'].endswith("+00:00")
+
+
+def test_text_formatter_appends_key_value_fields():
+    assert TextFormatter().format(make_record(ticket_id=1)).endswith("cogs.tickets_cog: Ticket ana opened ticket_id=1")
+
+
+def test_queue_handler_resolves_the_message_and_traceback_before_queueing():
+    try:
+        raise ValueError("boom")
+    except ValueError:
+        record = make_record(exc_info=sys.exc_info())
+    handler = DroppingQueueHandler(queue.Queue(10))
+    handler.handle(record)
+
+    queued = handler.queue.get_nowait()
+    assert queued.getMessage() == "Ticket ana opened" and queued.args is None
+    assert queued.exc_info is None and "ValueError: boom" in queued.exc_text
+    assert "ValueError: boom" in json.loads(JsonLinesFormatter().format(queued))['exc']
+
+
+def test_queue_handler_drops_instead_of_blocking_when_full():
+    handler = DroppingQueueHandler(queue.Queue(2))
+    for _ in range(5):
+        handler.handle(make_record())
+    assert handler.queue.qsize() == 2 and handler.dropped == 3
+
+
+def test_parse_levels():
+    assert parse_levels("cogs.tickets_cog=debug, discord=WARNING,,bad") == {'cogs.tickets_cog': "DEBUG", 'discord': "WARNING"}
+    assert parse_levels("") == {}
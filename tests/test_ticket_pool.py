@@ -0,0 +1,86 @@
+# tests/test_ticket_pool.py
+import asyncio
+import collections
+import datetime
+import types
+
+import discord
+
+from cogs.tickets_cog import IDLE_WARN_HOURS, TicketsCog
+from utils.deadline_scheduler import DeadlineScheduler
+
+GUILD = types.SimpleNamespace(id=1)
+
+
+class FakeResponse:
+    def __init__(self, status):
+        self.status = status
+        self.reason = "fake"
+
+
+class FakeChannel:
+    def __init__(self, channel_id, edit_error=None, created_at=0.0, last_message_id=None):
+        self.id = channel_id
+        self.name = f"pool-{channel_id}"
+        self.guild = GUILD
+        self.edit_error = edit_error
+        self.created_at = datetime.datetime.fromtimestamp(created_at, tz=datetime.timezone.utc)
+        self.last_message_id = last_message_id
+        self.deleted = False
+
+    async def edit(self, **kwargs):
+        if self.edit_error:
+            raise self.edit_error
+
+    async def delete(self, reason=None):
+        self.deleted = True
+
+
+def make_cog(channels):
+    cog = object.__new__(TicketsCog)
+    cog.bot = types.SimpleNamespace(get_channel={channel.id: channel for channel in channels}.get)
+    cog.ticket_pools = {GUILD.id: collections.deque(channel.id for channel in channels)}
+    cog._pool_refill_needed = asyncio.Event()
+    cog.guild_stats = {}
+    cog._idle_state = {}
+    cog.idle_scheduler = DeadlineScheduler(None)
+    return cog
+
+
+def claim(cog):
+    return asyncio.run(cog._claim_pooled_channel(GUILD, "ticket-ana", "topic", {}))
+
+
+def test_claim_returns_the_first_pooled_channel():
+    first, second = FakeChannel(10), FakeChannel(11)
+    cog = make_cog([first, second])
+    assert claim(cog) is first
+    assert list(cog.ticket_pools[GUILD.id]) == [11]
+
+
+def test_transient_claim_failure_puts_the_channel_back_in_the_pool():
+    channel = FakeChannel(10, edit_error=discord.HTTPException(FakeResponse(503), "unavailable"))
+    cog = make_cog([channel, FakeChannel(11)])
+
+    assert claim(cog) is None
+    assert list(cog.ticket_pools[GUILD.id]) == [10, 11]
+    assert not channel.deleted
+
+
+def test_permanent_claim_failure_deletes_the_channel():
+    channel = FakeChannel(10, edit_error=discord.Forbidden(FakeResponse(403), "missing permissions"))
+    cog = make_cog([channel])
+
+    assert claim(cog) is None
+    assert channel.deleted
+    assert not cog.ticket_pools[GUILD.id]
+
+
+def test_idle_deadline_of_an_empty_pooled_ticket_counts_from_the_claim():
+    channel = FakeChannel(10, created_at=1000.0) # Pre-created long before the ticket was opened
+    cog = make_cog([channel])
+    cog._stats(GUILD.id).ticket_opened(10, "soporte", 5, 500000.0)
+
+    cog._rebuild_idle_deadline(channel)
+    assert cog._idle_state[10]['last_activity'] == 500000.0
+    assert cog.idle_scheduler.deadline(10) == 500000.0 + IDLE_WARN_HOURS * 3600
@@ -0,0 +1,92 @@
+# tests/test_ticket_stats.py
+import json
+import random
+
+import pytest
+
+from utils.ticket_stats import LogHistogram, TicketStats, format_duration
+
+
+def test_quantiles_stay_within_the_relative_accuracy():
+    rng = random.Random(7)
+    values = sorted(rng.uniform(1, 7 * 86400) for _ in range(5000))
+    sketch = LogHistogram(relative_accuracy=0.02)
+    for value in values:
+        sketch.add(value)
+
+    for q in (0.5, 0.9, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert sketch.quantile(q) == pytest.approx(exact, rel=0.021)
+    assert sketch.mean() == pytest.approx(sum(values) / len(values))
+
+
+def test_empty_and_sub_second_values():
+    sketch = LogHistogram()
+    assert sketch.quantile(0.5) is None and sketch.mean() is None
+
+    for value in (0.0, 0.2, 0.5, 100.0):
+        sketch.add(value)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(1.0) == pytest.approx(100, rel=0.02)
+
+
+def test_histogram_survives_a_json_round_trip():
+    sketch = LogHistogram()
+    for value in (0.5, 3, 60, 3600):
+        sketch.add(value)
+    restored = LogHistogram.from_dict(json.loads(json.dumps(sketch.to_dict())))
+
+    assert restored.count == 4 and restored.zero_count == 1
+    assert restored.quantile(0.9) == sketch.quantile(0.9)
+
+
+def test_ticket_lifecycle_updates_the_kpis():
+    stats = TicketStats()
+    stats.ticket_opened(1, "soporte", 10, 1000.0, creator_name="ana")
+    stats.ticket_opened(1, "soporte", 10, 1000.0) # Already open: ignored
+    stats.ticket_opened(2, "soporte", 11, 1000.0, count_as_new=False)
+
+    assert stats.opened_total == 1
+    assert stats.open_by_category["soporte"] == 2
+    assert stats.open_tickets["1"]['creator_name'] == "ana"
+
+    assert stats.staff_replied(1, 1060.0)
+    assert not stats.staff_replied(1, 1100.0) # Only the first reply counts
+    assert stats.first_response.quantile(0.5) == pytest.approx(60, rel=0.02)
+
+    stats.ticket_closed(1, "resolved", 4600.0)
+    stats.forget(2)
+    assert not stats.is_open(1) and not stats.open_tickets
+    assert not stats.open_by_category
+    assert stats.closed_total == 1 and stats.status_ratio() == {"resolved": 1.0}
+    assert stats.time_to_close.quantile(0.5) == pytest.approx(3600, rel=0.02)
+
+
+def test_stats_round_trip_rebuilds_the_category_counters():
+    stats = TicketStats()
+    stats.ticket_opened(1, "soporte", 10, 1000.0, bot_message_ids=[5])
+    stats.ticket_opened(2, "ventas", 11, 1000.0)
+    stats.ticket_closed(2, "unresolved", 2000.0)
+
+    restored = TicketStats.from_dict(json.loads(json.dumps(stats.to_dict())))
+    assert restored.open_by_category == {"soporte": 1}
+    assert restored.status_counts == {"unresolved": 1}
+    assert restored.open_tickets["1"]['bot_message_ids'] == [5]
+
+
+def test_to_dict_is_a_snapshot_of_the_open_tickets():
+    stats = TicketStats()
+    stats.ticket_opened(1, "soporte", 10, 1000.0)
+    snapshot = stats.to_dict()
+    stats.open_tickets["1"]['idle_since'] = 5.0
+    stats.ticket_opened(2, "soporte", 11, 1000.0)
+
+    assert 'idle_since' not in snapshot['open_tickets']["1"]
+    assert "2" not in snapshot['open_tickets']
+
+
+@pytest.mark.parametrize("seconds, text", [
+    (None, "N/A"), (45, "45s"), (125, "2m 5s"), (7500, "2h 5m"), (3 * 86400 + 4 * 3600, "3d 4h"),
+])
+def test_format_duration(seconds, text):
+    assert format_duration(seconds) == text
@@ -0,0 +1,44 @@
+# tests/test_ticket_types.py
+import asyncio
+
+from cogs.tickets_cog import MAX_TICKET_TYPE_OPTIONS, TicketsCog, build_ticket_creation_view
+
+
+def ticket_types(count):
+    return [{'key': f"type{i}", 'label': f"Type {i}", 'description': "x" * 150} for i in range(count)]
+
+
+def build_view(layout):
+    async def main():
+        return build_ticket_creation_view(layout)
+    return asyncio.run(main())
+
+
+def test_layout_keeps_only_valid_types_and_indexes_them_by_key():
+    layout = TicketsCog._build_ticket_layout({'types': ticket_types(2) + [{'key': "nolabel"}, {'label': "No key"}]})
+    assert layout['style'] == 'buttons'
+    assert list(layout['by_key']) == ["type0", "type1"]
+
+
+def test_too_many_types_are_capped_to_what_a_select_menu_accepts(caplog):
+    layout = TicketsCog._build_ticket_layout({'style': 'select', 'types': ticket_types(30)})
+
+    assert len(layout['types']) == MAX_TICKET_TYPE_OPTIONS
+    assert "type29" in caplog.text
+
+    view = build_view(layout)
+    select = view.children[0].item
+    assert len(select.options) == MAX_TICKET_TYPE_OPTIONS
+    assert all(len(option.description) <= 100 for option in select.options)
+    view.to_components() # Raises if Discord's component limits are broken
+
+
+def test_buttons_panel_uses_one_custom_id_per_type():
+    view = build_view(TicketsCog._build_ticket_layout({'types': ticket_types(3)}))
+    assert [child.item.custom_id for child in view.children] == ["ticket_open:type0", "ticket_open:type1", "ticket_open:type2"]
+
+
+def test_a_full_button_panel_is_valid():
+    view = build_view(TicketsCog._build_ticket_layout({'types': ticket_types(30)}))
+    assert len(view.children) == MAX_TICKET_TYPE_OPTIONS
+    view.to_components()
@@ -0,0 +1,77 @@
+# tests/test_transcript_store.py
+import time
+
+import pytest
+
+from utils.transcript_store import TranscriptStore, build_match_query
+
+DAY = 86400
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TranscriptStore(str(tmp_path / "transcripts.db"))
+    yield store
+    store.close()
+
+
+def test_build_match_query_quotes_every_word_as_prefix():
+    assert build_match_query('mdns "OR" docker-compose') == '"mdns"* "OR"* "docker"* "compose"*'
+    assert build_match_query("¿?") == ""
+
+
+def test_search_is_scoped_to_the_guild(store):
+    store.add_ticket(1, "ticket-ana", "El mDNS no resuelve homedock.local", time.time(), guild_id=10)
+    store.add_ticket(2, "ticket-bob", "mdns caído", time.time(), guild_id=20)
+
+    assert [row['ticket_id'] for row in store.search("mdns", 10)] == [1]
+    assert [row['ticket_id'] for row in store.search("MDNS", 20)] == [2]
+    assert store.search("mdns", 30) == []
+    assert store.search("", 10) == []
+
+
+def test_get_transcript_is_scoped_to_the_guild(store):
+    store.add_ticket(1, "ticket-ana", "texto", time.time(), guild_id=10)
+
+    assert store.get_transcript(1, 10) == ("ticket-ana", "texto")
+    assert store.get_transcript(1, 20) is None
+    assert store.get_transcript(2, 10) is None
+
+
+def test_replacing_a_ticket_reindexes_it(store):
+    store.add_ticket(1, "ticket-ana", "primer texto", time.time(), guild_id=10)
+    store.add_ticket(1, "ticket-ana", "segundo texto", time.time(), guild_id=10)
+
+    assert store.count() == 1
+    assert store.search("primer", 10) == []
+    assert [row['ticket_id'] for row in store.search("segundo", 10)] == [1]
+
+
+def test_compact_keeps_old_transcripts_readable_and_searchable(store):
+    store.add_ticket(1, "ticket-old", "puerto 8080 ocupado", time.time() - 40 * DAY, guild_id=10)
+    store.add_ticket(2, "ticket-new", "puerto 443", time.time(), guild_id=10)
+
+    assert store.compact(30) == 1
+    assert store.compact(30) == 0 # Already compressed
+    assert store.get_transcript(1, 10) == ("ticket-old", "puerto 8080 ocupado")
+    assert sorted(row['ticket_id'] for row in store.search("puerto", 10)) == [1, 2]
+
+
+def test_purge_removes_old_tickets_and_their_index_entries(store):
+    store.add_ticket(1, "ticket-old", "volumen lleno", time.time() - 400 * DAY, guild_id=10)
+    store.add_ticket(2, "ticket-new", "volumen montado", time.time(), guild_id=10)
+    store.compact(30)
+
+    assert store.purge(365) == 1
+    assert store.count() == 1
+    assert store.get_transcript(1, 10) is None
+    assert [row['ticket_id'] for row in store.search("volumen", 10)] == [2]
+
+
+def test_set_archive_message_links_a_stored_ticket(store):
+    assert not store.set_archive_message(1, 500, 600) # Not stored yet
+    store.add_ticket(1, "ticket-ana", "mdns", time.time(), guild_id=10)
+
+    assert store.set_archive_message(1, 500, 600)
+    row = store.search("mdns", 10)[0]
+    assert (row['archive_channel_id'], row['archive_message_id']) == (500, 600)
@@ -0,0 +1,2 @@
+# utils/__init__.py
+# Helpers compartidos por el bot y los cogs (no son extensiones, no se cargan con load_cogs).
@@ -0,0 +1,170 @@
+# utils/antispam.py
+import collections
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# Límites de memoria: como mucho ANTISPAM_MAX_USERS usuarios y ANTISPAM_MAX_CHANNELS canales con estado;
+# el estado de quien no escribe en ANTISPAM_STATE_TTL segundos se descarta (primero el menos reciente).
+ANTISPAM_MAX_USERS = 20000
+ANTISPAM_MAX_CHANNELS = 2000
+ANTISPAM_STATE_TTL = 300
+# Huellas de mensajes recientes por usuario comparadas para detectar contenido repetido
+# (como mínimo; si un servidor pide más repeticiones en duplicate_messages se guardan tantas como pida)
+ANTISPAM_FINGERPRINTS = 8
+
+# Umbrales y acciones por defecto (cada servidor puede cambiarlos en la sección "antispam" de
+# config/guilds_config.json). Acciones: 'delete' (borra el mensaje), 'timeout' (aísla al usuario
+# timeout_seconds) y 'alert' (avisa en el canal de logs). 'raid' solo admite 'alert'.
+ANTISPAM_DEFAULTS = {
+    'enabled': True,
+    'window_seconds': 10,
+    'user_messages': 8,          # Mensajes de un usuario en la ventana
+    'duplicate_messages': 4,     # Mensajes idénticos de un usuario en la ventana
+    'mentions': 10,              # Menciones de un usuario en la ventana
+    'channel_messages': 60,      # Mensajes en un canal en la ventana (raid)
+    'channel_authors': 15,       # ...de al menos tantos autores distintos
+    'timeout_seconds': 300,
+    'alert_cooldown': 60,        # Segundos entre avisos del mismo tipo para un usuario/canal
+    'actions': {
+        'flood': ['delete', 'timeout', 'alert'],
+        'duplicate': ['delete', 'timeout', 'alert'],
+        'mentions': ['delete', 'timeout', 'alert'],
+        'raid': ['alert']
+    }
+}
+
+
+class SlidingWindow:
+    """
+    Event counter over the last `window` seconds. Only the newest `limit + 1` events are kept,
+    which is all that is needed to tell whether `limit` was exceeded, so memory and the amortized
+    cost per event are O(1) however fast events arrive.
+    """
+
+    __slots__ = ('events',)
+
+    def __init__(self, limit):
+        self.events = collections.deque(maxlen=limit + 1)
+
+    def add(self, now, window, value=None):
+        """Records an event and returns the events still inside the window (oldest first)."""
+        events = self.events
+        events.append((now, value))
+        while events[0][0] <= now - window:
+            events.popleft()
+        return events
+
+
+class _UserState:
+    __slots__ = ('messages', 'fingerprints', 'mentions', 'mention_total', 'last_seen')
+
+    def __init__(self, settings):
+        self.messages = SlidingWindow(settings['user_messages'])
+        self.fingerprints = collections.deque(maxlen=max(ANTISPAM_FINGERPRINTS, settings['duplicate_messages']))
+        self.mentions = collections.deque() # (time, count) of messages with mentions, at most settings['mentions'] + 1
+        self.mention_total = 0
+        self.last_seen = 0.0
+
+
+class _ChannelState:
+    __slots__ = ('messages', 'last_seen')
+
+    def __init__(self, settings):
+        self.messages = SlidingWindow(settings['channel_messages'])
+        self.last_seen = 0.0
+
+
+class SpamGuard:
+    """
+    Per-user and per-channel sliding windows fed by every guild message.
+
+    `observe` returns every violation a message triggers ('flood', 'duplicate', 'mentions',
+    'raid'), so each spam message can be acted on; `should_alert` rate-limits only the alerts.
+    State lives in two LRU dicts bounded by size and idle time, so a raid of fresh accounts
+    cannot grow it past ANTISPAM_MAX_USERS / ANTISPAM_MAX_CHANNELS.
+    """
+
+    def __init__(self, max_users=ANTISPAM_MAX_USERS, max_channels=ANTISPAM_MAX_CHANNELS, ttl=ANTISPAM_STATE_TTL, clock=time.monotonic):
+        self.max_users = max_users
+        self.max_channels = max_channels
+        self.ttl = ttl
+        self.clock = clock
+        self.users = collections.OrderedDict() # (guild_id, user_id) -> _UserState, least recently seen first
+        self.channels = collections.OrderedDict() # channel_id -> _ChannelState
+        self._cooldowns = collections.OrderedDict() # (kind, key) -> time of the last report
+        self.evicted = 0
+
+    def observe(self, guild_id, channel_id, user_id, content, mention_count, settings):
+        now = self.clock()
+        window = settings['window_seconds']
+        violations = []
+
+        user = self._touch(self.users, (guild_id, user_id), now, self.max_users, lambda: _UserState(settings))
+        if len(user.messages.add(now, window)) > settings['user_messages']:
+            violations.append('flood')
+
+        fingerprint = _fingerprint(content)
+        if fingerprint is not None:
+            user.fingerprints.append((now, fingerprint))
+            repeats = sum(1 for seen, value in user.fingerprints if value == fingerprint and seen > now - window)
+            if repeats >= settings['duplicate_messages']:
+                violations.append('duplicate')
+
+        if mention_count:
+            user.mentions.append((now, mention_count))
+            user.mention_total += mention_count
+            if len(user.mentions) > settings['mentions'] + 1:
+                # Every entry has at least one mention: the newest mentions + 1 are enough to exceed the limit
+                user.mention_total -= user.mentions.popleft()[1]
+        while user.mentions and user.mentions[0][0] <= now - window:
+            user.mention_total -= user.mentions.popleft()[1]
+        if user.mention_total > settings['mentions']:
+            violations.append('mentions')
+
+        channel = self._touch(self.channels, channel_id, now, self.max_channels, lambda: _ChannelState(settings))
+        recent = channel.messages.add(now, window, user_id)
+        if len(recent) > settings['channel_messages'] and len({author for _, author in recent}) >= settings['channel_authors']:
+            violations.append('raid')
+
+        return violations
+
+    def forget_user(self, guild_id, user_id):
+        """Drops a user's windows (after acting on them, so one burst is not punished twice)."""
+        self.users.pop((guild_id, user_id), None)
+
+    def stats(self):
+        return {'users': len(self.users), 'channels': len(self.channels), 'evicted': self.evicted}
+
+    def _touch(self, states, key, now, max_size, factory):
+        state = states.get(key)
+        if state is None:
+            state = states[key] = factory()
+        else:
+            states.move_to_end(key)
+        state.last_seen = now
+        # LRU + TTL: the oldest entries are at the front, so each call pops at most what expired
+        while len(states) > max_size or next(iter(states.values())).last_seen < now - self.ttl:
+            states.popitem(last=False)
+            self.evicted += 1
+        return state
+
+    def should_alert(self, kind, key, cooldown):
+        """True at most once per `cooldown` seconds for the same kind and key (a (guild, user) or a channel ID)."""
+        now = self.clock()
+        cooldown_key = (kind, key)
+        last = self._cooldowns.get(cooldown_key)
+        if last is not None and now - last < cooldown:
+            return False
+        self._cooldowns[cooldown_key] = now
+        self._cooldowns.move_to_end(cooldown_key)
+        while len(self._cooldowns) > self.max_users or next(iter(self._cooldowns.values())) < now - cooldown:
+            self._cooldowns.popitem(last=False)
+        return True
+
+
+def _fingerprint(content):
+    """Hash of the normalized text of a message (None for messages without text)."""
+    normalized = " ".join(content.lower().split())
+    return hash(normalized) if normalized else None
@@ -0,0 +1,161 @@
+# utils/attachment_archive.py
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+import time
+import zipfile
+
+import aiohttp
+
+# Formatos que ya vienen comprimidos: se guardan tal cual en el zip (deflate no gana nada y gasta CPU)
+_STORED_EXTENSIONS = {
+    '.png', '.jpg', '.jpeg', '.gif', '.webp', '.mp4', '.mov', '.webm', '.mp3', '.ogg',
+    '.zip', '.gz', '.tgz', '.7z', '.rar', '.xz', '.bz2', '.zst',
+}
+_UNSAFE_NAME_RE = re.compile(r"[^\w.-]+")
+_ZIP_COPY_BUFFER = 256 * 1024
+
+
+def _safe_filename(filename):
+    return _UNSAFE_NAME_RE.sub("_", filename).strip("._")[:100] or "file"
+
+
+class AttachmentMirror:
+    """
+    Copies ticket attachments out of Discord's CDN (its URLs expire) into one zip archive per ticket.
+
+    All downloads go through one pooled aiohttp session (`pool_size` connections shared by every
+    ticket). Each ticket downloads at most `per_ticket_concurrency` files at once and at most
+    `max_ticket_bytes` in total; attachments that do not fit are skipped and keep their URL.
+    Downloads are streamed in chunks to staging files, and the archive is then written by
+    streaming those files into the zip, so no attachment is ever held in memory whole.
+    """
+
+    def __init__(self, archive_dir, pool_size=8, per_ticket_concurrency=3, max_ticket_bytes=8 * 1024 * 1024,
+                 max_file_bytes=8 * 1024 * 1024, chunk_size=64 * 1024, timeout=60):
+        self.archive_dir = archive_dir
+        self.pool_size = pool_size
+        self.per_ticket_concurrency = per_ticket_concurrency
+        self.max_ticket_bytes = max_ticket_bytes
+        self.max_file_bytes = max_file_bytes
+        self.chunk_size = chunk_size
+        self.timeout = timeout
+        self._session = None
+
+    def archive_path(self, ticket_id):
+        return os.path.join(self.archive_dir, f"ticket-{ticket_id}.zip")
+
+    async def start(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.timeout))
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+            self._session = None
+
+    def plan(self, attachments, budget):
+        """
+        Splits attachments into (selected, skipped) using the sizes Discord reports, in message order.
+        `skipped` maps attachment ID -> reason.
+        """
+        selected, skipped = [], {}
+        remaining = min(budget, self.max_ticket_bytes)
+        for attachment in attachments:
+            if attachment.size > self.max_file_bytes:
+                skipped[attachment.id] = "file too large"
+            elif attachment.size > remaining:
+                skipped[attachment.id] = "ticket size limit reached"
+            else:
+                selected.append(attachment)
+                remaining -= attachment.size
+        return selected, skipped
+
+    async def _download(self, attachment, path, semaphore):
+        async with semaphore:
+            written = 0
+            async with self._session.get(attachment.url) as response:
+                response.raise_for_status()
+                with open(path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        written += len(chunk)
+                        # El tamaño ya se reservó en plan(); no dejar que el CDN lo supere
+                        if written > attachment.size:
+                            raise ValueError(f"{attachment.filename} is larger than announced ({attachment.size} bytes)")
+                        f.write(chunk)
+            return written
+
+    def _write_zip(self, part_path, transcript_text, files):
+        with zipfile.ZipFile(part_path, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=6) as archive:
+            archive.writestr("transcript.txt", transcript_text)
+            for arcname, staged_path in files:
+                extension = os.path.splitext(arcname)[1].lower()
+                info = zipfile.ZipInfo.from_file(staged_path, arcname)
+                info.compress_type = zipfile.ZIP_STORED if extension in _STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+                with open(staged_path, 'rb') as source, archive.open(info, 'w') as target:
+                    shutil.copyfileobj(source, target, _ZIP_COPY_BUFFER)
+
+    async def build_archive(self, ticket_id, attachments, budget, render_transcript):
+        """
+        Downloads `attachments` and writes them to the ticket's zip together with the transcript.
+
+        `render_transcript(mirrored, skipped)` is called once the downloads finish, so the transcript
+        can point each attachment at its copy in the archive. Returns {'path', 'size', 'transcript',
+        'mirrored': {attachment_id: name in zip}, 'skipped': {attachment_id: reason}, 'seconds'}.
+        """
+        await self.start()
+        start = time.perf_counter()
+        os.makedirs(self.archive_dir, exist_ok=True)
+        selected, skipped = self.plan(attachments, budget)
+        mirrored = {}
+        path = self.archive_path(ticket_id)
+
+        with tempfile.TemporaryDirectory(dir=self.archive_dir) as staging_dir:
+            semaphore = asyncio.Semaphore(self.per_ticket_concurrency)
+            names = [f"attachments/{index:03d}-{_safe_filename(a.filename)}" for index, a in enumerate(selected, 1)]
+            staged = [os.path.join(staging_dir, str(index)) for index in range(len(selected))]
+            results = await asyncio.gather(
+                *(self._download(a, staged_path, semaphore) for a, staged_path in zip(selected, staged)),
+                return_exceptions=True
+            )
+
+            files = []
+            for attachment, name, staged_path, result in zip(selected, names, staged, results):
+                if isinstance(result, asyncio.CancelledError):
+                    raise result # Shutdown or session closed: not a failed download, the closure job retries
+                if isinstance(result, aiohttp.ClientResponseError):
+                    skipped[attachment.id] = f"download failed (HTTP {result.status})"
+                elif isinstance(result, BaseException):
+                    skipped[attachment.id] = f"download failed ({type(result).__name__})"
+                else:
+                    mirrored[attachment.id] = name
+                    files.append((name, staged_path))
+
+            transcript_text = render_transcript(mirrored, skipped)
+            part_path = path + ".part"
+            await asyncio.to_thread(self._write_zip, part_path, transcript_text, files)
+            os.replace(part_path, path)
+
+        return {
+            'path': path,
+            'size': os.path.getsize(path),
+            'transcript': transcript_text,
+            'mirrored': mirrored,
+            'skipped': skipped,
+            'seconds': time.perf_counter() - start,
+        }
+
+    def purge(self, older_than_days):
+        """Deletes local archives older than `older_than_days` (same retention as the transcripts). Returns how many."""
+        if not os.path.isdir(self.archive_dir):
+            return 0
+        cutoff = time.time() - older_than_days * 86400
+        purged = 0
+        for entry in os.scandir(self.archive_dir):
+            if entry.is_file() and entry.name.endswith(".zip") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                purged += 1
+        return purged
@@ -0,0 +1,101 @@
+# utils/category_allocator.py
+import time
+from collections import Counter
+
+
+class CategoryAllocator:
+    """
+    In-memory occupancy of the ticket categories (Discord caps a category at 50 channels).
+
+    Each category tracks the set of channel IDs it holds plus pending reservations made by
+    `reserve` before the channel actually exists, so concurrent ticket openings never overfill
+    a category. Channel create/delete events and explicit confirmations both update the same
+    sets, so double reporting is harmless. Overflow categories remember since when they are
+    empty, so they are only collapsed after staying empty for a while.
+    """
+
+    def __init__(self, primary_id, capacity=50, clock=time.monotonic):
+        self.primary_id = primary_id
+        self.capacity = capacity
+        self.clock = clock
+        self.members = {primary_id: set()}
+        self.pending = Counter()
+        self.empty_since = {} # overflow category_id -> time it became empty
+
+    def __contains__(self, category_id):
+        return category_id in self.members
+
+    def category_ids(self):
+        return list(self.members)
+
+    def overflow_ids(self):
+        return [category_id for category_id in self.members if category_id != self.primary_id]
+
+    def add_category(self, category_id, channel_ids=()):
+        self.members.setdefault(category_id, set()).update(channel_ids)
+        self._update_empty_since(category_id)
+
+    def remove_category(self, category_id):
+        if category_id == self.primary_id:
+            return
+        self.members.pop(category_id, None)
+        self.pending.pop(category_id, None)
+        self.empty_since.pop(category_id, None)
+
+    def occupancy(self, category_id):
+        return len(self.members.get(category_id, ())) + self.pending[category_id]
+
+    def reserve(self):
+        """Reserves a slot in the least-full category with room. Returns its ID, or None if all are full."""
+        best_id = None
+        best_occupancy = self.capacity
+        for category_id in self.members:
+            occupancy = self.occupancy(category_id)
+            if occupancy < best_occupancy:
+                best_id, best_occupancy = category_id, occupancy
+        if best_id is not None:
+            self.pending[best_id] += 1
+            self.empty_since.pop(best_id, None)
+        return best_id
+
+    def confirm(self, category_id, channel_id):
+        """Turns a reservation into a real channel."""
+        self.release(category_id)
+        self.channel_added(category_id, channel_id)
+
+    def release(self, category_id):
+        """Drops a reservation (channel creation failed, or it was confirmed)."""
+        if self.pending[category_id] > 0:
+            self.pending[category_id] -= 1
+        if not self.pending[category_id]:
+            del self.pending[category_id]
+        self._update_empty_since(category_id)
+
+    def channel_added(self, category_id, channel_id):
+        if category_id in self.members:
+            self.members[category_id].add(channel_id)
+            self.empty_since.pop(category_id, None)
+
+    def channel_removed(self, category_id, channel_id):
+        if category_id in self.members:
+            self.members[category_id].discard(channel_id)
+            self._update_empty_since(category_id)
+
+    def _update_empty_since(self, category_id):
+        if category_id == self.primary_id or category_id not in self.members:
+            return
+        if self.occupancy(category_id) == 0:
+            self.empty_since.setdefault(category_id, self.clock())
+        else:
+            self.empty_since.pop(category_id, None)
+
+    def empty_overflow_ids(self, min_empty_seconds=0):
+        """Overflow categories with no channels and no reservations for at least `min_empty_seconds` (candidates for collapsing)."""
+        now = self.clock()
+        return [category_id for category_id, since in self.empty_since.items() if now - since >= min_empty_seconds]
+
+    def seconds_until_collapse(self, min_empty_seconds):
+        """Time until the longest-empty overflow category reaches `min_empty_seconds` (None if none is empty)."""
+        if not self.empty_since:
+            return None
+        return max(min(self.empty_since.values()) + min_empty_seconds - self.clock(), 0)
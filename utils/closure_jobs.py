@@ -0,0 +1,172 @@
+# utils/closure_jobs.py
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from utils import runtime
+
+log = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS closure_jobs (
+    ticket_id INTEGER PRIMARY KEY,     -- One closure per ticket channel/thread
+    guild_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    steps_done TEXT NOT NULL,          -- JSON list of completed step names
+    state TEXT NOT NULL,               -- JSON: closure parameters plus what the completed steps produced
+    transcript TEXT
+);
+"""
+
+
+class ClosureJournal:
+    """
+    Journal of ticket closure jobs (SQLite in WAL mode).
+
+    A job keeps its parameters, the steps already completed and what later steps need (the
+    transcript, the archive message...), so after a restart only the remaining steps run.
+    All methods are blocking; the cog calls them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add(self, ticket_id, guild_id, state):
+        """Journals a new job. Returns False if the ticket already has one."""
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                cursor = self._conn.execute(
+                    "INSERT OR IGNORE INTO closure_jobs (ticket_id, guild_id, created_at, updated_at, steps_done, state) VALUES (?, ?, ?, ?, '[]', ?)",
+                    (ticket_id, guild_id, now, now, runtime.codec.canonical_bytes(state).decode('utf-8'))
+                )
+        return cursor.rowcount > 0
+
+    def get(self, ticket_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT ticket_id, guild_id, attempts, steps_done, state, transcript FROM closure_jobs WHERE ticket_id = ?", (ticket_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {
+            'ticket_id': row[0], 'guild_id': row[1], 'attempts': row[2],
+            'steps_done': json.loads(row[3]), 'state': runtime.codec.loads(row[4]), 'transcript': row[5]
+        }
+
+    def pending(self):
+        """(ticket_id, guild_id) of the unfinished jobs, oldest first."""
+        with self._lock:
+            return self._conn.execute("SELECT ticket_id, guild_id FROM closure_jobs ORDER BY created_at").fetchall()
+
+    def complete_step(self, job, with_transcript=False):
+        """Saves a job's progress. The (large) transcript is only written by the step that produces it."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "UPDATE closure_jobs SET steps_done = ?, state = ?, transcript = CASE WHEN ? THEN ? ELSE transcript END, updated_at = ? WHERE ticket_id = ?",
+                    (json.dumps(job['steps_done']), runtime.codec.canonical_bytes(job['state']).decode('utf-8'),
+                     with_transcript, job['transcript'], time.time(), job['ticket_id'])
+                )
+
+    def failed_attempt(self, ticket_id):
+        """Counts a failed run of a job and returns its attempts so far."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE closure_jobs SET attempts = attempts + 1, updated_at = ? WHERE ticket_id = ?", (time.time(), ticket_id))
+            row = self._conn.execute("SELECT attempts FROM closure_jobs WHERE ticket_id = ?", (ticket_id,)).fetchone()
+        return row[0] if row else 0
+
+    def remove(self, ticket_id):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM closure_jobs WHERE ticket_id = ?", (ticket_id,))
+
+
+class WorkerPool:
+    """
+    Bounded queue of job keys consumed by a fixed number of worker tasks.
+
+    `submit` never waits: when the queue is full it returns None, so the caller can refuse the
+    work (backpressure). Keys already queued or running are not queued twice.
+    """
+
+    def __init__(self, handler, workers, max_queued):
+        self.handler = handler
+        self.workers = workers
+        self.queue = asyncio.Queue(max_queued)
+        self.pending = set() # Keys queued or running
+        self.running = set()
+        self._done = {} # key -> Future resolved when its handler returns
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._tasks = []
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    def full(self):
+        return self.queue.full()
+
+    def submit(self, key):
+        """Queues `key`. Returns a future resolved when it has been processed, or None if the queue is full."""
+        if key in self.pending:
+            return self._done[key]
+        try:
+            self.queue.put_nowait(key)
+        except asyncio.QueueFull:
+            return None
+        self.pending.add(key)
+        self._idle.clear()
+        self._done[key] = asyncio.get_running_loop().create_future()
+        return self._done[key]
+
+    async def submit_wait(self, key):
+        """Like submit, but waits for room in the queue instead of refusing."""
+        while (done := self.submit(key)) is None:
+            await asyncio.sleep(1)
+        return done
+
+    async def wait_idle(self):
+        await self._idle.wait()
+
+    async def _worker(self):
+        while True:
+            key = await self.queue.get()
+            self.running.add(key)
+            try:
+                await self.handler(key)
+            except Exception as e:
+                log.exception(f"Error processing job {key}: {e}")
+            finally:
+                self.running.discard(key)
+                self.pending.discard(key)
+                done = self._done.pop(key, None)
+                if done and not done.done():
+                    done.set_result(None)
+                self.queue.task_done()
+                if not self.pending:
+                    self._idle.set()
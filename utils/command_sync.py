@@ -0,0 +1,43 @@
+# utils/command_sync.py
+import json
+import logging
+import os
+
+from utils.runtime import load_json_file, save_json_file, content_hash
+
+log = logging.getLogger(__name__)
+
+# Hash de la definición de los comandos de aplicación (slash) que se sincronizó por última vez.
+# Borrar el fichero fuerza una nueva sincronización en el próximo arranque.
+COMMAND_SYNC_FILE = 'config/command_tree_sync.json'
+
+# HOMEDOCK_MESSAGE_CONTENT=0 desactiva el intent privilegiado message_content: el gateway deja de
+# enviar el texto de los mensajes y los comandos se usan como /comando (o mencionando al bot).
+MESSAGE_CONTENT_INTENT = os.getenv('HOMEDOCK_MESSAGE_CONTENT', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def command_tree_hash(tree, application_id):
+    """Hash of the payload Discord receives on sync: any change in names, options, descriptions or checks changes it."""
+    commands = sorted((command.to_dict(tree) for command in tree.get_commands()), key=lambda c: (c['name'], c.get('type', 1)))
+    return content_hash({'application_id': application_id, 'commands': commands})
+
+
+async def sync_command_tree(tree, application_id, path=COMMAND_SYNC_FILE):
+    """
+    Syncs the global command tree only when its hash differs from the last synced one, so a
+    restart does not spend the (heavily rate-limited) sync endpoint. Returns True if it synced.
+    """
+    current_hash = command_tree_hash(tree, application_id)
+    try:
+        last_hash = load_json_file(path).get('hash')
+    except (FileNotFoundError, json.JSONDecodeError):
+        last_hash = None
+
+    if current_hash == last_hash:
+        log.info(f"Command tree unchanged ({current_hash[:12]}). Sync skipped.")
+        return False
+
+    synced = await tree.sync()
+    save_json_file(path, {'hash': current_hash, 'commands': sorted(command.name for command in synced)})
+    log.info(f"Command tree synced: {len(synced)} application commands ({current_hash[:12]}).")
+    return True
@@ -0,0 +1,99 @@
+# utils/deadline_scheduler.py
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+
+class DeadlineScheduler:
+    """
+    One background task that fires `callback(key)` when the deadline of a key expires.
+
+    Deadlines live in a dict (key -> timestamp) and a min-heap. Pushing a deadline *later*
+    (the common case: activity in a ticket) only updates the dict in O(1); the stale heap
+    entry is re-pushed with the current deadline when it reaches the top. Earlier deadlines
+    are pushed immediately and wake the task up. Cancelled keys are dropped lazily.
+    Timestamps are wall-clock (time.time()) so they can be rebuilt after a restart.
+    """
+
+    def __init__(self, callback, clock=time.time):
+        self._callback = callback
+        self._clock = clock
+        self._deadlines = {}
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._task = None
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def __contains__(self, key):
+        return key in self._deadlines
+
+    def deadline(self, key):
+        return self._deadlines.get(key)
+
+    def schedule(self, key, deadline):
+        """Sets (or moves) the deadline of `key`."""
+        previous = self._deadlines.get(key)
+        self._deadlines[key] = deadline
+        if previous is None or deadline < previous:
+            heapq.heappush(self._heap, (deadline, next(self._counter), key))
+            if self._heap[0][2] == key:
+                self._wakeup.set()
+
+    def cancel(self, key):
+        self._deadlines.pop(key, None)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    def _next_due(self):
+        """Discards stale heap entries; returns (deadline, key) of the earliest live one, or None."""
+        while self._heap:
+            deadline, _, key = self._heap[0]
+            current = self._deadlines.get(key)
+            if current is None:
+                heapq.heappop(self._heap) # Cancelado
+            elif current != deadline:
+                # El plazo se movió: reinsertar con el valor actual
+                heapq.heapreplace(self._heap, (current, next(self._counter), key))
+            else:
+                return deadline, key
+        return None
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            due = self._next_due()
+            if due is None:
+                await self._wakeup.wait()
+                continue
+            deadline, key = due
+            delay = deadline - self._clock()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._heap)
+            del self._deadlines[key]
+            # Cada callback en su propia tarea: un cierre lento no retrasa los demás plazos
+            asyncio.get_running_loop().create_task(self._fire(key))
+
+    async def _fire(self, key):
+        try:
+            await self._callback(key)
+        except Exception as e:
+            log.error(f"Error in scheduled callback for {key}: {e}")
@@ -0,0 +1,67 @@
+# utils/guild_config.py
+import json
+import logging
+import os
+
+from utils.runtime import load_json_file
+
+log = logging.getLogger(__name__)
+
+# Ajustes por servidor. Sin este fichero el bot funciona como siempre: un solo servidor
+# (PRIMARY_GUILD_ID) configurado con las constantes de cada cog.
+GUILDS_CONFIG_FILE = 'config/guilds_config.json'
+PRIMARY_GUILD_ID = int(os.getenv('HOMEDOCK_PRIMARY_GUILD_ID', '1381296490923954226'))
+
+
+class GuildConfig:
+    """
+    Per-guild settings, grouped by section ("logging", "tickets", "rules"...): {guild_id: {section: {...}}}.
+
+    Each cog registers its module constants as the primary guild's defaults for its section, and
+    GUILDS_CONFIG_FILE adds other guilds (or overrides the primary one). A lookup is two dict
+    gets on the guild ID, so handlers resolve their guild context in O(1).
+    """
+
+    def __init__(self):
+        self.guilds = {} # guild_id -> {section: settings} from the file
+        self._defaults = {} # section -> settings of the primary guild
+        self._merged = {} # (guild_id, section) -> settings, cache of section()
+
+    def load(self, path=GUILDS_CONFIG_FILE):
+        try:
+            raw = load_json_file(path)
+        except FileNotFoundError:
+            raw = {}
+        except json.JSONDecodeError as e:
+            log.error(f"Error decoding {path}: {e}. Using the single-server defaults.")
+            raw = {}
+        self.guilds = {int(guild_id): sections for guild_id, sections in raw.items()}
+        self._merged.clear()
+        if len(self.guilds) > (PRIMARY_GUILD_ID in self.guilds):
+            log.info(f"Guild config loaded: {len(self.guilds)} servers in {path}.")
+
+    def register_defaults(self, section, settings):
+        """Module constants of a cog, used for the primary guild when the file does not override them."""
+        self._defaults[section] = settings
+        self._merged = {key: value for key, value in self._merged.items() if key[1] != section}
+
+    def section(self, guild_id, section):
+        """Settings of `section` for a guild, or None if the guild does not use that feature."""
+        key = (guild_id, section)
+        if key in self._merged:
+            return self._merged[key]
+        settings = self.guilds.get(guild_id, {}).get(section)
+        if guild_id == PRIMARY_GUILD_ID and section in self._defaults:
+            settings = {**self._defaults[section], **(settings or {})}
+        self._merged[key] = settings
+        return settings
+
+    def guild_ids(self, section):
+        """Guilds that have settings for `section` (the primary one first)."""
+        ids = [PRIMARY_GUILD_ID] if section in self._defaults else []
+        ids.extend(guild_id for guild_id, sections in self.guilds.items() if section in sections and guild_id != PRIMARY_GUILD_ID)
+        return ids
+
+
+guild_config = GuildConfig()
+guild_config.load()
@@ -0,0 +1,112 @@
+# utils/leadership.py
+import asyncio
+import logging
+import os
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows: sin flock, el modo en espera no está disponible
+    fcntl = None
+
+from utils import sharding
+
+log = logging.getLogger(__name__)
+
+# --- INSTANCIA EN ESPERA (HOT STANDBY) ---
+# Con HOMEDOCK_STANDBY=1 se pueden arrancar dos instancias del bot con el mismo token en el mismo host
+# (o con data/ en un volumen compartido local). La que consigue el lease es la activa. La otra se conecta
+# al gateway y mantiene sus cachés al día, pero no carga los cogs, así que no hace ningún trabajo con
+# efectos. El lease es un flock sobre HOMEDOCK_STANDBY_LOCK: el sistema lo libera en cuanto muere el
+# proceso activo, y la instancia en espera lo comprueba cada STANDBY_POLL_INTERVAL segundos.
+# No uses un sistema de ficheros de red para el lock: flock no es fiable sobre NFS.
+STANDBY_ENABLED = os.getenv('HOMEDOCK_STANDBY', '0').lower() in ('1', 'true', 'yes', 'on')
+STANDBY_LOCK_FILE = os.getenv('HOMEDOCK_STANDBY_LOCK', 'data/leader.lock')
+STANDBY_POLL_INTERVAL = float(os.getenv('HOMEDOCK_STANDBY_POLL_INTERVAL', '1'))
+
+
+class LeaderLease:
+    """
+    Exclusive lease held as an flock on a file for the life of the process.
+
+    The holder writes its PID and start time into the file so the standby can report who is
+    active. Closing the descriptor (or the process dying) releases it.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.acquired_at = None
+        self._fd = None
+
+    @property
+    def held(self):
+        return self._fd is not None
+
+    def try_acquire(self):
+        """Takes the lease if nobody holds it. Returns True if this process holds it."""
+        if self._fd is not None:
+            return True
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        fd = os.open(self.path, os.O_CREAT | os.O_RDWR)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, f"pid={os.getpid()} since={time.strftime('%Y-%m-%d %H:%M:%S')}\n".encode('utf-8'))
+        self._fd = fd
+        self.acquired_at = time.time()
+        return True
+
+    async def wait_acquire(self):
+        while not self.try_acquire():
+            await asyncio.sleep(STANDBY_POLL_INTERVAL)
+
+    def holder(self):
+        """What the current holder wrote into the lease file ('' if unknown)."""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            return ''
+
+    def release(self):
+        if self._fd is not None:
+            os.close(self._fd) # Closing the descriptor releases the flock
+            self._fd = None
+
+
+_lease = None
+
+
+def get_lease():
+    """The lease of this process (one per worker index in multi-process mode), None without standby mode."""
+    global _lease
+    if _lease is None and STANDBY_ENABLED and fcntl is not None:
+        path = STANDBY_LOCK_FILE
+        if sharding.is_worker():
+            root, ext = os.path.splitext(path)
+            path = f"{root}-worker{sharding.WORKER_INDEX}{ext}"
+        _lease = LeaderLease(path)
+    return _lease
+
+
+def describe():
+    if not STANDBY_ENABLED:
+        return "disabled"
+    if fcntl is None:
+        return "unavailable (needs flock: Linux/macOS); running as the active instance"
+    return f"lease {get_lease().path}"
+
+
+def is_leader():
+    """True if this process must do the bot's work (always True without standby mode)."""
+    lease = get_lease()
+    return lease is None or lease.held
+
+
+def release():
+    """Hands the lease to the standby (called on shutdown once the state has been saved)."""
+    if _lease is not None:
+        _lease.release()
@@ -0,0 +1,67 @@
+# utils/log_relay.py
+import asyncio
+import io
+import logging
+
+import discord
+
+from utils.outbox import is_transient
+
+log = logging.getLogger(__name__)
+
+
+class LogRelayChannel:
+    """
+    Stand-in for the log channel in worker processes that do not own its guild.
+
+    `send` queues the message in the shared state store instead of calling Discord, and the
+    owner process delivers it (see `deliver_relayed_logs`). All log traffic then leaves from one
+    process, which keeps it ordered and within a single rate-limit bucket.
+    """
+
+    def __init__(self, store, channel_id):
+        self.store = store
+        self.id = channel_id
+        self.name = f"log-relay-{channel_id}"
+        self.mention = f"<#{channel_id}>"
+
+    async def send(self, content=None, *, embed=None, file=None, **kwargs):
+        file_name = file_data = None
+        if file is not None:
+            file.fp.seek(0)
+            file_data = file.fp.read()
+            if isinstance(file_data, str):
+                file_data = file_data.encode('utf-8')
+            file_name = file.filename
+        await asyncio.to_thread(self.store.enqueue_log, self.id, content, embed.to_dict() if embed else None, file_name, file_data)
+
+
+async def deliver_relayed_logs(store, channels, batch_size=20):
+    """
+    Sends the queued log messages of `channels` ({channel_id: channel}) in order. A transient
+    failure (rate limit, 5xx, network) stops the run and the entry is retried on the next call;
+    a permanent one (403, 404, too large...) drops the entry so it cannot block the ones behind it.
+    Returns how many were sent.
+    """
+    sent = 0
+    for entry in await asyncio.to_thread(store.pending_logs, channels, batch_size):
+        channel = channels[entry['channel_id']]
+        kwargs = {}
+        if entry['embed']:
+            kwargs['embed'] = discord.Embed.from_dict(entry['embed'])
+        if entry['file_data'] is not None:
+            kwargs['file'] = discord.File(io.BytesIO(entry['file_data']), filename=entry['file_name'])
+        try:
+            await channel.send(entry['content'], **kwargs)
+        except Exception as e:
+            if is_transient(e):
+                log.warning(f"Error delivering relayed log message {entry['id']}: {e}. Will retry.", extra={'channel_id': entry['channel_id']})
+                break
+            if not isinstance(e, discord.HTTPException):
+                raise
+            log.error(f"Relayed log message {entry['id']} dropped: {e}", extra={'channel_id': entry['channel_id']})
+            await asyncio.to_thread(store.ack_log, entry['id'])
+            continue
+        await asyncio.to_thread(store.ack_log, entry['id'])
+        sent += 1
+    return sent
@@ -0,0 +1,97 @@
+# utils/message_cache.py
+import collections
+import os
+import sys
+
+# Memoria máxima (aproximada) del contenido guardado para el registro de ediciones y borrados,
+# y mensajes guardados por canal (los más antiguos se descartan primero).
+AUDIT_CACHE_MAX_BYTES = int(os.getenv('HOMEDOCK_AUDIT_CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+AUDIT_CACHE_PER_CHANNEL = int(os.getenv('HOMEDOCK_AUDIT_CACHE_PER_CHANNEL', '500'))
+# Bytes contados por mensaje además de su texto (tupla, entrada del dict y enteros)
+RECORD_OVERHEAD = 240
+
+
+class MessageCache:
+    """
+    Recent message content per channel, for the edit/delete audit trail.
+
+    Each channel is a ring buffer (an insertion-ordered dict capped at `per_channel`) of compact
+    tuples (author_id, author_name, created_at, content, attachment_names), with the content kept
+    as UTF-8 bytes (a str with a single emoji takes 4 bytes per character) and decoded when read.
+    Above `max_bytes` the oldest message of the least recently active channel is dropped, so
+    every operation is O(1).
+    """
+
+    def __init__(self, max_bytes=AUDIT_CACHE_MAX_BYTES, per_channel=AUDIT_CACHE_PER_CHANNEL):
+        self.max_bytes = max_bytes
+        self.per_channel = per_channel
+        self.channels = collections.OrderedDict() # channel_id -> {message_id: record}, least recently active first
+        self.bytes = 0
+        self.count = 0
+        self.evicted = 0
+
+    def add(self, channel_id, message_id, author_id, author_name, created_at, content, attachment_names=()):
+        messages = self.channels.get(channel_id)
+        if messages is None:
+            messages = self.channels[channel_id] = {}
+        else:
+            self.channels.move_to_end(channel_id)
+        self._discard(messages, message_id)
+        record = (author_id, author_name, created_at, content.encode('utf-8'), tuple(attachment_names))
+        messages[message_id] = record
+        self.bytes += _record_size(record)
+        self.count += 1
+        if len(messages) > self.per_channel:
+            self._discard(messages, next(iter(messages)))
+            self.evicted += 1
+        while self.bytes > self.max_bytes and self.channels:
+            oldest_channel_id, oldest = next(iter(self.channels.items()))
+            self._discard(oldest, next(iter(oldest)))
+            self.evicted += 1
+            if not oldest:
+                del self.channels[oldest_channel_id]
+
+    def get(self, channel_id, message_id):
+        return _decoded(self.channels.get(channel_id, {}).get(message_id))
+
+    def update(self, channel_id, message_id, content):
+        """Replaces the cached content of an edited message. Returns the previous record (or None)."""
+        messages = self.channels.get(channel_id)
+        record = messages.get(message_id) if messages else None
+        if record is not None:
+            new_record = record[:3] + (content.encode('utf-8'),) + record[4:]
+            messages[message_id] = new_record
+            self.bytes += _record_size(new_record) - _record_size(record)
+        return _decoded(record)
+
+    def pop(self, channel_id, message_id):
+        """Removes a deleted message and returns its record (None if it was not cached)."""
+        messages = self.channels.get(channel_id)
+        if not messages:
+            return None
+        record = messages.get(message_id)
+        self._discard(messages, message_id)
+        if not messages:
+            del self.channels[channel_id]
+        return _decoded(record)
+
+    def forget_channel(self, channel_id):
+        for message_id in list(self.channels.get(channel_id, ())):
+            self.pop(channel_id, message_id)
+
+    def stats(self):
+        return {'messages': self.count, 'channels': len(self.channels), 'bytes': self.bytes, 'evicted': self.evicted}
+
+    def _discard(self, messages, message_id):
+        record = messages.pop(message_id, None)
+        if record is not None:
+            self.bytes -= _record_size(record)
+            self.count -= 1
+
+
+def _decoded(record):
+    return record and record[:3] + (record[3].decode('utf-8'),) + record[4:]
+
+
+def _record_size(record):
+    return RECORD_OVERHEAD + sys.getsizeof(record[1]) + sys.getsizeof(record[3]) + sum(len(name) for name in record[4])
@@ -0,0 +1,326 @@
+# utils/outbox.py
+import asyncio
+import collections
+import io
+import logging
+import math
+import os
+import random
+import sqlite3
+import threading
+import time
+
+import aiohttp
+import discord
+
+from utils import runtime, sharding
+
+log = logging.getLogger(__name__)
+
+# --- OUTBOX ---
+# Los envíos que Discord rechaza de forma transitoria (rate limit, 5xx, red) se guardan en un diario
+# en disco y se reintentan en segundo plano con backoff, así un log o un transcript no se pierde
+# aunque el canal del ticket se borre justo después. Cada proceso worker tiene su propio fichero.
+OUTBOX_DB_FILE = os.getenv('HOMEDOCK_OUTBOX_DB', 'data/outbox.db')
+OUTBOX_MAX_ENTRIES = int(os.getenv('HOMEDOCK_OUTBOX_MAX_ENTRIES', '1000'))
+OUTBOX_MAX_BYTES = int(os.getenv('HOMEDOCK_OUTBOX_MAX_BYTES', str(256 * 1024 * 1024))) # Content + attached files kept in the journal
+OUTBOX_BACKOFF_BASE = 5 # Seconds before the first retry; doubles on every failure
+OUTBOX_BACKOFF_MAX = 900
+OUTBOX_MAX_ATTEMPTS = 50 # ~12 hours at the maximum backoff; then the entry is dropped
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,                -- 'channel' or 'user' (DM)
+    target_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    next_attempt_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    last_error TEXT,
+    content TEXT,
+    embed TEXT,                        -- embed.to_dict() as JSON
+    file_name TEXT,
+    file_data BLOB,
+    file_path TEXT,                    -- Files sent from disk (e.g. attachment zips) are re-opened on replay
+    size INTEGER NOT NULL,
+    tag TEXT                           -- "<hook>:<value>": delivery hook called with the sent message (see on_delivered)
+);
+CREATE INDEX IF NOT EXISTS outbox_target ON outbox (kind, target_id);
+"""
+
+_COLUMNS = "id, kind, target_id, created_at, attempts, last_error, content, embed, file_name, file_data, file_path, size, tag"
+
+
+class DeliveryOutbox:
+    """
+    Append-only journal (SQLite in WAL mode) of Discord messages waiting to be delivered.
+
+    Entries of one destination are replayed in order and share its backoff, so a message never
+    overtakes an older one for the same channel or user. The journal is bounded by entries and
+    bytes: when full, the oldest entries are evicted (and counted in `evicted`). An entry can carry
+    a tag so its sender learns the ID of the message once it is finally delivered.
+    """
+
+    def __init__(self, path, max_entries=OUTBOX_MAX_ENTRIES, max_bytes=OUTBOX_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.evicted = 0 # Entries dropped because the journal was full
+        self.failed = 0 # Entries dropped after a permanent error or too many attempts
+        self._delivery_hooks = {} # tag prefix -> async callback(value, message)
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            if 'tag' not in {row[1] for row in self._conn.execute("PRAGMA table_info(outbox)")}:
+                self._conn.execute("ALTER TABLE outbox ADD COLUMN tag TEXT") # Journals created before tags existed
+            self._conn.commit()
+            rows = self._conn.execute("SELECT kind, target_id, COUNT(*), SUM(size) FROM outbox GROUP BY kind, target_id").fetchall()
+        # In-memory depth, so has_pending() and depth() never touch the disk
+        self._pending = collections.Counter({(kind, target_id): count for kind, target_id, count, _ in rows})
+        self.entries = sum(row[2] for row in rows)
+        self.bytes = sum(row[3] for row in rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def has_pending(self, kind, target_id):
+        return self._pending[(kind, target_id)] > 0
+
+    def depth(self):
+        """Queue depth, for logs and the outbox status command."""
+        with self._lock:
+            oldest = self._conn.execute("SELECT MIN(created_at) FROM outbox").fetchone()[0]
+        return {
+            'entries': self.entries,
+            'bytes': self.bytes,
+            'destinations': sum(1 for count in self._pending.values() if count > 0),
+            'oldest_age': time.time() - oldest if oldest else 0,
+            'evicted': self.evicted,
+            'failed': self.failed
+        }
+
+    def on_delivered(self, hook, callback):
+        """Registers `callback(value, message)` for delivered entries tagged "<hook>:<value>" (None unregisters it)."""
+        if callback is None:
+            self._delivery_hooks.pop(hook, None)
+        else:
+            self._delivery_hooks[hook] = callback
+
+    async def delivered(self, entry, message):
+        """Runs the delivery hook of a replayed entry, if it has a tag and its hook is registered."""
+        if not entry.get('tag'):
+            return
+        hook, _, value = entry['tag'].partition(':')
+        callback = self._delivery_hooks.get(hook)
+        if callback is None:
+            log.warning(f"No delivery hook '{hook}' registered for outbox entry {entry['id']}.", extra={'tag': entry['tag']})
+            return
+        try:
+            await callback(value, message)
+        except Exception as e:
+            log.error(f"Error in outbox delivery hook '{hook}': {e}", extra={'tag': entry['tag']})
+
+    def append(self, kind, target_id, content=None, embed=None, file_name=None, file_data=None, file_path=None, error=None, tag=None):
+        """Journals a message. It waits behind the destination's pending entries and their backoff."""
+        encoded_embed = runtime.codec.canonical_bytes(embed).decode('utf-8') if embed else None
+        size = len((content or '').encode('utf-8')) + len(encoded_embed or '') + len(file_data or b'')
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                while self.entries and (self.entries >= self.max_entries or self.bytes + size > self.max_bytes):
+                    self._evict_oldest()
+                next_attempt_at = self._conn.execute(
+                    "SELECT MAX(next_attempt_at) FROM outbox WHERE kind = ? AND target_id = ?", (kind, target_id)
+                ).fetchone()[0] or now + OUTBOX_BACKOFF_BASE
+                cursor = self._conn.execute(
+                    "INSERT INTO outbox (kind, target_id, created_at, next_attempt_at, last_error, content, embed, file_name, file_data, file_path, size, tag) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (kind, target_id, now, next_attempt_at, error, content, encoded_embed, file_name, file_data, file_path, size, tag)
+                )
+            self._pending[(kind, target_id)] += 1
+            self.entries += 1
+            self.bytes += size
+        return cursor.lastrowid
+
+    def _evict_oldest(self):
+        entry_id, kind, target_id, size = self._conn.execute("SELECT id, kind, target_id, size FROM outbox ORDER BY id LIMIT 1").fetchone()
+        self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry_id,))
+        self._forget(kind, target_id, size)
+        self.evicted += 1
+        log.warning("Outbox full: oldest pending delivery evicted.", extra={'kind': kind, 'target_id': target_id, 'outbox_entries': self.entries})
+
+    def _forget(self, kind, target_id, size):
+        self._pending[(kind, target_id)] -= 1
+        if self._pending[(kind, target_id)] <= 0:
+            del self._pending[(kind, target_id)]
+        self.entries -= 1
+        self.bytes -= size
+
+    def due(self, now=None, limit=20):
+        """Entries whose destination's backoff has expired, oldest first, as dicts."""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM outbox WHERE next_attempt_at <= ? ORDER BY id LIMIT ?", (now or time.time(), limit)
+            ).fetchall()
+        entries = [dict(zip(_COLUMNS.split(", "), row)) for row in rows]
+        for entry in entries:
+            entry['embed'] = runtime.codec.loads(entry['embed']) if entry['embed'] else None
+        return entries
+
+    def retry_later(self, entry, delay, error):
+        """Counts a failed attempt and postpones every pending entry of the same destination."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("UPDATE outbox SET attempts = attempts + 1, last_error = ? WHERE id = ?", (error, entry['id']))
+                self._conn.execute(
+                    "UPDATE outbox SET next_attempt_at = ? WHERE kind = ? AND target_id = ?",
+                    (time.time() + delay, entry['kind'], entry['target_id'])
+                )
+
+    def remove(self, entry):
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute("DELETE FROM outbox WHERE id = ?", (entry['id'],)).rowcount
+            if deleted:
+                self._forget(entry['kind'], entry['target_id'], entry['size'])
+
+
+_outbox = None
+
+
+def get_outbox():
+    """This process's outbox (worker processes use data/outbox-workerN.db)."""
+    global _outbox
+    if _outbox is None:
+        path = OUTBOX_DB_FILE
+        if sharding.is_worker():
+            base, ext = os.path.splitext(path)
+            path = f"{base}-worker{sharding.WORKER_INDEX}{ext}"
+        _outbox = DeliveryOutbox(path)
+    return _outbox
+
+
+def is_transient(error):
+    """Rate limits, Discord 5xx and network errors are retried; anything else (403, 404, too large...) is not."""
+    if isinstance(error, discord.HTTPException):
+        return error.status == 429 or error.status >= 500
+    return isinstance(error, (aiohttp.ClientError, asyncio.TimeoutError, ConnectionError))
+
+
+def backoff_delay(attempts, retry_after=None):
+    """Exponential backoff with jitter, never shorter than Discord's retry_after."""
+    delay = min(OUTBOX_BACKOFF_MAX, OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0))
+    return max(delay * random.uniform(0.5, 1.0), retry_after or 0)
+
+
+def destination_kind(destination):
+    return 'user' if isinstance(destination, (discord.User, discord.Member)) else 'channel'
+
+
+def _send_kwargs(embed=None, file=None):
+    kwargs = {}
+    if embed is not None:
+        kwargs['embed'] = embed
+    if file is not None:
+        kwargs['file'] = file
+    return kwargs
+
+
+def _journal_payload(content, embed, file):
+    payload = {'content': content, 'embed': embed.to_dict() if embed else None}
+    if file is not None:
+        payload['file_name'] = file.filename
+        path = getattr(file.fp, 'name', None)
+        if isinstance(path, str) and os.path.isfile(path):
+            payload['file_path'] = path
+        else:
+            file.fp.seek(0)
+            data = file.fp.read()
+            payload['file_data'] = data.encode('utf-8') if isinstance(data, str) else data
+    return payload
+
+
+async def send_durably(outbox, destination, content=None, *, embed=None, file=None, tag=None):
+    """
+    Sends a message, or journals it in `outbox` when Discord fails transiently or older messages
+    for the same destination are still pending. Returns the Message, or None if it was journaled
+    (then the hook named in `tag`, "<hook>:<value>", gets the message once it is delivered).
+    Permanent errors (Forbidden, NotFound, file too large...) are raised as before.
+    """
+    kind = destination_kind(destination)
+    if outbox is None:
+        return await destination.send(content, **_send_kwargs(embed, file))
+    if outbox.has_pending(kind, destination.id):
+        error = "queued behind pending deliveries"
+    else:
+        try:
+            return await destination.send(content, **_send_kwargs(embed, file))
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            error = str(e) or type(e).__name__
+    await asyncio.to_thread(outbox.append, kind, destination.id, error=error, tag=tag, **_journal_payload(content, embed, file))
+    log.warning(f"Delivery to {kind} {destination.id} deferred to the outbox: {error}",
+                extra={'kind': kind, 'target_id': destination.id, 'outbox_entries': outbox.entries})
+    return None
+
+
+async def replay_outbox(outbox, resolve, batch_size=20, ignore_backoff=False):
+    """
+    Retries the due entries in order. `resolve(kind, target_id)` returns the channel or user to send
+    to. A transient failure postpones the destination; a permanent one drops the entry. Returns how many were sent.
+    `ignore_backoff` tries every destination once (used when draining on shutdown).
+    """
+    sent = 0
+    blocked = set()
+    for entry in await asyncio.to_thread(outbox.due, math.inf if ignore_backoff else time.time(), batch_size):
+        key = (entry['kind'], entry['target_id'])
+        if key in blocked:
+            continue
+        try:
+            destination = await resolve(*key)
+            file = None
+            if entry['file_path']:
+                file = discord.File(entry['file_path'], filename=entry['file_name'])
+            elif entry['file_data'] is not None:
+                file = discord.File(io.BytesIO(entry['file_data']), filename=entry['file_name'])
+            embed = discord.Embed.from_dict(entry['embed']) if entry['embed'] else None
+            message = await destination.send(entry['content'], **_send_kwargs(embed, file))
+        except Exception as e:
+            attempts = entry['attempts'] + 1
+            if is_transient(e) and attempts < OUTBOX_MAX_ATTEMPTS:
+                delay = backoff_delay(attempts, getattr(e, 'retry_after', None))
+                await asyncio.to_thread(outbox.retry_later, entry, delay, str(e) or type(e).__name__)
+                blocked.add(key)
+                log.info(f"Outbox delivery to {entry['kind']} {entry['target_id']} failed ({e}). Retrying in {delay:.0f}s.",
+                         extra={'outbox_id': entry['id'], 'attempts': attempts})
+            else:
+                await asyncio.to_thread(outbox.remove, entry)
+                outbox.failed += 1
+                log.error(f"Outbox delivery to {entry['kind']} {entry['target_id']} dropped after {attempts} attempts: {e}",
+                          extra={'outbox_id': entry['id'], 'age': round(time.time() - entry['created_at'])})
+            continue
+        await asyncio.to_thread(outbox.remove, entry)
+        await outbox.delivered(entry, message)
+        sent += 1
+    return sent
+
+
+class DurableChannel:
+    """Wraps a log channel so its `send` goes through the outbox; everything else is the channel's own."""
+
+    def __init__(self, channel, outbox):
+        self.channel = channel
+        self.outbox = outbox
+
+    def __getattr__(self, name):
+        return getattr(self.channel, name)
+
+    async def send(self, content=None, *, embed=None, file=None, **kwargs):
+        if kwargs: # delete_after, views...: not something to replay later
+            return await self.channel.send(content, **_send_kwargs(embed, file), **kwargs)
+        return await send_durably(self.outbox, self.channel, content, embed=embed, file=file)
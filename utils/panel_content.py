@@ -0,0 +1,265 @@
+# utils/panel_content.py
+import asyncio
+import datetime
+import json
+import logging
+import os
+
+import discord
+from discord.ext import commands, tasks
+
+from utils import sharding
+from utils.guild_config import PRIMARY_GUILD_ID, guild_config
+from utils.panel_healing import PanelHealer
+from utils.runtime import content_hash, load_json_file
+from utils.state_store import load_document, save_document, state_lock
+
+log = logging.getLogger(__name__)
+
+# --- CONTENIDO DE LOS PANELES ---
+# El texto de los paneles (reglas, recursos, info de tickets) vive en config/panels/*.json, no en el código.
+# Los cogs comprueban el fichero cada PANEL_WATCH_INTERVAL segundos y, si cambió, reeditan el panel
+# (solo si su hash cambió). Los valores admiten el markdown de Discord; "\u200b" es un espacio de ancho cero.
+PANEL_CONTENT_DIR = 'config/panels'
+PANEL_WATCH_INTERVAL = 5
+
+# Discord embed limits, checked before publishing so a typo never reaches the API half-applied
+EMBED_MAX_FIELDS = 25
+EMBED_MAX_TITLE = 256
+EMBED_MAX_DESCRIPTION = 4096
+EMBED_MAX_FIELD_NAME = 256
+EMBED_MAX_FIELD_VALUE = 1024
+EMBED_MAX_TOTAL = 6000
+
+
+def validate_embed_data(data):
+    """Raises ValueError if `data` is not {title, description, color, fields: [{name, value, inline}]} within Discord's limits."""
+    if not isinstance(data, dict):
+        raise ValueError("the file must contain a JSON object")
+    for key, limit in (('title', EMBED_MAX_TITLE), ('description', EMBED_MAX_DESCRIPTION)):
+        if not isinstance(data.get(key), str) or len(data[key]) > limit:
+            raise ValueError(f"'{key}' must be a string of at most {limit} characters")
+    if not isinstance(data.get('color'), int):
+        raise ValueError("'color' must be an integer (e.g. 65280 for 0x00FF00)")
+    fields = data.get('fields', [])
+    if not isinstance(fields, list) or len(fields) > EMBED_MAX_FIELDS:
+        raise ValueError(f"'fields' must be a list of at most {EMBED_MAX_FIELDS} fields")
+    total = len(data['title']) + len(data['description'])
+    for index, field in enumerate(fields, start=1):
+        if not isinstance(field, dict) or not isinstance(field.get('name'), str) or not isinstance(field.get('value'), str):
+            raise ValueError(f"field {index} needs a 'name' and a 'value' string")
+        if len(field['name']) > EMBED_MAX_FIELD_NAME or len(field['value']) > EMBED_MAX_FIELD_VALUE:
+            raise ValueError(f"field {index} exceeds {EMBED_MAX_FIELD_NAME} characters (name) or {EMBED_MAX_FIELD_VALUE} (value)")
+        field.setdefault('inline', False)
+        total += len(field['name']) + len(field['value'])
+    if total > EMBED_MAX_TOTAL:
+        raise ValueError(f"the embed has {total} characters (Discord allows {EMBED_MAX_TOTAL})")
+
+
+class PanelContent:
+    """
+    Embed content of one panel, read from a JSON file in PANEL_CONTENT_DIR.
+
+    `reload` only re-reads the file when its mtime or size changed (one stat per check). An
+    invalid edit is logged and the previous content stays in `data`, so the panel is not touched.
+    """
+
+    def __init__(self, name):
+        self.path = os.path.join(PANEL_CONTENT_DIR, f"{name}.json")
+        self.data = None
+        self._signature = None
+        self.reload()
+
+    def reload(self):
+        """Re-reads the file if it changed on disk. Returns True if the content is different."""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            if self._signature != 'missing':
+                log.error(f"Panel content file {self.path} not found. The panel will not be published until it exists.")
+                self._signature = 'missing'
+            return False
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        try:
+            data = load_json_file(self.path)
+            validate_embed_data(data)
+        except ValueError as e: # Includes JSON syntax errors
+            log.error(f"Invalid panel content in {self.path}: {e}. Keeping the previous version.")
+            return False
+        changed = data != self.data
+        self.data = data
+        return changed
+
+
+class PanelCog(commands.Cog):
+    """
+    Base of the cogs that keep one embed panel per server (rules, resources, ticket info).
+
+    A subclass only sets `panel_key` (content file config/panels/<key>.json and guild_config
+    section holding its `channel_id`), `panel_label` and `config_file`. The saved state is
+    {guild_id: {'<key>_message_id', 'last_<key>_hash'}}; the panel is edited only when the hash
+    changes, republished when its file changes and re-created when its message is deleted.
+    """
+
+    panel_key = None
+    panel_label = None
+    config_file = None
+    announce_updates = True # Tell the server's log channel when the panel is sent or edited
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.message_key = f"{self.panel_key}_message_id"
+        self.hash_key = f"last_{self.panel_key}_hash"
+        self.panels = {} # guild_id -> {message_key, hash_key}
+        self._load_config()
+        self.content = PanelContent(self.panel_key) # Texto del panel, recargado en caliente al cambiar el fichero
+        self.healer = PanelHealer(self._heal_panel, self.panel_label) # Vuelve a publicar el panel si alguien borra su mensaje
+
+    def _load_config(self):
+        """Loads the panel message IDs and last hashes from the config file."""
+        try:
+            config = load_document(self.config_file)
+            if self.message_key in config or self.hash_key in config:
+                config = {str(PRIMARY_GUILD_ID): config} # Formato antiguo de un solo servidor
+            self.panels = {int(guild_id): panel for guild_id, panel in config.items()}
+            log.info(f"{self.panel_label} config loaded: { {guild_id: panel.get(self.message_key) for guild_id, panel in self.panels.items()} }")
+        except FileNotFoundError:
+            log.info(f"{self.config_file} not found. Will create a new one.")
+        except json.JSONDecodeError:
+            log.error(f"Error decoding {self.config_file}. Starting with empty config.")
+        except Exception as e:
+            log.error(f"Unexpected error loading {self.panel_label} config: {e}")
+
+    def _save_config(self):
+        """Saves the panel message IDs and hashes to the config file."""
+        try:
+            save_document(self.config_file, {str(guild_id): panel for guild_id, panel in self.panels.items()})
+            log.info(f"{self.panel_label} config saved: { {guild_id: panel.get(self.message_key) for guild_id, panel in self.panels.items()} }")
+        except Exception as e:
+            log.error(f"Error saving {self.panel_label} config: {e}")
+
+    def _build_embed(self, data):
+        embed = discord.Embed(title=data["title"], description=data["description"], color=data["color"])
+        for field in data["fields"]:
+            embed.add_field(name=field["name"], value=field["value"], inline=field["inline"])
+        embed.set_footer(text=f"Last updated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        return embed
+
+    async def _find_panel_message(self, channel):
+        """Fallback when the saved message ID is missing or stale. Returns the panel message, or None to send a new one."""
+        return None
+
+    async def _announce(self, channel, text):
+        if not self.announce_updates:
+            return
+        logging_cog = self.bot.get_cog("LoggingCog")
+        log_channel = logging_cog.get_log_channel(channel.guild.id) if logging_cog else None
+        if log_channel:
+            await log_channel.send(f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {text} in channel **{channel.name}**.")
+
+    async def _send_or_update_panel(self, channel):
+        """Sends a new panel message, or edits the existing one if its content hash changed."""
+        panel = self.panels.setdefault(channel.guild.id, {self.message_key: None, self.hash_key: None})
+        data = self.content.data
+        if data is None:
+            return # Sin contenido válido (ver el error al cargar el fichero del panel)
+        current_hash = content_hash(data)
+
+        message = None
+        if panel[self.message_key]:
+            try:
+                message = await channel.fetch_message(panel[self.message_key])
+                log.debug(f"Found existing {self.panel_label} message with ID: {panel[self.message_key]}")
+            except discord.NotFound:
+                log.info(f"Existing {self.panel_label} message with ID {panel[self.message_key]} not found. Will create new.")
+                panel[self.message_key] = None
+            except discord.Forbidden:
+                log.error(f"No permissions to fetch existing {self.panel_label} message {panel[self.message_key]}.")
+                return
+            except Exception as e:
+                log.error(f"Unexpected error fetching {self.panel_label} message: {e}")
+                return
+        if not message:
+            message = await self._find_panel_message(channel)
+            if message:
+                panel[self.message_key] = message.id
+
+        if message and current_hash == panel[self.hash_key]:
+            log.debug(f"{self.panel_label} content has not changed. No update needed for existing message.")
+            return
+
+        try:
+            if message:
+                await message.edit(embed=self._build_embed(data))
+                log.info(f"{self.panel_label} message updated (ID: {panel[self.message_key]}).")
+                await self._announce(channel, f"{self.panel_label} message updated")
+            else:
+                message = await channel.send(embed=self._build_embed(data))
+                panel[self.message_key] = message.id
+                log.info(f"New {self.panel_label} message sent (ID: {panel[self.message_key]}).")
+                await self._announce(channel, f"New {self.panel_label} message created")
+            panel[self.hash_key] = current_hash
+            self._save_config()
+        except discord.Forbidden:
+            log.error(f"No permissions to send/edit messages in channel {channel.name}. Check 'Send Messages' and 'Embed Links' permissions.")
+        except Exception as e:
+            log.error(f"Error sending/updating {self.panel_label} message: {e}")
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        log.info(f'Cog "{self.qualified_name}" for {self.panel_label} loaded and ready.')
+        await self._publish_panels()
+
+    async def _publish_panels(self):
+        """Sends or updates the panel in every server this process owns (only edited where the hash changed)."""
+        for guild_id in guild_config.guild_ids(self.panel_key):
+            if not sharding.owns_guild(guild_id):
+                continue # Lo publica el worker que tiene el shard de ese servidor
+            channel_id = guild_config.section(guild_id, self.panel_key).get('channel_id')
+            channel = self.bot.get_channel(channel_id) if channel_id else None
+            if not channel:
+                log.warning(f"{self.panel_label} channel with ID {channel_id} not found or not accessible. Verify ID and permissions.")
+                continue
+            await self._publish_panel(channel)
+
+    async def _publish_panel(self, channel):
+        # Re-read the saved message ID under the panel lock (reconnects / other worker processes)
+        async with state_lock(self.config_file, channel.id):
+            self._load_config()
+            await self._send_or_update_panel(channel)
+        self.healer.track(channel.id, self.panels.get(channel.guild.id, {}).get(self.message_key))
+
+    async def _heal_panel(self, channel_id):
+        """Re-creates the panel of `channel_id` after its message was deleted (persisting the new ID)."""
+        channel = self.bot.get_channel(channel_id)
+        if channel:
+            await self._publish_panel(channel)
+
+    @commands.Cog.listener()
+    async def on_raw_message_delete(self, payload):
+        self.healer.deleted((payload.message_id,))
+
+    @commands.Cog.listener()
+    async def on_raw_bulk_message_delete(self, payload):
+        self.healer.deleted(payload.message_ids)
+
+    async def cog_load(self):
+        self.watch_content.start()
+
+    async def cog_unload(self):
+        self.watch_content.cancel()
+        self.healer.stop()
+
+    @tasks.loop(seconds=PANEL_WATCH_INTERVAL)
+    async def watch_content(self):
+        """Republishes the panel when its content file changes, without a restart."""
+        if await asyncio.to_thread(self.content.reload):
+            log.info(f"{self.panel_label} content changed in {self.content.path}. Republishing.")
+            await self._publish_panels()
+
+    @watch_content.before_loop
+    async def before_watch_content(self):
+        await self.bot.wait_until_ready()
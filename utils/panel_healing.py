@@ -0,0 +1,90 @@
+# utils/panel_healing.py
+import asyncio
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+# --- REPARACIÓN DE PANELES BORRADOS ---
+# Cuando alguien borra un mensaje gestionado (panel de reglas, recursos, info de tickets, soporte o
+# roles), se vuelve a publicar tras PANEL_HEAL_DELAY segundos. Si el mismo panel se borra otra vez
+# dentro de PANEL_HEAL_WINDOW, la espera se duplica (hasta PANEL_HEAL_MAX_DELAY), y entre dos
+# publicaciones de un mismo cog pasan al menos PANEL_HEAL_SPACING segundos.
+PANEL_HEAL_DELAY = 5
+PANEL_HEAL_MAX_DELAY = 3600
+PANEL_HEAL_WINDOW = 3600
+PANEL_HEAL_SPACING = 2
+
+
+class PanelHealer:
+    """
+    Index of the managed messages of a cog (message ID -> channel ID) that re-creates a panel
+    when its message is deleted.
+
+    `deleted` is called from the raw delete events and costs one dict lookup per message ID.
+    Deletions of the same panel are coalesced into one re-creation, which `recreate(channel_id)`
+    performs (it is expected to send the panel again and persist the new message ID).
+    """
+
+    def __init__(self, recreate, name):
+        self.recreate = recreate
+        self.name = name
+        self.messages = {} # message ID -> channel ID
+        self.channels = {} # channel ID -> message ID
+        self._scheduled = {} # channel ID -> task waiting to re-create its panel
+        self._streaks = {} # channel ID -> (consecutive re-creations, time of the last one)
+        self._lock = asyncio.Lock()
+        self._last_heal = 0.0
+
+    def track(self, channel_id, message_id):
+        """Records the current panel message of a channel (replacing the previous one)."""
+        old_message_id = self.channels.pop(channel_id, None)
+        if old_message_id is not None:
+            self.messages.pop(old_message_id, None)
+        if message_id:
+            self.messages[message_id] = channel_id
+            self.channels[channel_id] = message_id
+
+    def deleted(self, message_ids):
+        """Schedules the re-creation of the panels whose message is in `message_ids`."""
+        for message_id in message_ids:
+            channel_id = self.messages.pop(message_id, None)
+            if channel_id is None:
+                continue
+            self.channels.pop(channel_id, None)
+            if channel_id in self._scheduled:
+                continue
+            delay = self._next_delay(channel_id)
+            log.warning(f"{self.name} panel message {message_id} was deleted. Re-creating it in {delay}s.",
+                        extra={'channel_id': channel_id, 'message_id': message_id})
+            self._scheduled[channel_id] = asyncio.create_task(self._heal_later(channel_id, delay))
+
+    def stop(self):
+        for task in self._scheduled.values():
+            task.cancel()
+        self._scheduled.clear()
+
+    def _next_delay(self, channel_id):
+        count, last = self._streaks.get(channel_id, (0, 0.0))
+        if time.monotonic() - last > PANEL_HEAL_WINDOW:
+            count = 0
+        return min(PANEL_HEAL_DELAY * 2 ** count, PANEL_HEAL_MAX_DELAY)
+
+    async def _heal_later(self, channel_id, delay):
+        try:
+            await asyncio.sleep(delay)
+            async with self._lock: # One re-creation at a time per cog, spaced out
+                wait = self._last_heal + PANEL_HEAL_SPACING - time.monotonic()
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                count, last = self._streaks.get(channel_id, (0, 0.0))
+                if time.monotonic() - last > PANEL_HEAL_WINDOW:
+                    count = 0
+                self._streaks[channel_id] = (count + 1, time.monotonic())
+                try:
+                    await self.recreate(channel_id)
+                except Exception as e:
+                    log.error(f"Error re-creating the {self.name} panel of channel {channel_id}: {e}", extra={'channel_id': channel_id})
+                self._last_heal = time.monotonic()
+        finally:
+            self._scheduled.pop(channel_id, None)
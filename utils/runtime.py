@@ -0,0 +1,109 @@
+# utils/runtime.py
+import os
+import json
+import asyncio
+import hashlib
+
+# --- FAST RUNTIME MODE ---
+# Opt-in: HOMEDOCK_FAST_RUNTIME=1 en el .env activa uvloop (event loop) y orjson (codec JSON)
+# si están instalados. Si no lo están, se usa asyncio y json de la librería estándar.
+FAST_RUNTIME = os.getenv('HOMEDOCK_FAST_RUNTIME', '0').lower() in ('1', 'true', 'yes', 'on')
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+class StdlibCodec:
+    """JSON codec based on the standard library `json` module."""
+    name = "json"
+
+    def loads(self, data):
+        return json.loads(data)
+
+    def dumps_pretty(self, obj):
+        # Same layout as orjson's OPT_INDENT_2, so switching the codec does not rewrite every file
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+
+    def canonical_bytes(self, obj):
+        # Same bytes as orjson with OPT_SORT_KEYS, so content hashes do not depend on the codec.
+        return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class OrjsonCodec:
+    """JSON codec based on `orjson` (returns/accepts bytes internally)."""
+    name = "orjson"
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+    def dumps_pretty(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+    def canonical_bytes(self, obj):
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+
+
+def select_codec(fast=FAST_RUNTIME):
+    """Returns the codec for the requested mode, falling back to stdlib json if orjson is missing."""
+    if fast and orjson is not None:
+        return OrjsonCodec()
+    return StdlibCodec()
+
+
+codec = select_codec()
+
+
+def load_json_file(path):
+    """Reads and decodes a JSON file. Raises FileNotFoundError / json.JSONDecodeError like json.load."""
+    with open(path, 'rb') as f:
+        return codec.loads(f.read())
+
+
+def save_json_file(path, data):
+    """Encodes `data` and writes it to `path`, creating the parent directory if needed."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(codec.dumps_pretty(data))
+
+
+def content_hash(data):
+    """SHA-256 of the canonical JSON form of `data`, used by the panel cogs to detect changes."""
+    return hashlib.sha256(codec.canonical_bytes(data)).hexdigest()
+
+
+def get_loop_factory(fast=FAST_RUNTIME):
+    """Returns uvloop's loop factory in fast mode (if installed), otherwise None (default asyncio loop)."""
+    if fast and uvloop is not None:
+        return uvloop.new_event_loop
+    return None
+
+
+def run(main, fast=FAST_RUNTIME):
+    """Runs the `main` coroutine like asyncio.run, on uvloop when fast mode is active and available."""
+    loop_factory = get_loop_factory(fast)
+    if loop_factory is None:
+        return asyncio.run(main)
+    with asyncio.Runner(loop_factory=loop_factory) as runner:
+        return runner.run(main)
+
+
+def describe(fast=FAST_RUNTIME):
+    """Short human-readable description of the active runtime, for the startup log."""
+    loop_name = "uvloop" if get_loop_factory(fast) else "asyncio"
+    mode = "fast" if fast else "default"
+    missing = []
+    if fast and uvloop is None:
+        missing.append("uvloop")
+    if fast and orjson is None:
+        missing.append("orjson")
+    text = f"runtime={mode} loop={loop_name} json={select_codec(fast).name}"
+    if missing:
+        text += f" (no instalados: {', '.join(missing)}; usando fallback)"
+    return text
@@ -0,0 +1,129 @@
+# utils/sharding.py
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+
+from discord.ext import commands
+
+log = logging.getLogger(__name__)
+
+# --- SHARDING ---
+# HOMEDOCK_SHARD_COUNT > 1 reparte la conexión al gateway en varios shards.
+# HOMEDOCK_SHARD_PROCESSES > 1 reparte esos shards entre procesos worker en el mismo host
+# (el proceso principal solo los lanza y vigila). Los workers comparten estado a través de
+# utils.state_store. Sin estas variables el bot funciona como siempre: un proceso, sin shards.
+SHARD_COUNT = int(os.getenv('HOMEDOCK_SHARD_COUNT', '1'))
+SHARD_PROCESSES = max(1, min(int(os.getenv('HOMEDOCK_SHARD_PROCESSES', '1')), SHARD_COUNT))
+WORKER_RESTART_DELAY = 5 # Seconds before restarting a worker that exited; doubles on every crash in a row
+WORKER_RESTART_MAX_DELAY = 300
+WORKER_STABLE_SECONDS = 600 # A worker that ran this long before exiting restarts with the base delay again
+
+# Set by the supervisor in the environment of each worker process
+WORKER_SHARD_IDS = [int(s) for s in os.getenv('HOMEDOCK_WORKER_SHARD_IDS', '').split(',') if s.strip()]
+WORKER_INDEX = int(os.getenv('HOMEDOCK_WORKER_INDEX', '0'))
+
+
+def is_supervisor():
+    """True in the parent process of a multi-process deployment (it runs no bot itself)."""
+    return SHARD_PROCESSES > 1 and not WORKER_SHARD_IDS
+
+
+def is_worker():
+    return bool(WORKER_SHARD_IDS)
+
+
+def shard_for_guild(guild_id, shard_count=SHARD_COUNT):
+    """Shard that receives the events of a guild (Discord's formula)."""
+    return (guild_id >> 22) % shard_count
+
+
+def owns_guild(guild_id):
+    """True if this process handles the guild's shard (always True without worker processes)."""
+    return not is_worker() or shard_for_guild(guild_id) in WORKER_SHARD_IDS
+
+
+def plan_workers(shard_count=SHARD_COUNT, processes=SHARD_PROCESSES):
+    """Splits shard IDs into `processes` contiguous groups, e.g. 5 shards / 2 processes -> [[0, 1, 2], [3, 4]]."""
+    base, extra = divmod(shard_count, processes)
+    groups, start = [], 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        groups.append(list(range(start, start + size)))
+        start += size
+    return groups
+
+
+def create_bot(**kwargs):
+    """commands.Bot for a single shard, AutoShardedBot for several (only this worker's shards in multi-process mode)."""
+    if is_worker():
+        return commands.AutoShardedBot(shard_ids=WORKER_SHARD_IDS, shard_count=SHARD_COUNT, **kwargs)
+    if SHARD_COUNT > 1:
+        return commands.AutoShardedBot(shard_count=SHARD_COUNT, **kwargs)
+    return commands.Bot(**kwargs)
+
+
+def describe():
+    if is_worker():
+        return f"worker {WORKER_INDEX} shards={WORKER_SHARD_IDS} of {SHARD_COUNT}"
+    if SHARD_COUNT > 1:
+        return f"single process, {SHARD_COUNT} shards"
+    return "single process, no sharding"
+
+
+def _start_worker(script, index, shard_ids):
+    env = dict(os.environ, HOMEDOCK_WORKER_SHARD_IDS=",".join(map(str, shard_ids)), HOMEDOCK_WORKER_INDEX=str(index))
+    log.info(f"Starting worker {index} for shards {shard_ids}.")
+    return subprocess.Popen([sys.executable, script], env=env)
+
+
+def restart_delay(crashes):
+    """Seconds before restarting a worker that exited `crashes` times in a row (exponential, capped)."""
+    return min(WORKER_RESTART_DELAY * 2 ** max(crashes - 1, 0), WORKER_RESTART_MAX_DELAY)
+
+
+def run_supervisor(script):
+    """Starts one worker process per shard group and restarts the ones that exit (with backoff), until interrupted."""
+    groups = plan_workers()
+    workers = {index: _start_worker(script, index, shard_ids) for index, shard_ids in enumerate(groups)}
+    started_at = dict.fromkeys(workers, time.monotonic())
+    crashes = dict.fromkeys(workers, 0)
+    restart_at = {} # index -> monotonic time of the pending restart of an exited worker
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        while not stopping:
+            time.sleep(1)
+            now = time.monotonic()
+            for index, process in list(workers.items()):
+                if index in restart_at:
+                    if now >= restart_at[index]:
+                        del restart_at[index]
+                        workers[index] = _start_worker(script, index, groups[index])
+                        started_at[index] = now
+                elif process.poll() is not None:
+                    # The other workers keep being watched while this one waits for its restart
+                    crashes[index] = 1 if now - started_at[index] >= WORKER_STABLE_SECONDS else crashes[index] + 1
+                    delay = restart_delay(crashes[index])
+                    restart_at[index] = now + delay
+                    log.info(f"Worker {index} exited with code {process.returncode}. Restarting in {delay}s.",
+                             extra={'worker': index, 'crashes': crashes[index]})
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for process in workers.values():
+            if process.poll() is None:
+                process.terminate()
+        for process in workers.values():
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        log.info("All workers stopped.")
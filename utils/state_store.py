@@ -0,0 +1,219 @@
+# utils/state_store.py
+import asyncio
+import contextlib
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError: # Windows: sin bloqueo entre procesos (el modo multi-proceso requiere Linux/macOS)
+    fcntl = None
+
+from utils import runtime, sharding
+
+# Estado compartido entre los procesos worker (solo se usa con HOMEDOCK_SHARD_PROCESSES > 1;
+# en modo de un solo proceso los cogs siguen usando sus ficheros JSON en config/).
+STATE_DB_FILE = os.getenv('HOMEDOCK_STATE_DB', 'data/state.db')
+LOCK_DIR = 'data/locks'
+LOCK_POLL_INTERVAL = 0.05 # Seconds between attempts to take a lock held by another process
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,               -- JSON
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS log_relay (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    channel_id INTEGER NOT NULL,       -- Log channel the message is for (one per guild)
+    created_at REAL NOT NULL,
+    content TEXT,
+    embed TEXT,                        -- embed.to_dict() as JSON
+    file_name TEXT,
+    file_data BLOB
+);
+"""
+
+
+class StateStore:
+    """
+    Key/value store shared by the worker processes of one host (SQLite in WAL mode).
+
+    Values are JSON documents grouped by namespace. Every write is its own transaction, so
+    processes never overwrite each other's keys; `state_lock` serializes read-modify-write
+    sequences on a single key. It also holds the queue of log messages relayed to the
+    process that owns the log channel.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def encode(value):
+        return runtime.codec.canonical_bytes(value).decode('utf-8')
+
+    def get(self, namespace, key, default=None):
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM kv WHERE namespace = ? AND key = ?", (namespace, str(key))).fetchone()
+        return runtime.codec.loads(row[0]) if row else default
+
+    def put(self, namespace, key, value):
+        self.write_many(namespace, {str(key): self.encode(value)})
+
+    def delete(self, namespace, key):
+        self.write_many(namespace, {}, [str(key)])
+
+    def items_raw(self, namespace):
+        """Returns {key: encoded JSON} for a namespace."""
+        with self._lock:
+            return dict(self._conn.execute("SELECT key, value FROM kv WHERE namespace = ?", (namespace,)).fetchall())
+
+    def write_many(self, namespace, encoded_values, deleted_keys=(), only_if_missing=False):
+        """Upserts already-encoded values and deletes keys, in one transaction."""
+        verb = "INSERT OR IGNORE" if only_if_missing else "INSERT OR REPLACE"
+        now = time.time()
+        with self._lock:
+            with self._conn:
+                self._conn.executemany(
+                    f"{verb} INTO kv (namespace, key, value, updated_at) VALUES (?, ?, ?, ?)",
+                    [(namespace, key, value, now) for key, value in encoded_values.items()]
+                )
+                self._conn.executemany("DELETE FROM kv WHERE namespace = ? AND key = ?", [(namespace, key) for key in deleted_keys])
+
+    # --- Log relay ---
+    def enqueue_log(self, channel_id, content=None, embed=None, file_name=None, file_data=None):
+        with self._lock:
+            with self._conn:
+                self._conn.execute(
+                    "INSERT INTO log_relay (channel_id, created_at, content, embed, file_name, file_data) VALUES (?, ?, ?, ?, ?, ?)",
+                    (channel_id, time.time(), content, self.encode(embed) if embed else None, file_name, file_data)
+                )
+
+    def pending_logs(self, channel_ids, limit=20):
+        """Oldest queued log messages for the given log channels first, as dicts."""
+        channel_ids = list(channel_ids)
+        if not channel_ids:
+            return []
+        placeholders = ", ".join("?" for _ in channel_ids)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, channel_id, created_at, content, embed, file_name, file_data FROM log_relay "
+                f"WHERE channel_id IN ({placeholders}) ORDER BY id LIMIT ?", (*channel_ids, limit)
+            ).fetchall()
+        return [
+            {'id': row[0], 'channel_id': row[1], 'created_at': row[2], 'content': row[3],
+             'embed': runtime.codec.loads(row[4]) if row[4] else None, 'file_name': row[5], 'file_data': row[6]}
+            for row in rows
+        ]
+
+    def ack_log(self, log_id):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM log_relay WHERE id = ?", (log_id,))
+
+
+_store = None
+_snapshots = {} # namespace -> {key: encoded value} as last loaded/saved by this process
+_key_locks = {}
+
+
+def get_store():
+    """The shared store in multi-process mode, None otherwise."""
+    global _store
+    if _store is None and sharding.is_worker():
+        _store = StateStore(STATE_DB_FILE)
+    return _store
+
+
+def load_document(path):
+    """
+    Loads a cog's JSON document. Without worker processes it just reads `path`. In multi-process
+    mode it reads the namespace `path` of the shared store, importing the JSON file the first time.
+    Raises FileNotFoundError when there is no document yet, like load_json_file.
+    """
+    store = get_store()
+    if store is None:
+        return runtime.load_json_file(path)
+    rows = store.items_raw(path)
+    if not rows:
+        data = runtime.load_json_file(path)
+        store.write_many(path, {str(key): store.encode(value) for key, value in data.items()}, only_if_missing=True)
+        rows = store.items_raw(path)
+    _snapshots[path] = dict(rows)
+    return {key: runtime.codec.loads(value) for key, value in rows.items()}
+
+
+def save_document(path, data):
+    """
+    Saves a cog's JSON document. In multi-process mode only the top-level keys this process
+    changed (or removed) since it last loaded/saved the document are written, so workers that
+    share a document never clobber each other's keys.
+    """
+    store = get_store()
+    if store is None:
+        runtime.save_json_file(path, data)
+        return
+    snapshot = _snapshots.get(path, {})
+    encoded = {str(key): store.encode(value) for key, value in data.items()}
+    changed = {key: value for key, value in encoded.items() if snapshot.get(key) != value}
+    deleted = [key for key in snapshot if key not in encoded]
+    if changed or deleted:
+        store.write_many(path, changed, deleted)
+    _snapshots[path] = encoded
+
+
+@contextlib.asynccontextmanager
+async def state_lock(namespace, key):
+    """
+    Per-key lock: an asyncio.Lock inside the process (e.g. on_ready firing again on a reconnect)
+    plus, in multi-process mode, an flock on data/locks/<hash>.lock across the workers.
+    """
+    name = f"{namespace}:{key}"
+    local_lock = _key_locks.setdefault(name, asyncio.Lock())
+    async with local_lock:
+        if get_store() is None or fcntl is None:
+            yield
+            return
+        os.makedirs(LOCK_DIR, exist_ok=True)
+        fd = os.open(os.path.join(LOCK_DIR, hashlib.sha1(name.encode('utf-8')).hexdigest()[:20] + ".lock"), os.O_CREAT | os.O_RDWR)
+        try:
+            while True:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    await asyncio.sleep(LOCK_POLL_INTERVAL)
+            yield
+        finally:
+            os.close(fd) # Closing the descriptor releases the flock
+
+
+def refresh_document_key(path, data, key):
+    """Re-reads one key of a loaded document from the shared store (another worker may have changed it). No-op in single-process mode."""
+    store = get_store()
+    if store is None:
+        return
+    key = str(key)
+    value = store.get(path, key)
+    if value is None:
+        data.pop(key, None)
+        _snapshots.get(path, {}).pop(key, None)
+    else:
+        data[key] = value
+        _snapshots.setdefault(path, {})[key] = store.encode(value)
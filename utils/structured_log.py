@@ -0,0 +1,147 @@
+# utils/structured_log.py
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import os
+import queue
+
+# --- LOGGING ---
+# Los módulos usan logging.getLogger(__name__); setup_logging() (llamado al arrancar el bot)
+# envía todos los registros a una cola y un hilo en segundo plano los escribe en consola y en
+# un fichero JSON-lines con rotación. El código que loguea solo paga el put en la cola.
+LOG_LEVEL = os.getenv('HOMEDOCK_LOG_LEVEL', 'INFO').upper()
+# Niveles por módulo, p. ej. "cogs.tickets_cog=DEBUG,discord=WARNING"
+LOG_LEVELS = os.getenv('HOMEDOCK_LOG_LEVELS', '')
+LOG_CONSOLE_FORMAT = os.getenv('HOMEDOCK_LOG_FORMAT', 'text') # "text" o "json"
+LOG_FILE = os.getenv('HOMEDOCK_LOG_FILE', 'data/logs/homedock.jsonl') # Vacío = sin fichero
+LOG_FILE_MAX_BYTES = int(os.getenv('HOMEDOCK_LOG_FILE_MAX_BYTES', str(10 * 1024 * 1024)))
+LOG_FILE_BACKUPS = int(os.getenv('HOMEDOCK_LOG_FILE_BACKUPS', '5'))
+LOG_QUEUE_SIZE = 10000 # Records waiting for the writer thread; beyond this they are dropped, never blocking
+
+# Attributes every LogRecord has; anything else was passed through `extra=` and is an event field
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+
+def event_fields(record):
+    """Fields passed with `extra=` on a log call, e.g. log.info("Ticket opened", extra={'ticket_id': 1})."""
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, msg, the event fields and the traceback if any."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.datetime.fromtimestamp(record.created, tz=datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+        }
+        entry.update(event_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable console line, with the event fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)-7s %(name)s: %(message)s', '%Y-%m-%d %H:%M:%S')
+
+    def format(self, record):
+        line = super().format(record)
+        fields = event_fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks the event loop: when the writer falls behind, records are dropped and counted."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only resolve the message and traceback here; the writer thread does the formatting
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_levels(spec):
+    """"cogs.tickets_cog=DEBUG,discord=WARNING" -> {'cogs.tickets_cog': 'DEBUG', 'discord': 'WARNING'}."""
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+_listener = None
+_queue_handler = None
+
+
+def setup_logging(log_file=LOG_FILE, suffix=None):
+    """
+    Routes the root logger through a bounded queue to a background writer thread (console plus,
+    unless `log_file` is empty, a rotating JSON-lines file). `suffix` keeps one file per worker process.
+    """
+    global _listener, _queue_handler
+    if _listener is not None:
+        return _listener
+
+    console = logging.StreamHandler()
+    console.setFormatter(JsonLinesFormatter() if LOG_CONSOLE_FORMAT == 'json' else TextFormatter())
+    handlers = [console]
+    if log_file:
+        if suffix:
+            base, ext = os.path.splitext(log_file)
+            log_file = f"{base}-{suffix}{ext}"
+        os.makedirs(os.path.dirname(log_file) or '.', exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=LOG_FILE_MAX_BYTES, backupCount=LOG_FILE_BACKUPS, encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+
+    _queue_handler = DroppingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    root = logging.getLogger()
+    root.handlers[:] = [_queue_handler]
+    root.setLevel(LOG_LEVEL)
+    for name, level in parse_levels(LOG_LEVELS).items():
+        logging.getLogger(name).setLevel(level)
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+    return _listener
+
+
+def dropped_records():
+    """Records dropped because the writer thread could not keep up."""
+    return _queue_handler.dropped if _queue_handler else 0
+
+
+def shutdown_logging():
+    """Writes out what is still queued and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
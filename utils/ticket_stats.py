@@ -0,0 +1,181 @@
+# utils/ticket_stats.py
+import math
+from collections import Counter
+
+
+class LogHistogram:
+    """
+    Fixed relative-error quantile sketch (DDSketch style) for durations in seconds.
+
+    Each value goes to bucket ceil(log_gamma(value)), so an update is O(1) and the number of
+    buckets only depends on the value range (about 400 buckets from 1 s to 1 year at 2%),
+    which keeps percentile queries constant time as well.
+    """
+
+    def __init__(self, relative_accuracy=0.02):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self.buckets = Counter()
+        self.count = 0
+        self.total = 0.0
+        self.zero_count = 0 # Values < 1 second
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value < 1:
+            self.zero_count += 1
+            return
+        self.buckets[math.ceil(math.log(value) / self._log_gamma)] += 1
+
+    def quantile(self, q):
+        """Returns the approximate q-quantile (0 <= q <= 1), or None if the sketch is empty."""
+        if self.count == 0:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Punto medio del bucket: error relativo <= relative_accuracy
+                return 2 * self._gamma ** index / (self._gamma + 1)
+        return 2 * self._gamma ** max(self.buckets) / (self._gamma + 1)
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def to_dict(self):
+        return {
+            'relative_accuracy': self.relative_accuracy,
+            'buckets': {str(k): v for k, v in self.buckets.items()},
+            'count': self.count,
+            'total': self.total,
+            'zero_count': self.zero_count,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data.get('relative_accuracy', 0.02))
+        sketch.buckets = Counter({int(k): v for k, v in data.get('buckets', {}).items()})
+        sketch.count = data.get('count', 0)
+        sketch.total = data.get('total', 0.0)
+        sketch.zero_count = data.get('zero_count', 0)
+        return sketch
+
+
+class TicketStats:
+    """
+    Support KPIs maintained incrementally from the ticket lifecycle events (open, first staff
+    reply, close). Every update and every read is O(1); the whole state is a small dict that
+    the cog persists as JSON.
+    """
+
+    def __init__(self):
+        # channel_id (str) -> {'category', 'creator_id', 'opened_at', 'first_response_at', ...details}
+        self.open_tickets = {}
+        self.open_by_category = Counter()
+        self.status_counts = Counter()
+        self.opened_total = 0
+        self.closed_total = 0
+        self.first_response = LogHistogram()
+        self.time_to_close = LogHistogram()
+
+    def is_open(self, channel_id):
+        return str(channel_id) in self.open_tickets
+
+    def ticket_opened(self, channel_id, category, creator_id, opened_at, count_as_new=True, **details):
+        """Adds a ticket to the open index. `details` (creator_name, problem_type, backend...) are stored with it."""
+        key = str(channel_id)
+        if key in self.open_tickets:
+            return
+        self.open_tickets[key] = {
+            'category': category,
+            'creator_id': creator_id,
+            'opened_at': opened_at,
+            'first_response_at': None,
+            **details,
+        }
+        self.open_by_category[category] += 1
+        if count_as_new:
+            self.opened_total += 1
+
+    def staff_replied(self, channel_id, replied_at):
+        """Records the first staff reply of a ticket. Returns True only the first time."""
+        ticket = self.open_tickets.get(str(channel_id))
+        if not ticket or ticket['first_response_at'] is not None:
+            return False
+        ticket['first_response_at'] = replied_at
+        self.first_response.add(max(0.0, replied_at - ticket['opened_at']))
+        return True
+
+    def ticket_closed(self, channel_id, status, closed_at):
+        ticket = self.open_tickets.pop(str(channel_id), None)
+        self.status_counts[status] += 1
+        self.closed_total += 1
+        if ticket:
+            self._decrement_category(ticket['category'])
+            self.time_to_close.add(max(0.0, closed_at - ticket['opened_at']))
+
+    def forget(self, channel_id):
+        """Drops an open ticket without counting it as closed (e.g. channel deleted while offline)."""
+        ticket = self.open_tickets.pop(str(channel_id), None)
+        if ticket:
+            self._decrement_category(ticket['category'])
+
+    def _decrement_category(self, category):
+        self.open_by_category[category] -= 1
+        if self.open_by_category[category] <= 0:
+            del self.open_by_category[category]
+
+    def status_ratio(self):
+        """Returns {status: fraction of closed tickets}."""
+        total = sum(self.status_counts.values())
+        if not total:
+            return {}
+        return {status: count / total for status, count in self.status_counts.items()}
+
+    def to_dict(self):
+        """Snapshot of the state; the open-ticket entries are copied so it can be encoded off the event loop."""
+        return {
+            'open_tickets': {key: dict(ticket) for key, ticket in self.open_tickets.items()},
+            'status_counts': dict(self.status_counts),
+            'opened_total': self.opened_total,
+            'closed_total': self.closed_total,
+            'first_response': self.first_response.to_dict(),
+            'time_to_close': self.time_to_close.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        stats = cls()
+        stats.open_tickets = data.get('open_tickets', {})
+        for ticket in stats.open_tickets.values():
+            stats.open_by_category[ticket['category']] += 1
+        stats.status_counts = Counter(data.get('status_counts', {}))
+        stats.opened_total = data.get('opened_total', 0)
+        stats.closed_total = data.get('closed_total', 0)
+        if 'first_response' in data:
+            stats.first_response = LogHistogram.from_dict(data['first_response'])
+        if 'time_to_close' in data:
+            stats.time_to_close = LogHistogram.from_dict(data['time_to_close'])
+        return stats
+
+
+def format_duration(seconds):
+    """Formats a duration in seconds as '3d 4h', '2h 5m' or '45s'. None -> 'N/A'."""
+    if seconds is None:
+        return "N/A"
+    seconds = int(seconds)
+    days, rest = divmod(seconds, 86400)
+    hours, rest = divmod(rest, 3600)
+    minutes, secs = divmod(rest, 60)
+    if days:
+        return f"{days}d {hours}h"
+    if hours:
+        return f"{hours}h {minutes}m"
+    if minutes:
+        return f"{minutes}m {secs}s"
+    return f"{secs}s"
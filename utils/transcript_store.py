@@ -0,0 +1,179 @@
+# utils/transcript_store.py
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+# Columnas indexadas en el índice full-text (el orden importa para el comando 'delete' de FTS5).
+FTS_COLUMNS = ("channel_name", "creator_name", "problem_type", "source_channel", "status", "transcript")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tickets (
+    ticket_id INTEGER PRIMARY KEY,      -- ID del canal del ticket
+    guild_id INTEGER,
+    channel_name TEXT NOT NULL,
+    creator_id INTEGER,
+    creator_name TEXT,
+    problem_type TEXT,
+    source_channel TEXT,
+    status TEXT,
+    closer_id INTEGER,
+    opened_at REAL,
+    closed_at REAL NOT NULL,
+    archive_channel_id INTEGER,
+    archive_message_id INTEGER,
+    transcript TEXT,                    -- Texto plano (transcripts recientes)
+    transcript_z BLOB                   -- Texto comprimido con zlib (transcripts antiguos)
+);
+CREATE INDEX IF NOT EXISTS tickets_closed_at ON tickets(closed_at);
+CREATE INDEX IF NOT EXISTS tickets_creator ON tickets(creator_id);
+CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts USING fts5(
+    channel_name, creator_name, problem_type, source_channel, status, transcript,
+    content='', tokenize='unicode61 remove_diacritics 2'
+);
+"""
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_match_query(text):
+    """
+    Turns free text typed by staff into a safe FTS5 MATCH expression.
+    Every word must appear (AND) and is matched as a prefix, so 'mdns' also finds 'mDNS-related'.
+    """
+    tokens = _TOKEN_RE.findall(text)
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+class TranscriptStore:
+    """
+    Local archive of closed ticket transcripts (SQLite + FTS5 full-text index).
+
+    The FTS table is contentless: it only holds the index, the text lives once in `tickets`
+    (plain for recent tickets, zlib-compressed after `compact`). All methods are blocking;
+    the cogs call them through `asyncio.to_thread`.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def _fts_values(self, row, transcript):
+        return [row["channel_name"], row["creator_name"], row["problem_type"], row["source_channel"], row["status"], transcript]
+
+    def _delete_from_index(self, row):
+        # Las tablas FTS5 sin contenido necesitan los valores originales para borrar una fila.
+        transcript = self._decode_transcript(row)
+        placeholders = ", ".join("?" for _ in FTS_COLUMNS)
+        self._conn.execute(
+            f"INSERT INTO tickets_fts(tickets_fts, rowid, {', '.join(FTS_COLUMNS)}) VALUES('delete', ?, {placeholders})",
+            [row["ticket_id"], *self._fts_values(row, transcript)]
+        )
+
+    @staticmethod
+    def _decode_transcript(row):
+        if row["transcript"] is not None:
+            return row["transcript"]
+        if row["transcript_z"] is not None:
+            return zlib.decompress(row["transcript_z"]).decode('utf-8')
+        return ""
+
+    def add_ticket(self, ticket_id, channel_name, transcript, closed_at, guild_id=None, creator_id=None, creator_name=None,
+                   problem_type=None, source_channel=None, status=None, closer_id=None, opened_at=None,
+                   archive_channel_id=None, archive_message_id=None):
+        """Stores (or replaces) a closed ticket and indexes it."""
+        with self._lock:
+            existing = self._conn.execute("SELECT * FROM tickets WHERE ticket_id = ?", (ticket_id,)).fetchone()
+            if existing:
+                self._delete_from_index(existing)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tickets (ticket_id, guild_id, channel_name, creator_id, creator_name, problem_type, "
+                "source_channel, status, closer_id, opened_at, closed_at, archive_channel_id, archive_message_id, transcript, transcript_z) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, NULL)",
+                (ticket_id, guild_id, channel_name, creator_id, creator_name, problem_type, source_channel, status,
+                 closer_id, opened_at, closed_at, archive_channel_id, archive_message_id, transcript)
+            )
+            self._conn.execute(
+                f"INSERT INTO tickets_fts(rowid, {', '.join(FTS_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (ticket_id, channel_name, creator_name, problem_type, source_channel, status, transcript)
+            )
+            self._conn.commit()
+
+    def set_archive_message(self, ticket_id, archive_channel_id, archive_message_id):
+        """Records where the archived copy of a stored ticket was posted. Returns False if the ticket is not stored yet."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tickets SET archive_channel_id = ?, archive_message_id = ? WHERE ticket_id = ?",
+                (archive_channel_id, archive_message_id, ticket_id)
+            )
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def search(self, text, guild_id, limit=10):
+        """Returns up to `limit` ticket metadata rows of one guild (best match first) for a free-text query."""
+        match_query = build_match_query(text)
+        if not match_query:
+            return []
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT t.ticket_id, t.guild_id, t.channel_name, t.creator_id, t.creator_name, t.problem_type, t.source_channel, "
+                "t.status, t.closer_id, t.opened_at, t.closed_at, t.archive_channel_id, t.archive_message_id "
+                "FROM tickets_fts JOIN tickets t ON t.ticket_id = tickets_fts.rowid "
+                "WHERE tickets_fts MATCH ? AND t.guild_id = ? ORDER BY tickets_fts.rank LIMIT ?",
+                (match_query, guild_id, limit)
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    def get_transcript(self, ticket_id, guild_id):
+        """Returns (channel_name, full transcript text) of a ticket of `guild_id`, or None if it is not stored (for that guild)."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT channel_name, transcript, transcript_z FROM tickets WHERE ticket_id = ? AND guild_id = ?", (ticket_id, guild_id)
+            ).fetchone()
+        return (row["channel_name"], self._decode_transcript(row)) if row else None
+
+    def compact(self, older_than_days):
+        """Compresses the transcripts of tickets closed more than `older_than_days` ago. Returns how many."""
+        cutoff = time.time() - older_than_days * 86400
+        compressed = 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ticket_id, transcript FROM tickets WHERE closed_at < ? AND transcript IS NOT NULL", (cutoff,)
+            ).fetchall()
+            for row in rows:
+                self._conn.execute(
+                    "UPDATE tickets SET transcript_z = ?, transcript = NULL WHERE ticket_id = ?",
+                    (zlib.compress(row["transcript"].encode('utf-8'), 9), row["ticket_id"])
+                )
+                compressed += 1
+            self._conn.commit()
+        return compressed
+
+    def purge(self, older_than_days):
+        """Deletes tickets closed more than `older_than_days` ago (retention policy). Returns how many."""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM tickets WHERE closed_at < ?", (cutoff,)).fetchall()
+            for row in rows:
+                self._delete_from_index(row)
+            self._conn.execute("DELETE FROM tickets WHERE closed_at < ?", (cutoff,))
+            self._conn.commit()
+        return len(rows)
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM tickets").fetchone()[0]